@@ -0,0 +1,217 @@
+"""
+Time-sliced parallel backfill of historical orders.
+
+The date range is split into updated_at_min/updated_at_max windows sized to the order density (using the cheap
+orders/count.json endpoint: dense windows are split, sparse neighbours merged), and the windows are fetched
+concurrently under the shared ShopifyClient rate budget. Results are deduplicated by order id, keeping the latest
+updated_at: either merged in memory, or handed over window by window as each one completes (on_window), keeping
+only an id -> updated_at index, so a long range can be written out without being held.
+
+    df = backfill_orders_df(datetime(2023, 11, 1), datetime(2025, 11, 1), concurrency=8)
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+import shopify_gen as sho
+from shopify_client import get_client
+from state_store import max_updated_at
+
+
+class BackfillReport:
+    """Per-window progress and totals for a backfill run."""
+
+    def __init__(self, windows):
+        self.windows = windows
+        self.done = []
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.fetched = 0
+        self.unique = 0
+
+    def window_done(self, window, count, pages, seconds):
+        self.done.append(
+            {"start": window[0], "end": window[1], "orders": count, "pages": pages, "seconds": seconds}
+        )
+        print(
+            f"Window {len(self.done)} of {len(self.windows)} "
+            f"[{window[0].isoformat()} - {window[1].isoformat()}]: "
+            f"{count} orders, {pages} pages in {seconds:.1f}s"
+        )
+
+    def summary(self):
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return (
+            f"Backfill: {len(self.windows)} windows, {self.fetched} orders fetched, "
+            f"{self.unique} unique after dedup, {elapsed:.1f}s "
+            f"({self.fetched / elapsed if elapsed > 0 else 0:.1f} orders/sec)"
+        )
+
+
+def count_orders(window_start, window_end):
+    """Returns the number of orders (any status) updated inside a window. (REST API)"""
+
+    client = get_client()
+
+    params = {
+        "status": "any",
+        "updated_at_min": window_start.isoformat(),
+        "updated_at_max": window_end.isoformat(),
+    }
+
+    return client.get(client.rest_url("orders/count.json"), params=params).json()["count"]
+
+
+def plan_windows(
+    start_dt,
+    end_dt,
+    executor,
+    initial_window=timedelta(days=7),
+    min_window=timedelta(hours=1),
+    max_window=timedelta(days=31),
+    target_orders=2500,
+):
+    """
+    Returns a list of (start, end) windows covering [start_dt, end_dt), each holding roughly target_orders or fewer.
+    Windows over target are halved (down to min_window) and recounted; runs of small neighbouring windows are merged
+    (up to max_window), so the window size follows order density.
+    """
+
+    pending = sho.split_time_windows(start_dt, end_dt, initial_window)
+    counted = []
+
+    # split dense windows until each fits, counting each round concurrently
+    while pending:
+        counts = list(executor.map(lambda w: count_orders(*w), pending))
+
+        oversized = []
+        for window, count in zip(pending, counts):
+            if count > target_orders and window[1] - window[0] > min_window:
+                middle = window[0] + (window[1] - window[0]) / 2
+                oversized.extend([(window[0], middle), (middle, window[1])])
+            else:
+                counted.append((window, count))
+
+        pending = oversized
+
+    counted.sort(key=lambda wc: wc[0][0])
+
+    # merge runs of sparse neighbours
+    windows = []
+    merged_start, merged_end, merged_count = None, None, 0
+    for (window_start, window_end), count in counted:
+        if (
+            merged_start is not None
+            and merged_count + count <= target_orders
+            and window_end - merged_start <= max_window
+        ):
+            merged_end = window_end
+            merged_count += count
+            continue
+
+        if merged_start is not None:
+            windows.append((merged_start, merged_end, merged_count))
+        merged_start, merged_end, merged_count = window_start, window_end, count
+
+    if merged_start is not None:
+        windows.append((merged_start, merged_end, merged_count))
+
+    # empty windows don't need fetching
+    return [(s, e) for s, e, count in windows if count > 0]
+
+
+def fetch_window(window):
+    """Fetches every order updated inside one window. Returns (orders, pages)."""
+
+    window_start, window_end = window
+
+    orders = []
+    pages = 0
+    for records, next_url in sho.iter_incremental_pages(
+        "orders", window_start, update_buffer=0, updated_at_max=window_end
+    ):
+        orders.extend(records)
+        pages += 1
+
+    return orders, pages
+
+
+def merge_latest(versions, orders):
+    """
+    Records a window's orders in versions, a dict of id -> latest updated_at seen, and returns the orders that are new
+    or newer than the version seen before (the latest one per id). Orders without an updated_at rank below any dated
+    version, so they are only kept for ids not seen yet.
+    """
+
+    latest = {}
+
+    for order in orders:
+        order_id = order.get("id")
+        if order_id is None:
+            continue
+
+        version = max_updated_at([order])
+
+        if order_id in versions:
+            seen = versions[order_id]
+            if version is None or (seen is not None and version <= seen):
+                continue
+
+        versions[order_id] = version
+        latest[order_id] = order
+
+    return list(latest.values())
+
+
+def backfill_orders(start_dt, end_dt, concurrency=4, on_window=None, **plan_args):
+    """
+    Fetches all orders updated in [start_dt, end_dt) as concurrent time windows.
+    Returns (list of unique raw orders, BackfillReport). plan_args are passed to plan_windows.
+    With on_window, each window's orders (those newer than any version already handed over) go to on_window(orders)
+    as soon as the window is fetched instead, and the returned list is empty.
+    """
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        windows = plan_windows(start_dt, end_dt, executor, **plan_args)
+        report = BackfillReport(windows)
+        print(f"Backfill planned {len(windows)} windows between {start_dt} and {end_dt}")
+
+        def timed_fetch(window):
+            started = time.monotonic()
+            orders, pages = fetch_window(window)
+            return orders, pages, time.monotonic() - started
+
+        futures = {executor.submit(timed_fetch, w): w for w in windows}
+
+        versions = {}
+        merged = {}
+        for future in as_completed(futures):
+            # drop the future as it is consumed, so a finished window's orders aren't kept around
+            window = futures.pop(future)
+            orders, pages, seconds = future.result()
+            report.fetched += len(orders)
+            report.window_done(window, len(orders), pages, seconds)
+
+            latest = merge_latest(versions, orders)
+            if on_window:
+                on_window(latest)
+            else:
+                merged.update((order["id"], order) for order in latest)
+
+    report.unique = len(versions)
+    report.finished_at = time.monotonic()
+    print(report.summary())
+
+    return list(merged.values()), report
+
+
+def backfill_orders_df(start_dt, end_dt, concurrency=4, child_tables=False, **plan_args):
+    """Backfills orders (see backfill_orders) and returns them normalized, like get_incremental_orders_df."""
+
+    orders, report = backfill_orders(start_dt, end_dt, concurrency, **plan_args)
+
+    if child_tables:
+        return sho.split_child_tables(orders, "orders")
+
+    return sho.normalize_records(orders, "orders")
@@ -0,0 +1,259 @@
+"""
+Throughput benchmarks for the extractors and extract/load jobs, run against the local mock Shopify server
+(mock_shopify.py) instead of the rate limited sandbox store.
+
+Every job runs at every size in its own process, with its own mock server process and scratch
+data_raw/data_state/data_warehouse folders (loads go to DuckDB), and reports:
+    pages/sec and records/sec, peak RSS, and the time spent in network (HTTP calls), normalize (json_normalize and
+    compaction), write (raw files) and load (warehouse loads), from the run's pipeline metrics (see metrics.py).
+Stage times are summed across threads, so with prefetching and the streaming loader they can add up to more than
+the wall clock time.
+
+    python benchmark.py                                     # every job at 1k, 100k and 1M records
+    python benchmark.py --sizes 1000 10000 --jobs get_all_orders_df full_extract_upload_orders
+    python benchmark.py --shopify-limits                    # with Shopify's standard rate limits on the mock
+    python benchmark.py --no-compression                    # plain json responses, to compare bytes on the wire
+    python benchmark.py --sizes 1000 --jobs bulkorders_extract_upload bulkproductvariants_extract_upload
+"""
+
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+# the mock store's records are spread over 2024, so this start date pulls everything incrementally
+MOCK_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+VARIANTS_PER_PRODUCT = 3
+
+
+def run_job(job):
+    """Runs one job by name inside a prepared benchmark process. Returns its result (df, dict of dfs or None)."""
+
+    import extract
+    import shopify_gen as sho
+    import state_store
+
+    jobs = {
+        "get_all_products_df": lambda: sho.get_all_products_df(),
+        "get_all_customers_df": lambda: sho.get_all_customers_df(),
+        "get_all_orders_df": lambda: sho.get_all_orders_df(),
+        "get_product_variants_df": lambda: sho.get_product_variants_df(),
+        "get_incremental_orders_df": lambda: sho.get_incremental_orders_df(MOCK_START),
+        "get_incremental_product_variants_df": lambda: sho.get_incremental_product_variants_df(
+            MOCK_START
+        ),
+        "allproducts_extract_upload": lambda: extract.allproducts_extract_upload(),
+        "allcustomers_extract_upload": lambda: extract.allcustomers_extract_upload(),
+        "full_extract_upload_orders": lambda: extract.full_extract_upload(
+            "orders", "bench_allorders", child_tables=True
+        ),
+        "incrementalorders_extract_upload": lambda: extract.incrementalorders_extract_upload(
+            MOCK_START, state=state_store.StateStore()
+        ),
+        "bulkorders_extract_upload": lambda: extract.bulkorders_extract_upload(
+            MOCK_START, poll_interval=0.2, state=state_store.StateStore()
+        ),
+        "bulkproductvariants_extract_upload": lambda: extract.bulkproductvariants_extract_upload(
+            poll_interval=0.2, state=state_store.StateStore()
+        ),
+    }
+
+    return jobs[job]()
+
+
+# job -> mock store resource its size applies to
+JOB_RESOURCES = {
+    "get_all_products_df": "products",
+    "get_all_customers_df": "customers",
+    "get_all_orders_df": "orders",
+    "get_product_variants_df": "variants",
+    "get_incremental_orders_df": "orders",
+    "get_incremental_product_variants_df": "variants",
+    "allproducts_extract_upload": "products",
+    "allcustomers_extract_upload": "customers",
+    "full_extract_upload_orders": "orders",
+    "incrementalorders_extract_upload": "orders",
+    "bulkorders_extract_upload": "orders",
+    "bulkproductvariants_extract_upload": "variants",
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock_process(job, size, shopify_limits, compression=True):
+    """Starts mock_shopify.py in its own process, sized for the job. Returns (process, api base url template)."""
+
+    counts = {"products": 100, "customers": 100, "orders": 100}
+    resource_name = JOB_RESOURCES[job]
+    if resource_name == "variants":
+        counts["products"] = max(1, size // VARIANTS_PER_PRODUCT)
+    else:
+        counts[resource_name] = size
+
+    port = free_port()
+    args = [
+        sys.executable,
+        os.path.join(CODE_DIR, "mock_shopify.py"),
+        "--port", str(port),
+        "--products", str(counts["products"]),
+        "--customers", str(counts["customers"]),
+        "--orders", str(counts["orders"]),
+        "--variants-per-product", str(VARIANTS_PER_PRODUCT),
+    ]
+    if not shopify_limits:
+        args += [
+            "--rest-leak-rate", "100000",
+            "--graphql-maximum", "1000000",
+            "--graphql-restore-rate", "1000000",
+        ]
+    if not compression:
+        args.append("--no-compression")
+
+    process = subprocess.Popen(args, stdout=subprocess.DEVNULL)
+
+    # wait for it to listen
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/admin/api/2025-10/orders/count.json")
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    return process, f"http://127.0.0.1:{port}/admin/api/{{api_version}}"
+
+
+def run_benchmark(job, size, shopify_limits=False, compression=True):
+    """Runs one job at one size in this process and returns its measurements. Call from a fresh process."""
+
+    process, base_url = start_mock_process(job, size, shopify_limits, compression)
+
+    # scratch layout mirroring the repo, so the pipeline's ../data_* paths stay inside it
+    workdir = tempfile.mkdtemp(prefix="shopify_bench_")
+    for folder in ("code", "data_raw", "data_state", "data_warehouse"):
+        os.makedirs(os.path.join(workdir, folder))
+    os.chdir(os.path.join(workdir, "code"))
+
+    os.environ["shopify_base_url"] = base_url
+    os.environ["access_token"] = "mock"
+    os.environ["warehouse_backend"] = "duckdb"
+    os.environ.pop("duckdb_path", None)
+
+    import metrics
+
+    try:
+        started = time.perf_counter()
+        with metrics.pipeline_run(f"benchmark_{job}"):
+            result = run_job(job)
+        seconds = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait()
+
+    if isinstance(result, dict):
+        result = next(iter(result.values()))
+
+    http = metrics.registry.stage_totals("http")
+
+    # REST pages report their rows when parsed; GraphQL jobs are counted from the df they return, and bulk jobs
+    # (which stream the result file to the warehouse) from the rows they wrote
+    records = (
+        metrics.registry.stage_totals("parse")["rows"]
+        or (len(result) if result is not None else 0)
+        or metrics.registry.stage_totals("write")["rows"]
+    )
+    pages = http["calls"]
+
+    return {
+        "job": job,
+        "size": size,
+        "seconds": round(seconds, 3),
+        "pages": pages,
+        "records": records,
+        "pages_per_sec": round(pages / seconds, 1),
+        "records_per_sec": round(records / seconds, 1),
+        # ru_maxrss is in KB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "mb_in": round(http["bytes_in"] / 1e6, 1),
+        "network_s": round(http["seconds"], 3),
+        **{
+            f"{stage}_s": round(metrics.registry.stage_totals(stage)["seconds"], 3)
+            for stage in ("normalize", "write", "load")
+        },
+        "workdir": workdir,
+    }
+
+
+def print_results(results):
+    columns = [
+        "job", "size", "seconds", "pages_per_sec", "records_per_sec", "peak_rss_mb", "mb_in",
+        "network_s", "normalize_s", "write_s", "load_s",
+    ]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in columns}
+
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for r in results:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Shopify extractors against the mock server.")
+    parser.add_argument("--jobs", nargs="+", default=list(JOB_RESOURCES), choices=list(JOB_RESOURCES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--shopify-limits", action="store_true", help="keep Shopify's standard rate limits")
+    parser.add_argument("--no-compression", action="store_true", help="serve uncompressed json from the mock")
+    parser.add_argument("--output", help="also write the results as json to this file")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # child process: one job at one size, result as json on the last stdout line
+    if args.run:
+        print(
+            json.dumps(
+                run_benchmark(args.run, args.sizes[0], args.shopify_limits, not args.no_compression)
+            )
+        )
+        return
+
+    results = []
+    for job in args.jobs:
+        for size in args.sizes:
+            print(f"Running {job} at {size} records")
+            command = [sys.executable, os.path.abspath(__file__), "--run", job, "--sizes", str(size)]
+            if args.shopify_limits:
+                command.append("--shopify-limits")
+            if args.no_compression:
+                command.append("--no-compression")
+
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(completed.stderr)
+                continue
+
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    if results:
+        print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Content-hash change detection for full snapshot extracts (all products, customers, variants).
+
+Each row of a snapshot gets a 64 bit hash of its contents, keyed by the entity's id column, and the snapshot is
+compared with the hash index of the last one loaded (kept in the state store):
+    inserted - keys not in the index
+    updated  - keys whose hash changed
+    deleted  - keys in the index that are gone from the snapshot
+An unchanged snapshot is neither written nor loaded; otherwise only the inserted and updated rows are written and
+upserted, and the deleted keys are removed from the raw table. With no index yet (first run, or after
+state_store.clear_row_hashes) the whole snapshot is loaded with WRITE_TRUNCATE, as before.
+
+The new index is staged when the change set is written and only replaces the old one once it is loaded (see
+extract.snapshot_extract / snapshot_load), so a failed load is detected again on the next run.
+"""
+
+import pandas as pd
+
+import metrics
+import schemas
+from shopify_gen import nested_to_json
+from warehouse import clean_column_names
+
+
+def row_hashes(df, key):
+    """
+    Returns a Series of int64 content hashes per row of a df, indexed by its key column as strings.
+    Columns are hashed in name order, with nested fields as json, so the hash doesn't depend on column order.
+    An empty snapshot (which may not even have the key column) has no hashes.
+    """
+
+    if key not in df.columns:
+        return pd.Series([], index=pd.Index([], dtype=object), dtype="int64")
+
+    df = nested_to_json(clean_column_names(df.copy()))
+    df = df[df[key].notna()]
+
+    columns = sorted(df.columns)
+    hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy().view("int64")
+
+    return pd.Series(hashes, index=df[key].astype(str).to_numpy()).groupby(level=0).last()
+
+
+class ChangeSet:
+    """A snapshot's differences from the previous hash index (see detect_changes)."""
+
+    def __init__(self, entity, rows, hashes, inserted, updated, deleted, full):
+        self.entity = entity
+        self.rows = rows
+        self.hashes = hashes
+        self.inserted = inserted
+        self.updated = updated
+        self.deleted = deleted
+        self.full = full
+
+    @property
+    def unchanged(self):
+        # a full snapshot with no rows (an empty first snapshot) has nothing to load either
+        return not (self.inserted or self.updated or self.deleted)
+
+    def summary(self):
+        if self.full:
+            return f"{self.entity}: no previous hash index, full snapshot of {len(self.rows)} rows"
+        return (
+            f"{self.entity}: {self.inserted} inserted, {self.updated} updated, {self.deleted} deleted, "
+            f"{len(self.hashes) - self.inserted - self.updated} unchanged"
+        )
+
+
+def detect_changes(df, entity, previous, key=None):
+    """
+    Compares a snapshot df of an entity with the previous {key: hash} index. Returns a ChangeSet whose rows are the
+    inserted and updated rows of df (all of df when there is no previous index) and whose hashes are the new index.
+    """
+
+    key = key or schemas.get_key(entity)
+    hashes = row_hashes(df, key)
+
+    if not previous:
+        changes = ChangeSet(entity, df, hashes, len(hashes), 0, 0, full=True)
+    else:
+        previous = pd.Series(previous, dtype="int64")
+
+        known = hashes.index.isin(previous.index)
+        changed = hashes[known] != previous.reindex(hashes.index[known]).to_numpy()
+        changed_keys = set(hashes.index[~known]) | set(changed.index[changed])
+
+        rows = df[df[key].astype(str).isin(changed_keys)] if key in df.columns else df
+        deleted = int((~previous.index.isin(hashes.index)).sum())
+
+        changes = ChangeSet(
+            entity, rows, hashes, int((~known).sum()), int(changed.sum()), deleted, full=False
+        )
+
+    for change, count in (
+        ("insert", changes.inserted),
+        ("update", changes.updated),
+        ("delete", changes.deleted),
+    ):
+        metrics.increment("snapshot_rows", count, entity=entity, change=change)
+
+    print(changes.summary())
+    return changes
@@ -0,0 +1,246 @@
+"""
+Embedded DuckDB stand-in for the BigQuery warehouse, so extract -> load runs and can be timed offline.
+
+Tables follow the same "<dataset>.<table>" naming as BigQuery, with each dataset as a DuckDB schema,
+all in one database file.
+
+https://duckdb.org/docs/api/python/overview
+"""
+
+import os
+import threading
+import uuid
+from datetime import datetime
+
+import duckdb
+
+import schemas
+
+DUCKDB_LOC = "../data_warehouse/warehouse.duckdb"
+
+# schemas.py types -> DuckDB types
+DUCKDB_TYPES = {
+    "INT64": "BIGINT",
+    "TIMESTAMP": "TIMESTAMPTZ",
+    "NUMERIC": "DECIMAL(38, 9)",
+    "STRING": "VARCHAR",
+}
+
+connections = {}
+connections_lock = threading.Lock()
+
+# one writer at a time per database file: concurrent upserts of overlapping keys would otherwise abort on conflicts
+write_locks = {}
+
+
+def get_connection(path=DUCKDB_LOC):
+    """Returns the shared connection to a DuckDB file, opening (and creating) it on first use."""
+
+    with connections_lock:
+        if path not in connections:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            connections[path] = duckdb.connect(path)
+            write_locks[path] = threading.Lock()
+
+        return connections[path]
+
+
+def get_cursor(path=DUCKDB_LOC):
+    """
+    Returns a new cursor on the shared connection to a DuckDB file. A DuckDB connection isn't safe to use from several
+    threads at once, so every call gets its own cursor (with its own temp tables and transactions).
+    """
+
+    return get_connection(path).cursor()
+
+
+def get_write_lock(path=DUCKDB_LOC):
+    get_connection(path)
+    return write_locks[path]
+
+
+def read_source_sql(file_path):
+    """Returns a DuckDB table expression that reads a raw extract file."""
+
+    if file_path.endswith(".parquet"):
+        return f"read_parquet('{file_path}')"
+
+    return f"read_csv_auto('{file_path}', header = true)"
+
+
+def table_exists(conn, dataset, table):
+    return (
+        conn.execute(
+            "SELECT count(*) FROM information_schema.tables WHERE table_schema = ? AND table_name = ?",
+            [dataset, table],
+        ).fetchone()[0]
+        > 0
+    )
+
+
+def load_file(
+    file_path,
+    dataset,
+    table,
+    disposition="WRITE_TRUNCATE",
+    key="id",
+    version_column="updated_at",
+    path=DUCKDB_LOC,
+):
+    """
+    Loads a raw extract into <dataset>.<table> with WRITE_TRUNCATE, WRITE_APPEND or UPSERT (replace rows matching on key).
+    For UPSERT, when both sides have version_column only newer (or equal) versions replace existing rows,
+    matching the BigQuery MERGE. Column names are cleaned the same way the BigQuery load does, and columns in the
+    table's entity schema (see schemas.py) are cast to their types, so csv and parquet extracts load alike.
+    Appends and upserts first add any columns the batch has and the target doesn't.
+    Safe to call from several threads: each call reads its file on its own cursor into its own temp table, and the
+    writes into the database file take turns.
+    """
+
+    with get_cursor(path) as conn:
+        # load into a scratch table first so column names can be cleaned before touching the target;
+        # named per call, like upsert_file's temp tables on BigQuery
+        tmp = f"load_tmp_{uuid.uuid4().hex[:12]}"
+        source = read_source_sql(file_path)
+        conn.execute(f"CREATE TEMP TABLE {tmp} AS SELECT * FROM {source}")
+
+        try:
+            with get_write_lock(path):
+                load_tmp_table(conn, tmp, dataset, table, disposition, key, version_column)
+        finally:
+            conn.execute(f"DROP TABLE IF EXISTS {tmp}")
+
+
+def load_tmp_table(conn, tmp, dataset, table, disposition, key, version_column):
+    """Writes a loaded scratch table into <dataset>.<table> (see load_file)."""
+
+    conn.execute(f"CREATE SCHEMA IF NOT EXISTS {dataset}")
+
+    column_types = {row[0]: row[1] for row in conn.execute(f"DESCRIBE {tmp}").fetchall()}
+    columns = list(column_types)
+    schema = schemas.get_schema(schemas.entity_for_table(table))
+
+    def select_col(column):
+        name = column.replace(".", "_")
+        if name in schema:
+            return f'TRY_CAST("{column}" AS {DUCKDB_TYPES[schema[name]]}) AS "{name}"'
+        return f'"{column}" AS "{name}"'
+
+    def column_type(column):
+        name = column.replace(".", "_")
+        return DUCKDB_TYPES[schema[name]] if name in schema else column_types[column]
+
+    select_cols = ", ".join(select_col(c) for c in columns)
+    target = f"{dataset}.{table}"
+
+    if disposition == "WRITE_TRUNCATE" or not table_exists(conn, dataset, table):
+        conn.execute(f"CREATE OR REPLACE TABLE {target} AS SELECT {select_cols} FROM {tmp}")
+        return
+
+    if disposition not in ("WRITE_APPEND", "UPSERT"):
+        raise ValueError(f"Unknown disposition {disposition}")
+
+    # json_normalize output changes shape between batches: add columns the target doesn't have yet
+    target_columns = [row[0] for row in conn.execute(f"DESCRIBE {target}").fetchall()]
+    for column in columns:
+        name = column.replace(".", "_")
+        if name not in target_columns:
+            conn.execute(f'ALTER TABLE {target} ADD COLUMN "{name}" {column_type(column)}')
+            target_columns.append(name)
+
+    if disposition == "WRITE_APPEND":
+        conn.execute(f"INSERT INTO {target} BY NAME SELECT {select_cols} FROM {tmp}")
+        return
+
+    source = tmp
+    stale = ""
+
+    if version_column in columns and version_column in target_columns:
+        # newest row per key in the batch
+        source = f"{tmp}_dedup"
+        conn.execute(
+            f"""CREATE OR REPLACE TEMP TABLE {source} AS SELECT * FROM {tmp}
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY "{key}" ORDER BY "{version_column}" DESC) = 1"""
+        )
+        stale = f'AND {target}."{version_column}" <= {source}."{version_column}"'
+
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        conn.execute(
+            f'DELETE FROM {target} USING {source} WHERE {target}."{key}" = {source}."{key}" {stale}'
+        )
+        # rows still in the target after the delete are newer than the batch's version
+        conn.execute(
+            f"""INSERT INTO {target} BY NAME SELECT {select_cols} FROM {source}
+            WHERE NOT EXISTS (SELECT 1 FROM {target} WHERE {target}."{key}" = {source}."{key}")"""
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        if source != tmp:
+            conn.execute(f"DROP TABLE IF EXISTS {source}")
+
+
+def replace_table(source_dataset, source_table, dataset, table, path=DUCKDB_LOC):
+    """Replaces <dataset>.<table> with <source_dataset>.<source_table> and drops the source, in one transaction."""
+
+    with get_cursor(path) as conn, get_write_lock(path):
+        conn.execute(f"CREATE SCHEMA IF NOT EXISTS {dataset}")
+
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            conn.execute(
+                f"CREATE OR REPLACE TABLE {dataset}.{table} AS SELECT * FROM {source_dataset}.{source_table}"
+            )
+            conn.execute(f"DROP TABLE {source_dataset}.{source_table}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def drop_table(dataset, table, path=DUCKDB_LOC):
+    with get_cursor(path) as conn, get_write_lock(path):
+        conn.execute(f"DROP TABLE IF EXISTS {dataset}.{table}")
+
+
+def delete_keys(dataset, table, keys, key="id", path=DUCKDB_LOC):
+    """Deletes the rows of <dataset>.<table> whose key is in keys. Does nothing if the table doesn't exist."""
+
+    if not keys:
+        return
+
+    with get_cursor(path) as conn, get_write_lock(path):
+        if table_exists(conn, dataset, table):
+            conn.execute(f'DELETE FROM {dataset}.{table} WHERE "{key}" IN (SELECT UNNEST(?))', [list(keys)])
+
+
+def get_last_updatedt(table, dataset="raw", path=DUCKDB_LOC):
+    """
+    Returns a datetime of the max updated_at date from a raw table, like "orders_raw".
+    Returns None if the table is empty or doesn't exist yet (a first run), so callers can tell there is no watermark.
+    """
+
+    with get_cursor(path) as conn:
+        if not table_exists(conn, dataset, table):
+            return None
+
+        result = conn.execute(f"SELECT MAX(updated_at) FROM {dataset}.{table}").fetchone()[0]
+
+    if result is None:
+        return None
+
+    if isinstance(result, datetime):
+        return result
+
+    return datetime.fromisoformat(result)
+
+
+def query_df(query, path=DUCKDB_LOC):
+    """Runs a query against the DuckDB warehouse and returns a df."""
+
+    with get_cursor(path) as conn:
+        return conn.execute(query).df()
@@ -1,9 +1,16 @@
-import shopify_gen as sho
-import pandas as pd
-from datetime import datetime
-from google.cloud import bigquery
 import os
-import gcp_bigquery_gen as gbq
+import uuid
+import shopify_gen as sho
+import shopify_bulk
+import backfill
+import metrics
+from datetime import datetime, timedelta, timezone
+import requests
+from warehouse import get_warehouse, clean_column_names, dedupe_latest
+import state_store
+import schemas
+import change_detection
+from streaming import StreamingLoader
 
 
 def get_timestamp_prefix():
@@ -29,86 +36,729 @@ def extract_df_to_csv(df_function, filename, fileloc="../data_raw/"):
 
     filefullpath = f"{fileloc}{prefix} {filename}.csv"
 
-    df.to_csv(filefullpath, index=False)
+    with metrics.timed("write", filename, file_format="csv") as event:
+        df.to_csv(filefullpath, index=False)
+        event["rows"] = len(df)
+        event["bytes_out"] = os.path.getsize(filefullpath)
 
     print(f"File created: {filefullpath}")
     return filefullpath
 
 
-def load_to_bigquery(file_path, destination_loc, disposition="WRITE_TRUNCATE"):
+def extract_df_to_parquet(df_function, filename, fileloc="../data_raw/", entity=None):
+    """
+    Creates a raw parquet extract from the chosen df returning function, with choice of filename, defaulting to the raw data location.
+    Column names are cleaned for BigQuery and nested fields stored as json strings here, so the file can be loaded as is.
+    With an entity (like "orders"), its columns are typed per schemas.py (INT64 ids, TIMESTAMP dates, NUMERIC prices).
+    Returns full file loc.
+    """
+
+    df = df_function
+
+    df = clean_column_names(df)
+    df = sho.nested_to_json(df)
+
+    if entity:
+        df = schemas.apply_schema(df, entity)
+
+    prefix = get_timestamp_prefix()
+
+    filefullpath = f"{fileloc}{prefix} {filename}.parquet"
+
+    with metrics.timed("write", entity or filename, file_format="parquet") as event:
+        df.to_parquet(filefullpath, index=False)
+        event["rows"] = len(df)
+        event["bytes_out"] = os.path.getsize(filefullpath)
+
+    print(f"File created: {filefullpath}")
+    return filefullpath
+
+
+def extract_df_to_file(
+    df_function, filename, fileloc="../data_raw/", file_format="parquet", entity=None
+):
+    """
+    Creates a raw extract in the chosen file format ("parquet" or "csv"). Returns full file loc.
+    Parquet is typed to the entity's schema when one is given; csv is typed when it is loaded.
     """
-    Uploads a csv to a BigQuery table. Converts csv to a df and cleans column titles before loading.
+
+    if file_format == "csv":
+        return extract_df_to_csv(df_function, filename, fileloc)
+
+    return extract_df_to_parquet(df_function, filename, fileloc, entity=entity)
+
+
+def load_to_warehouse(
+    file_path,
+    destination_loc,
+    disposition="WRITE_TRUNCATE",
+    warehouse=None,
+    key="id",
+):
+    """
+    Uploads a raw extract to a warehouse table, on the configured backend unless a warehouse is passed (see warehouse.py).
     Destination loc should be in the format ".<dataset name>.<table name>", like ".raw.products_raw"
     Disposition dictates the load behavior. Default (and would be if unspecified) is WRITE_TRUNCATE, which overwrites.
-        Use WRITE_APPEND to not overwrite and just append (e.g. incremental loads)
+        Use WRITE_APPEND to not overwrite and just append
+        Use UPSERT to merge on key (default id), keeping the newest updated_at (e.g. incremental loads)
+    """
+
+    warehouse = warehouse or get_warehouse()
+
+    with metrics.timed(
+        "load", destination_loc, disposition=disposition, backend=warehouse.name
+    ) as event:
+        event["bytes_out"] = os.path.getsize(file_path)
+        warehouse.load(file_path, destination_loc, disposition, key=key)
+
+    print(f" Loaded {file_path} to {warehouse.name} location {destination_loc}")
+
+
+def load_to_bigquery(file_path, destination_loc, disposition="WRITE_TRUNCATE"):
+    """
+    Uploads a raw extract to a BigQuery table (see load_to_warehouse).
+    Parquet files are handed to BigQuery as is. A csv is converted to a df and its column titles cleaned before loading.
+    """
+
+    load_to_warehouse(
+        file_path, destination_loc, disposition, warehouse=get_warehouse("bigquery")
+    )
+
+
+def snapshot_extract(df, filename, entity, file_format="parquet", state=None):
+    """
+    Compares a full snapshot df of an entity with the row hash index of the last one loaded (see change_detection.py)
+    and creates a raw file of only what changed: the inserted and updated rows, or the whole snapshot when there is
+    no index yet. Stages the snapshot's index in the state store.
+    Returns a dict of file, entity and disposition for snapshot_load, or None when nothing changed. A change set
+    of only deletions has no file.
+    """
+
+    state = state or state_store.get_state_store()
+
+    changes = change_detection.detect_changes(df, entity, state.get_row_hashes(entity))
+
+    if changes.unchanged:
+        print(f"{entity} unchanged since the last snapshot, nothing to write or load")
+        return None
+
+    file = None
+    if not changes.rows.empty:
+        file = extract_df_to_file(
+            changes.rows,
+            filename if changes.full else f"{filename}_changes",
+            file_format=file_format,
+            entity=entity,
+        )
+
+    state.stage_row_hashes(entity, changes.hashes)
+
+    return {
+        "file": file,
+        "entity": entity,
+        "disposition": "WRITE_TRUNCATE" if changes.full else "UPSERT",
+    }
+
+
+def snapshot_load(extracted, destination_loc, state=None):
     """
+    Loads a snapshot_extract result to destination_loc: a full snapshot replaces the table, a change set is upserted
+    and the keys gone from the snapshot are deleted. The staged row hash index then becomes the loaded one.
+    Does nothing for None (an unchanged snapshot).
+    """
+
+    if extracted is None:
+        return
+
+    state = state or state_store.get_state_store()
+
+    entity = extracted["entity"]
+    key = schemas.get_key(entity)
+
+    if extracted["file"]:
+        load_to_warehouse(extracted["file"], destination_loc, extracted["disposition"], key=key)
+
+    if extracted["disposition"] == "UPSERT":
+        deleted = state.get_deleted_row_keys(entity)
+
+        if deleted:
+            if schemas.get_schema(entity).get(key, "INT64") == "INT64":
+                deleted = [int(k) for k in deleted]
+
+            warehouse = get_warehouse()
+            with metrics.timed(
+                "load", destination_loc, disposition="DELETE", backend=warehouse.name
+            ) as event:
+                warehouse.delete_keys(destination_loc, deleted, key=key)
+                event["rows"] = len(deleted)
+
+            print(f" Deleted {len(deleted)} rows gone from the snapshot from {destination_loc}")
+
+    state.commit_row_hashes(entity)
+
+
+def snapshot_extract_upload(df, filename, entity, file_format="parquet", state=None):
+    """Creates and loads the change set of a full snapshot df to ".raw.<entity>_raw" (see snapshot_extract)."""
 
-    project = os.getenv("gcp_bigquery_project_name")
+    snapshot_load(
+        snapshot_extract(df, filename, entity, file_format=file_format, state=state),
+        f".raw.{entity}_raw",
+        state=state,
+    )
+
+
+def tables_extract_upload(
+    tables, filename, disposition="WRITE_TRUNCATE", file_format="parquet", changes_only=False
+):
+    """
+    Creates one raw file per table from a dict of table name -> df (see shopify_gen.split_child_tables)
+    and loads each to the matching ".raw.<table name>_raw" BigQuery table. Empty tables are skipped.
+    With changes_only, each table is treated as a full snapshot and only its changes are written and loaded
+    (see snapshot_extract_upload); empty tables are compared too, so the rows of a table that emptied out are deleted.
+    """
 
-    client = bigquery.Client(project=project)
+    for table, df in tables.items():
+        if changes_only:
+            snapshot_extract_upload(df, f"{filename}_{table}", table, file_format=file_format)
+            continue
 
-    df = pd.read_csv(file_path)
+        if df.empty:
+            continue
 
-    # quick edit to test upload
-    df.columns = df.columns.str.replace(".", "_", regex=False)
+        file = extract_df_to_file(
+            df, f"{filename}_{table}", file_format=file_format, entity=table
+        )
 
-    job_config = bigquery.LoadJobConfig(write_disposition=disposition)
+        load_to_warehouse(file, f".raw.{table}_raw", disposition=disposition)
 
-    client.load_table_from_dataframe(
-        df, project + destination_loc, job_config=job_config
-    ).result()
-    print(f" Loaded {file_path} to BigQuery location {destination_loc}")
 
+@metrics.pipeline_run("allproducts")
+def allproducts_extract_upload(file_format="parquet", child_tables=False, changes_only=True):
+    """Creates a raw file (parquet by default, or csv) of the all products extract and loads to BigQuery.
 
-def allproducts_extract_upload():
-    """Creates a csv of the all products extract and loads to BigQuery."""
+    With child_tables=True, images, options and variants are also split out and loaded to their own raw tables.
+    With changes_only (the default), only rows changed since the last snapshot are written and loaded, and nothing
+    is when none did (see snapshot_extract); pass changes_only=False to replace the raw table(s) outright.
+    """
 
-    file = extract_df_to_csv(sho.get_all_products_df(), "shopify_allproducts")
+    if child_tables:
+        tables_extract_upload(
+            sho.get_all_products_df(child_tables=True),
+            "shopify_allproducts",
+            file_format=file_format,
+            changes_only=changes_only,
+        )
+        print("done")
+        return
+
+    if changes_only:
+        snapshot_extract_upload(
+            sho.get_all_products_df(), "shopify_allproducts", "products", file_format=file_format
+        )
+        print("done")
+        return
+
+    file = extract_df_to_file(
+        sho.get_all_products_df(),
+        "shopify_allproducts",
+        file_format=file_format,
+        entity="products",
+    )
 
-    load_to_bigquery(file, ".raw.products_raw")
+    load_to_warehouse(file, ".raw.products_raw")
 
     print("done")
 
 
-def allcustomers_extract_upload():
-    """Creates a csv of the all customer extract and loads to BigQuery."""
+@metrics.pipeline_run("allcustomers")
+def allcustomers_extract_upload(file_format="parquet", child_tables=False, changes_only=True):
+    """Creates a raw file (parquet by default, or csv) of the all customer extract and loads to BigQuery.
 
-    file = extract_df_to_csv(
-        sho.get_all_customers_df(), "shopify_allcustomers"
+    With child_tables=True, addresses are also split out and loaded to their own raw table.
+    With changes_only (the default), only rows changed since the last snapshot are written and loaded, and nothing
+    is when none did (see snapshot_extract); pass changes_only=False to replace the raw table(s) outright.
+    """
+
+    if child_tables:
+        tables_extract_upload(
+            sho.get_all_customers_df(child_tables=True),
+            "shopify_allcustomers",
+            file_format=file_format,
+            changes_only=changes_only,
+        )
+        print("done")
+        return
+
+    if changes_only:
+        snapshot_extract_upload(
+            sho.get_all_customers_df(), "shopify_allcustomers", "customers", file_format=file_format
+        )
+        print("done")
+        return
+
+    file = extract_df_to_file(
+        sho.get_all_customers_df(),
+        "shopify_allcustomers",
+        file_format=file_format,
+        entity="customers",
     )
 
-    load_to_bigquery(file, ".raw.customers_raw")
+    load_to_warehouse(file, ".raw.customers_raw")
 
     print("done")
 
 
-def allproductvariants_extract_upload():
-    """Creates a csv of the all product variants extract and loads to BigQuery."""
+@metrics.pipeline_run("allproductvariants")
+def allproductvariants_extract_upload(file_format="parquet", changes_only=True):
+    """Creates a raw file (parquet by default, or csv) of the all product variants extract and loads to BigQuery.
+
+    With changes_only (the default), only variants changed since the last snapshot are written and loaded, and
+    nothing is when none did (see snapshot_extract); pass changes_only=False to replace the raw table outright.
+    """
 
-    file = extract_df_to_csv(
-        sho.get_product_variants_df(), "shopify_allproductvariants"
+    if changes_only:
+        snapshot_extract_upload(
+            sho.get_product_variants_df(),
+            "shopify_allproductvariants",
+            "productvariants",
+            file_format=file_format,
+        )
+        print("done")
+        return
+
+    file = extract_df_to_file(
+        sho.get_product_variants_df(),
+        "shopify_allproductvariants",
+        file_format=file_format,
+        entity="productvariants",
     )
 
-    load_to_bigquery(file, ".raw.productvariants_raw")
+    load_to_warehouse(file, ".raw.productvariants_raw")
 
     print("done")
 
 
-def incrementalorders_extract_upload(last_updated_dt=None):
-    """Creates a csv of the all orders extract and loads to BigQuery.
+def page_tables(records, resource, child_tables=False):
+    """Normalizes one page of raw REST records into a dict of table name -> df, for a StreamingLoader."""
+
+    if child_tables:
+        return sho.split_child_tables(records, resource)
+
+    return {resource: sho.normalize_records(records, resource)}
 
-    Allows last update date to be set manually, else it will pull the last updated dt from the raw dataset.
 
+def get_start_dt(state, entity, table):
+    """
+    Returns where an incremental run of an entity starts: its watermark, else the max updated_at in its raw table.
+    Raises on a first run, when there is neither, since there is nothing to be incremental from yet.
     """
 
-    if not (last_updated_dt):
-        last_updated_dt = gbq.get_last_order_updatedt()
+    start_dt = state.get_watermark(entity) or get_warehouse().get_last_updatedt(table)
+
+    if start_dt is None:
+        raise ValueError(
+            f"No {entity} watermark and {table} is empty: load a full snapshot or run a backfill first, "
+            "or pass a start date"
+        )
+
+    return start_dt
+
+
+def advance_watermark(state, entity, high_water):
+    """Saves high_water as the entity's watermark if it is later, so a run over older data never moves it backwards."""
+
+    # watermarks saved naive are UTC; compare aware
+    current = state.get_watermark(entity)
+    if current is not None and current.tzinfo is None:
+        current = current.replace(tzinfo=timezone.utc)
+    if current is None or high_water > current:
+        state.set_watermark(entity, high_water)
+
+
+@metrics.pipeline_run("incremental_extract")
+def incremental_extract_upload(
+    resource,
+    filename,
+    last_updated_dt=None,
+    file_format="parquet",
+    child_tables=False,
+    rows_per_file=50000,
+    state=None,
+    disposition="UPSERT",
+):
+    """Creates raw files of a REST resource's incremental extract ("orders", "customers", "products") and upserts them to BigQuery.
+
+    Allows last update date to be set manually, else it uses the resource's watermark from the local state store,
+    falling back to the max updated dt in the raw dataset only when no watermark has been saved yet.
+    Runs as a streaming pipeline (see streaming.py): each page is normalized as it arrives, pages roll into raw files of
+    rows_per_file rows, and files are written and loaded in the background while the next pages download.
+    The next page url is checkpointed after each file is loaded, so a run that fails partway resumes from its
+    last loaded file on the next call.
+    Loads UPSERT by default (one row per id, newest updated_at wins); pass disposition="WRITE_APPEND" to keep every version.
+    With child_tables=True, nested arrays are also split out and loaded to their own raw tables.
+
+    """
+
+    state = state or state_store.get_state_store()
+
+    checkpoint = state.get_checkpoint(resource)
+    resume_url = None
+    high_water = None
+    pages_done = 0
+
+    if last_updated_dt:
+        # a manual start date overrides any half finished run
+        state.clear_checkpoint(resource)
+    elif checkpoint:
+        resume_url = checkpoint["next_url"]
+        high_water = checkpoint["high_water"]
+        pages_done = checkpoint["pages_done"]
+        last_updated_dt = high_water
+        print(f"Resuming {resource} extract after {pages_done} pages")
+    else:
+        last_updated_dt = get_start_dt(state, resource, f"{resource}_raw")
+
+    pages = sho.iter_incremental_pages(resource, last_updated_dt, resume_url=resume_url)
+
+    loader = StreamingLoader(
+        filename,
+        extract_df_to_file,
+        load_to_warehouse,
+        disposition=disposition,
+        rows_per_file=rows_per_file,
+        file_format=file_format,
+        on_loaded=lambda cp: state.save_checkpoint(resource, *cp),
+    )
+
+    try:
+        try:
+            for records, next_url in pages:
+                high_water = state_store.max_updated_at(records, high_water)
+                pages_done += 1
+
+                checkpoint_after = (next_url, high_water, pages_done) if next_url else None
+                loader.add_page(page_tables(records, resource, child_tables), checkpoint_after)
+        finally:
+            # loads whatever was fetched before any failure, so the checkpoint is as far along as possible
+            loader.close()
+
+    except requests.HTTPError:
+        # page_info cursors expire. Results sorted by updated_at can restart from the last loaded updated_at,
+        # anything else restarts from the saved watermark.
+        if not resume_url or pages_done > checkpoint["pages_done"]:
+            raise
+        print("Saved page cursor rejected, restarting the window")
+        state.clear_checkpoint(resource)
+        sorted_by_updated = "order" in sho.INCREMENTAL_PARAMS[resource]
+        if sorted_by_updated and high_water:
+            state.set_watermark(resource, high_water)
+        return incremental_extract_upload(
+            resource,
+            filename,
+            file_format=file_format,
+            child_tables=child_tables,
+            rows_per_file=rows_per_file,
+            state=state,
+            disposition=disposition,
+        )
+
+    if high_water:
+        state.set_watermark(resource, high_water)
+    state.clear_checkpoint(resource)
 
-    file = extract_df_to_csv(
-        sho.get_incremental_orders_df(last_updated_dt),
+    print("done")
+
+
+def staged_snapshot_upload(filename, pages, file_format="parquet", rows_per_file=50000):
+    """
+    Streams the pages ({table name: df}) of a full snapshot through a StreamingLoader into per-run staging tables
+    (".raw.<table>_raw__staging_<run>"), and only once every page is written and loaded swaps each one in for its
+    ".raw.<table>_raw" (see Warehouse.replace_table). A failed page, write or load drops the staging tables and leaves
+    the live tables as they were. Returns the tables replaced.
+    """
+
+    warehouse = get_warehouse()
+    suffix = f"__staging_{uuid.uuid4().hex[:12]}"
+
+    loader = StreamingLoader(
+        filename,
+        extract_df_to_file,
+        load_to_warehouse,
+        first_disposition="WRITE_TRUNCATE",
+        rows_per_file=rows_per_file,
+        file_format=file_format,
+        table_suffix=suffix,
+    )
+
+    try:
+        try:
+            for page in pages:
+                loader.add_page(page)
+        finally:
+            loader.close()
+    except Exception:
+        for table in loader.loaded_tables:
+            warehouse.drop_table(f".raw.{table}_raw{suffix}")
+        raise
+
+    for table in loader.loaded_tables:
+        destination_loc = f".raw.{table}_raw"
+        with metrics.timed("load", destination_loc, disposition="REPLACE", backend=warehouse.name):
+            warehouse.replace_table(f"{destination_loc}{suffix}", destination_loc)
+        print(f" Replaced {destination_loc} with the loaded snapshot")
+
+    return sorted(loader.loaded_tables)
+
+
+@metrics.pipeline_run("full_extract")
+def full_extract_upload(
+    resource, filename, file_format="parquet", child_tables=False, rows_per_file=50000
+):
+    """Streams a full snapshot of a REST resource ("orders", "customers", "products") into its raw tables.
+
+    Same pipeline as incremental_extract_upload: pages are normalized as they arrive and rolled into raw files that are
+    written and loaded in the background, so memory stays bounded by rows_per_file however large the catalog is.
+    The files load into staging tables that replace the raw tables only once the whole snapshot is in
+    (see staged_snapshot_upload), so a failed run never leaves a raw table truncated.
+    """
+
+    chunk_functions = {
+        "orders": sho.get_all_orders_df,
+        "customers": sho.get_all_customers_df,
+        "products": sho.get_all_products_df,
+    }
+
+    chunks = chunk_functions[resource](chunked=True, child_tables=child_tables)
+
+    staged_snapshot_upload(
+        filename,
+        (chunk if child_tables else {resource: chunk} for chunk in chunks),
+        file_format=file_format,
+        rows_per_file=rows_per_file,
+    )
+
+    print("done")
+
+
+@metrics.pipeline_run("incrementalorders")
+def incrementalorders_extract_upload(
+    last_updated_dt=None,
+    file_format="parquet",
+    child_tables=False,
+    rows_per_file=50000,
+    state=None,
+):
+    """Creates raw files (parquet by default, or csv) of the incremental orders extract and loads them to BigQuery.
+
+    See incremental_extract_upload for the watermark and checkpoint/resume behavior.
+    With child_tables=True, line items are also split out and loaded to their own raw table.
+
+    """
+
+    incremental_extract_upload(
+        "orders",
         "shopify_incrementalorders",
+        last_updated_dt,
+        file_format=file_format,
+        child_tables=child_tables,
+        rows_per_file=rows_per_file,
+        state=state,
+    )
+
+
+@metrics.pipeline_run("incrementalcustomers")
+def incrementalcustomers_extract_upload(
+    last_updated_dt=None, file_format="parquet", child_tables=False, state=None
+):
+    """Creates raw files of the customers updated since the last run and upserts them to BigQuery (see incremental_extract_upload)."""
+
+    incremental_extract_upload(
+        "customers",
+        "shopify_incrementalcustomers",
+        last_updated_dt,
+        file_format=file_format,
+        child_tables=child_tables,
+        state=state,
+    )
+
+
+@metrics.pipeline_run("incrementalproducts")
+def incrementalproducts_extract_upload(
+    last_updated_dt=None, file_format="parquet", child_tables=False, state=None
+):
+    """Creates raw files of the products updated since the last run and upserts them to BigQuery (see incremental_extract_upload)."""
+
+    incremental_extract_upload(
+        "products",
+        "shopify_incrementalproducts",
+        last_updated_dt,
+        file_format=file_format,
+        child_tables=child_tables,
+        state=state,
+    )
+
+
+@metrics.pipeline_run("incrementalproductvariants")
+def incrementalproductvariants_extract_upload(
+    last_updated_dt=None, file_format="parquet", state=None
+):
+    """Creates a raw file of the product variants updated since the last run and upserts it to BigQuery on variant_id.
+
+    Uses the "productvariants" watermark from the local state store unless a last update date is given.
+    """
+
+    state = state or state_store.get_state_store()
+
+    if not (last_updated_dt):
+        last_updated_dt = get_start_dt(state, "productvariants", "productvariants_raw")
+
+    df = sho.get_incremental_product_variants_df(last_updated_dt)
+
+    if df.empty:
+        print("No updated product variants")
+        return
+
+    df = dedupe_latest(df, key="variant_id")
+
+    high_water = state_store.max_updated_at(df[["updated_at"]].to_dict("records"))
+
+    file = extract_df_to_file(
+        df,
+        "shopify_incrementalproductvariants",
+        file_format=file_format,
+        entity="productvariants",
+    )
+
+    load_to_warehouse(
+        file, ".raw.productvariants_raw", disposition="UPSERT", key="variant_id"
+    )
+
+    state.set_watermark("productvariants", high_water)
+
+    print("done")
+
+
+@metrics.pipeline_run("backfillorders")
+def backfillorders_extract_upload(
+    start_dt, end_dt=None, concurrency=4, file_format="parquet", rows_per_file=50000, state=None
+):
+    """Backfills orders updated between start_dt and end_dt (default now) as concurrent time windows and loads them.
+
+    See backfill.py for the window planning. Each window is handed to a StreamingLoader as soon as it is fetched,
+    so the backfill never holds the whole range; its files are upserted, so the newest version of an order fetched
+    in several windows wins. Moves the orders watermark forward if the backfill reached past it.
+    """
+
+    state = state or state_store.get_state_store()
+
+    if not end_dt:
+        end_dt = datetime.now(start_dt.tzinfo)
+
+    high_water = None
+
+    loader = StreamingLoader(
+        "shopify_backfillorders",
+        extract_df_to_file,
+        load_to_warehouse,
+        disposition="UPSERT",
+        rows_per_file=rows_per_file,
+        file_format=file_format,
+    )
+
+    def write_window(orders):
+        nonlocal high_water
+        if orders:
+            high_water = state_store.max_updated_at(orders, high_water)
+            loader.add_page(page_tables(orders, "orders"))
+
+    try:
+        backfill.backfill_orders(start_dt, end_dt, concurrency=concurrency, on_window=write_window)
+    finally:
+        loader.close()
+
+    if high_water is None:
+        print("No orders in backfill range")
+        return
+
+    advance_watermark(state, "orders", high_water)
+
+    print("done")
+
+
+@metrics.pipeline_run("bulkorders")
+def bulkorders_extract_upload(
+    last_updated_dt=None,
+    update_buffer=600,
+    file_format="parquet",
+    rows_per_file=50000,
+    poll_interval=5,
+    state=None,
+):
+    """Extracts orders with their line items with a GraphQL bulk operation and upserts them into orders_bulk_raw and
+    orders_bulk_lineitems_raw, streaming the result file in rolling files like incremental_extract_upload.
+
+    Starts from the "orders_bulk" watermark in the local state store (else the raw table) unless a last updated dt is
+    given, pulling every order on a first run, and moves the watermark forward like backfillorders_extract_upload.
+    """
+
+    state = state or state_store.get_state_store()
+
+    if not (last_updated_dt):
+        last_updated_dt = state.get_watermark("orders_bulk") or get_warehouse().get_last_updatedt(
+            "orders_bulk_raw"
+        )
+
+    if last_updated_dt:
+        start_dt = last_updated_dt - timedelta(seconds=update_buffer)
+    else:
+        start_dt = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    high_water = None
+
+    loader = StreamingLoader(
+        "shopify_bulkorders",
+        extract_df_to_file,
+        load_to_warehouse,
+        disposition="UPSERT",
+        rows_per_file=rows_per_file,
+        file_format=file_format,
+    )
+
+    try:
+        for page in shopify_bulk.bulk_extract_pages(
+            "orders", poll_interval=poll_interval, updated_at_min=start_dt.isoformat()
+        ):
+            orders = page["orders_bulk"]
+            if not orders.empty:
+                high_water = state_store.max_updated_at(orders[["updated_at"]].to_dict("records"), high_water)
+            loader.add_page(page)
+    finally:
+        loader.close()
+
+    if high_water is None:
+        print("No orders updated since the last bulk run")
+        return
+
+    advance_watermark(state, "orders_bulk", high_water)
+
+    print("done")
+
+
+@metrics.pipeline_run("bulkproductvariants")
+def bulkproductvariants_extract_upload(file_format="parquet", rows_per_file=50000, poll_interval=5, state=None):
+    """Extracts all product variants with a GraphQL bulk operation and replaces productvariants_raw with them,
+    streaming the result file through staging tables like full_extract_upload."""
+
+    state = state or state_store.get_state_store()
+
+    staged_snapshot_upload(
+        "shopify_bulkproductvariants",
+        shopify_bulk.bulk_extract_pages("productvariants", poll_interval=poll_interval),
+        file_format=file_format,
+        rows_per_file=rows_per_file,
     )
 
-    load_to_bigquery(file, ".raw.orders_raw", disposition="WRITE_APPEND")
+    # the table was replaced outside snapshot change detection, so its next snapshot is compared from scratch
+    state.clear_row_hashes("productvariants")
 
     print("done")
@@ -4,35 +4,351 @@ https://docs.cloud.google.com/sdk/docs/install
 """
 
 from google.cloud import bigquery
+from google.api_core.exceptions import NotFound
 
 import os
+import uuid
+import pandas as pd
 from dotenv import load_dotenv
 from datetime import datetime
+from warehouse import clean_column_names
+import schemas
 
 load_dotenv()
 
 project = os.getenv("gcp_bigquery_project_name")
 
-client = bigquery.Client(project=project)
+client = None
 
 
-def get_last_order_updatedt():
-    """Returns a datetime of the max updated_at date from the raw table of order data."""
+def get_client():
+    """Returns the shared BigQuery client, created on first use rather than at import so the module can load offline."""
+
+    global client
+
+    if client is None:
+        client = bigquery.Client(project=project)
+
+    return client
+
+
+def get_schema_fields(entity, columns):
+    """Returns BigQuery SchemaFields for the columns of an entity's schema (see schemas.py) that are in columns."""
+
+    return [
+        bigquery.SchemaField(column, column_type)
+        for column, column_type in schemas.get_schema(entity).items()
+        if column in columns
+    ]
+
+
+def get_partitioning_config(entity):
+    """Returns LoadJobConfig kwargs that create an entity's table day-partitioned on updated_at and clustered on its id."""
+
+    partition_column, cluster_columns = schemas.get_partitioning(entity)
+
+    if partition_column is None:
+        return {}
+
+    return {
+        "time_partitioning": bigquery.TimePartitioning(
+            type_=bigquery.TimePartitioningType.DAY, field=partition_column
+        ),
+        "clustering_fields": cluster_columns,
+    }
+
+
+def load_file(file_path, table_id, disposition="WRITE_TRUNCATE", entity=None):
+    """
+    Loads a raw extract into a fully qualified table id ("<project>.<dataset>.<table>") with WRITE_TRUNCATE or WRITE_APPEND.
+    Parquet files are handed to BigQuery as is, already typed by the extract (see schemas.apply_schema). Appends may
+    add new columns to the table.
+    A csv is converted to a df, its column titles cleaned and its columns typed, and loaded with the entity's explicit schema.
+    A table that doesn't exist yet is created partitioned and clustered (see schemas.get_partitioning); existing
+    tables keep theirs, see partition_raw_table to convert one.
+    The entity defaults to the table name without "_raw".
+    """
+
+    entity = entity or schemas.entity_for_table(table_id.split(".")[-1])
+
+    partitioning = {} if table_exists(table_id) else get_partitioning_config(entity)
+
+    # appended batches may carry columns the table doesn't have yet, or nulls in a column it holds as REQUIRED
+    schema_updates = (
+        {
+            "schema_update_options": [
+                bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION,
+                bigquery.SchemaUpdateOption.ALLOW_FIELD_RELAXATION,
+            ]
+        }
+        if disposition == "WRITE_APPEND" and not partitioning
+        else {}
+    )
+
+    if file_path.endswith(".parquet"):
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=disposition,
+            **schema_updates,
+            **partitioning,
+        )
+
+        with open(file_path, "rb") as f:
+            get_client().load_table_from_file(f, table_id, job_config=job_config).result()
+
+        return
+
+    df = pd.read_csv(file_path)
+
+    df = clean_column_names(df)
+    df = schemas.apply_schema(df, entity)
+
+    job_config = bigquery.LoadJobConfig(
+        write_disposition=disposition,
+        schema=get_schema_fields(entity, df.columns),
+        **schema_updates,
+        **partitioning,
+    )
+
+    get_client().load_table_from_dataframe(df, table_id, job_config=job_config).result()
+
+
+def table_exists(table_id):
+    try:
+        get_client().get_table(table_id)
+        return True
+    except NotFound:
+        return False
+
+
+def upsert_file(file_path, table_id, key="id", version_column="updated_at", entity=None):
+    """
+    Loads a raw extract into a temp table next to table_id, then MERGEs it into table_id on key.
+    When both sides have version_column, a matched row is only replaced by a newer (or equal) version, and the batch
+    is reduced to its newest row per key first; otherwise matched rows are simply replaced. New rows are inserted.
+    Columns the batch has and the target doesn't are added to the target first.
+    Creates table_id from the file if it doesn't exist yet.
+    """
+
+    entity = entity or schemas.entity_for_table(table_id.split(".")[-1])
+
+    if not table_exists(table_id):
+        load_file(file_path, table_id, "WRITE_APPEND", entity=entity)
+        return
+
+    # unique per load, so parallel upserts into the same table don't share a temp table
+    temp_table_id = f"{table_id}_upsert_tmp_{uuid.uuid4().hex[:12]}"
+
+    load_file(file_path, temp_table_id, "WRITE_TRUNCATE", entity=entity)
+
+    try:
+        temp_schema = get_client().get_table(temp_table_id).schema
+        columns = [field.name for field in temp_schema]
+
+        # json_normalize output changes shape between batches: add columns the target doesn't have yet
+        target = get_client().get_table(table_id)
+        target_columns = {field.name for field in target.schema}
+        new_fields = [
+            bigquery.SchemaField(field.name, field.field_type, mode="NULLABLE")
+            for field in temp_schema
+            if field.name not in target_columns
+        ]
+        if new_fields:
+            target.schema = list(target.schema) + new_fields
+            get_client().update_table(target, ["schema"])
+            target_columns |= {field.name for field in new_fields}
+
+        update_set = ", ".join(f"T.`{c}` = S.`{c}`" for c in columns)
+        insert_cols = ", ".join(f"`{c}`" for c in columns)
+        insert_vals = ", ".join(f"S.`{c}`" for c in columns)
+
+        if version_column in columns and version_column in target_columns:
+            source = f"""(
+                SELECT * FROM `{temp_table_id}`
+                QUALIFY ROW_NUMBER() OVER (PARTITION BY `{key}` ORDER BY `{version_column}` DESC) = 1
+            )"""
+            matched = f"WHEN MATCHED AND S.`{version_column}` >= T.`{version_column}`"
+        else:
+            source = f"`{temp_table_id}`"
+            matched = "WHEN MATCHED"
+
+        query = f"""
+            MERGE `{table_id}` T
+            USING {source} S
+            ON T.`{key}` = S.`{key}`
+            {matched} THEN UPDATE SET {update_set}
+            WHEN NOT MATCHED THEN INSERT ({insert_cols}) VALUES ({insert_vals})
+        """
+
+        get_client().query(query).result()
+    finally:
+        get_client().delete_table(temp_table_id, not_found_ok=True)
+
+
+def replace_table(source_table_id, table_id):
+    """
+    Replaces table_id with source_table_id in one copy job (WRITE_TRUNCATE, so readers see the old or the new table,
+    never a partial one), then deletes the source. The tables' partitioning specs must match (see partition_raw_table).
+    """
+
+    job_config = bigquery.CopyJobConfig(write_disposition="WRITE_TRUNCATE")
+    get_client().copy_table(source_table_id, table_id, job_config=job_config).result()
+    get_client().delete_table(source_table_id, not_found_ok=True)
+
+
+def drop_table(table_id):
+    get_client().delete_table(table_id, not_found_ok=True)
 
-    dataset = "raw"
-    table = "orders_raw"
+
+def delete_keys(table_id, keys, key="id", chunk_size=10000):
+    """Deletes the rows of table_id whose key is in keys, chunk_size keys per DELETE. Does nothing if it doesn't exist."""
+
+    if not keys or not table_exists(table_id):
+        return
+
+    key_type = "INT64" if all(isinstance(k, int) for k in keys) else "STRING"
+
+    for start in range(0, len(keys), chunk_size):
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("keys", key_type, keys[start : start + chunk_size])
+            ]
+        )
+        query = f"DELETE FROM `{table_id}` WHERE `{key}` IN UNNEST(@keys)"
+        get_client().query(query, job_config=job_config).result()
+
+
+def partition_options(partition_column, cluster_columns):
+    """Returns the PARTITION BY / CLUSTER BY clause of a CREATE TABLE ... AS, or "" for an unpartitioned table."""
+
+    if not partition_column:
+        return ""
+
+    options = f"PARTITION BY DATE(`{partition_column}`)"
+    if cluster_columns:
+        options += " CLUSTER BY " + ", ".join(f"`{c}`" for c in cluster_columns)
+    return options
+
+
+def dedupe_table(table_id, key="id", version_column="updated_at"):
+    """
+    One-off rewrite of a table down to its newest row per key, e.g. to clean up raw.orders_raw rows that were
+    appended before loads switched to UPSERT.
+    The table keeps its partitioning and clustering, since BigQuery won't replace a table with a different spec.
+    """
+
+    table = get_client().get_table(table_id)
+    partitioning = table.time_partitioning
+    options = partition_options(partitioning.field if partitioning else None, table.clustering_fields)
+
+    query = f"""
+        CREATE OR REPLACE TABLE `{table_id}` {options} AS
+        SELECT * FROM `{table_id}`
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY `{key}` ORDER BY `{version_column}` DESC) = 1
+    """
+
+    get_client().query(query).result()
+
+
+def partition_raw_table(table_id, entity=None):
+    """
+    One-off rewrite of an existing raw table to its entity's schema types, day-partitioned on updated_at and clustered on
+    its id, e.g. for raw tables created before loads were typed. Loads of typed files into an untyped table fail until then.
+
+    BigQuery won't change a table's partitioning with CREATE OR REPLACE, so the typed copy is built next to it as
+    <table>__typed, checked to hold as many rows, and only then is the original dropped and the copy renamed in its place.
+
+    Migrating the existing raw tables, in order:
+        1. pause the extract/load jobs (the Airflow DAG), so nothing loads into a table while it is rebuilt
+        2. partition_raw_table(f"{project}.raw.<entity>_raw") for every raw table
+        3. dedupe_table on tables that were appended to before loads switched to UPSERT (keeps the new partitioning)
+        4. resume the jobs; their typed parquet APPEND/UPSERT loads now match the tables
+    If a run stops between the drop and the rename, the data is in <table>__typed; rerun the rename by hand.
+    """
+
+    entity = entity or schemas.entity_for_table(table_id.split(".")[-1])
+
+    partition_column, cluster_columns = schemas.get_partitioning(entity)
+
+    original = get_client().get_table(table_id)
+    columns = {field.name for field in original.schema}
+    casts = ", ".join(
+        f"SAFE_CAST(`{column}` AS {column_type}) AS `{column}`"
+        for column, column_type in schemas.get_schema(entity).items()
+        if column in columns
+    )
+
+    select = f"SELECT * REPLACE ({casts})" if casts else "SELECT *"
+
+    options = partition_options(partition_column, cluster_columns)
+
+    typed_table_id = f"{table_id}__typed"
+
+    query = f"""
+        CREATE OR REPLACE TABLE `{typed_table_id}` {options} AS
+        {select} FROM `{table_id}`
+    """
+
+    get_client().query(query).result()
+
+    typed_rows = get_client().get_table(typed_table_id).num_rows
+    if typed_rows != original.num_rows:
+        raise Exception(
+            f"{typed_table_id} has {typed_rows} rows, {table_id} has {original.num_rows}; left both in place"
+        )
+
+    get_client().delete_table(table_id)
+    get_client().query(
+        f"ALTER TABLE `{typed_table_id}` RENAME TO `{table_id.split('.')[-1]}`"
+    ).result()
+
+
+def get_last_updatedt(table, dataset="raw", lookback_days=7):
+    """
+    Returns a datetime of the max updated_at date from a raw table, like "customers_raw".
+    On tables partitioned by a TIMESTAMP updated_at, the last lookback_days of partitions are checked first, so the
+    query only scans recent data; the whole table is only scanned if nothing was updated in that time.
+    Returns None if the table is empty (a first run), so callers can tell there is no watermark.
+    """
+
+    table_id = f"{project}.{dataset}.{table}"
+
+    updated_at_type = {
+        field.name: field.field_type for field in get_client().get_table(table_id).schema
+    }.get("updated_at")
 
     query = f"""
         SELECT MAX(updated_at) AS max_updated_at
-        FROM `{project}.{dataset}.{table}`
+        FROM `{table_id}`
     """
 
     # test query
     # query = "SELECT 'Hello, BigQuery!' AS greeting"
-    df = client.query(query).to_dataframe()
 
-    result = df["max_updated_at"][0]
+    result = None
+
+    if updated_at_type == "TIMESTAMP":
+        recent_query = (
+            query
+            + f"WHERE updated_at >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {lookback_days} DAY)"
+        )
+        result = get_client().query(recent_query).to_dataframe()["max_updated_at"][0]
+
+    if result is None or pd.isna(result):
+        result = get_client().query(query).to_dataframe()["max_updated_at"][0]
+
+    if result is None or pd.isna(result):
+        return None
+
+    if isinstance(result, datetime):
+        return pd.Timestamp(result).to_pydatetime()
 
     result_formatted = datetime.fromisoformat(result)
 
     return result_formatted
+
+
+def get_last_order_updatedt():
+    """Returns a datetime of the max updated_at date from the raw table of order data."""
+
+    return get_last_updatedt("orders_raw")
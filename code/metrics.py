@@ -0,0 +1,282 @@
+"""
+Pipeline metrics: per-stage timings, byte/row counts, retries and API budget, as structured json logs and a
+Prometheus text-format file per run.
+
+Stages are timed where they happen:
+    http       - each Shopify API call (shopify_client), bytes in, status, retries
+    parse      - json decoding of a response body, rows per page
+    normalize  - json_normalize + compaction (shopify_gen.normalize_records)
+    write      - raw file writes (extract.extract_df_to_*), rows and bytes out
+    load       - warehouse loads (extract.load_to_warehouse), bytes out
+    generate   - synthetic order chunks (synthetic_orders.py), rows
+plus counters for retries and API cost, and gauges for the REST/GraphQL budget remaining.
+
+A run wraps a job; each event is logged as a json line (DEBUG for per-call events, INFO for the run summary) to
+the "pipeline" logger and to ../data_state/metrics/<run id>.jsonl, and the run's totals are written to
+../data_state/metrics/<run id>.prom when it finishes.
+
+    @pipeline_run("incrementalorders")
+    def incrementalorders_extract_upload(...): ...
+
+    with timed("write", "orders") as event:
+        ...
+        event["rows"] = len(df)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import ContextDecorator, contextmanager
+from datetime import datetime, timezone
+
+METRICS_LOC = "../data_state/metrics/"
+
+PREFIX = "shopify_pipeline"
+
+logger = logging.getLogger("pipeline")
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a log record as one json object per line, with the fields passed in extra={"fields": {...}}."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "event": record.getMessage(),
+            "run": current_run.run_id if current_run else None,
+            **getattr(record, "fields", {}),
+        }
+        return json.dumps(entry, default=str)
+
+
+def escape_label(value):
+    """Escapes a Prometheus label value (backslashes, double quotes and newlines)."""
+
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Thread-safe totals for the current run: per (stage, target) sums, labelled counters and gauges."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+            self.counters = {}
+            self.gauges = {}
+
+    def observe(self, stage, target, seconds, rows=0, bytes_in=0, bytes_out=0, error=False):
+        with self.lock:
+            totals = self.stages.setdefault(
+                (stage, target),
+                {"calls": 0, "errors": 0, "seconds": 0.0, "rows": 0, "bytes_in": 0, "bytes_out": 0},
+            )
+            totals["calls"] += 1
+            totals["errors"] += int(error)
+            totals["seconds"] += seconds
+            totals["rows"] += rows
+            totals["bytes_in"] += bytes_in
+            totals["bytes_out"] += bytes_out
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def stage_totals(self, stage):
+        """Returns the totals of one stage summed over its targets."""
+
+        summed = {"calls": 0, "errors": 0, "seconds": 0.0, "rows": 0, "bytes_in": 0, "bytes_out": 0}
+        with self.lock:
+            for (s, target), totals in self.stages.items():
+                if s == stage:
+                    for field, value in totals.items():
+                        summed[field] += value
+        return summed
+
+    def summary(self):
+        """Returns {stage: totals} for every stage seen, for the run summary log line."""
+
+        with self.lock:
+            stages = {stage for stage, target in self.stages}
+        return {stage: self.stage_totals(stage) for stage in sorted(stages)}
+
+    def to_prometheus(self, **run_labels):
+        """Renders everything in the Prometheus text exposition format."""
+
+        def label_text(labels):
+            labels = {**run_labels, **labels}
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{escape_label(v)}"' for k, v in labels.items()) + "}"
+
+        lines = []
+
+        stage_metrics = [
+            ("calls", "stage_calls_total", "Calls per pipeline stage."),
+            ("errors", "stage_errors_total", "Failed calls per pipeline stage."),
+            ("seconds", "stage_seconds_total", "Seconds spent per pipeline stage, summed across threads."),
+            ("rows", "stage_rows_total", "Rows handled per pipeline stage."),
+            ("bytes_in", "stage_bytes_in_total", "Bytes received per pipeline stage."),
+            ("bytes_out", "stage_bytes_out_total", "Bytes written or sent per pipeline stage."),
+        ]
+
+        with self.lock:
+            for field, name, description in stage_metrics:
+                lines.append(f"# HELP {PREFIX}_{name} {description}")
+                lines.append(f"# TYPE {PREFIX}_{name} counter")
+                for (stage, target), totals in sorted(self.stages.items()):
+                    lines.append(
+                        f"{PREFIX}_{name}{label_text({'stage': stage, 'target': target})} {totals[field]}"
+                    )
+
+            for values, metric_type in ((self.counters, "counter"), (self.gauges, "gauge")):
+                for name in sorted({name for name, labels in values}):
+                    full_name = f"{PREFIX}_{name}_total" if metric_type == "counter" else f"{PREFIX}_{name}"
+                    lines.append(f"# TYPE {full_name} {metric_type}")
+                    for (n, labels), value in sorted(values.items()):
+                        if n == name:
+                            lines.append(f"{full_name}{label_text(dict(labels))} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def increment(name, value=1, **labels):
+    """Adds to a labelled counter, like increment("http_retries", endpoint="orders.json", reason="429")."""
+
+    registry.increment(name, value, **labels)
+
+
+def set_gauge(name, value, **labels):
+    """Sets a labelled gauge, like set_gauge("api_budget_remaining", 38, api="rest")."""
+
+    registry.set_gauge(name, value, **labels)
+
+
+def log_event(event, level=logging.DEBUG, **fields):
+    logger.log(level, event, extra={"fields": fields})
+
+
+@contextmanager
+def timed(stage, target="", **fields):
+    """
+    Times a block as one call of a stage (target is a low-cardinality label like an endpoint or table).
+    Yields a dict the block can fill with rows, bytes_in, bytes_out and any other fields to log.
+    """
+
+    event = {"rows": 0, "bytes_in": 0, "bytes_out": 0, **fields}
+    started = time.perf_counter()
+
+    try:
+        yield event
+    except BaseException as e:
+        event["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        registry.observe(
+            stage,
+            target,
+            seconds,
+            rows=event["rows"],
+            bytes_in=event["bytes_in"],
+            bytes_out=event["bytes_out"],
+            error="error" in event,
+        )
+        log_event(stage, stage=stage, target=target, seconds=round(seconds, 6), **event)
+
+
+class PipelineRun(ContextDecorator):
+    """
+    One job run: resets the registry, logs json lines to the run's .jsonl file, and writes the run's .prom file
+    when it finishes. Runs nest; only the outermost one starts and finishes the run.
+    """
+
+    def __init__(self, name, metrics_loc=METRICS_LOC):
+        self.name = name
+        self.metrics_loc = metrics_loc
+        self.run_id = None
+        self.depth = 0
+
+    def __enter__(self):
+        global current_run
+
+        if current_run is not None:
+            current_run.depth += 1
+            return current_run
+
+        self.depth = 1
+        self.run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.name}_{uuid.uuid4().hex[:6]}"
+        self.started = time.perf_counter()
+        current_run = self
+
+        registry.reset()
+
+        os.makedirs(self.metrics_loc, exist_ok=True)
+        self.handler = logging.FileHandler(os.path.join(self.metrics_loc, f"{self.run_id}.jsonl"))
+        self.handler.setFormatter(JsonFormatter())
+        self.handler.setLevel(logging.DEBUG)
+        logger.addHandler(self.handler)
+        if logger.level == logging.NOTSET or logger.level > logging.DEBUG:
+            logger.setLevel(logging.DEBUG)
+
+        log_event("run_started", logging.INFO, job=self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global current_run
+
+        run = current_run
+        run.depth -= 1
+        if run.depth > 0:
+            return False
+
+        seconds = time.perf_counter() - run.started
+        success = exc_type is None
+
+        registry.set_gauge("run_duration_seconds", round(seconds, 3))
+        registry.set_gauge("run_success", int(success))
+
+        log_event(
+            "run_finished",
+            logging.INFO,
+            job=run.name,
+            seconds=round(seconds, 3),
+            success=success,
+            stages=registry.summary(),
+        )
+
+        prom_path = os.path.join(run.metrics_loc, f"{run.run_id}.prom")
+        with open(prom_path, "w") as f:
+            f.write(registry.to_prometheus(job=run.name, run=run.run_id))
+
+        logger.removeHandler(run.handler)
+        run.handler.close()
+        current_run = None
+
+        print(f"Metrics written: {prom_path}")
+        return False
+
+
+current_run = None
+
+
+def pipeline_run(name, metrics_loc=METRICS_LOC):
+    """Returns a run context for a job, usable as a decorator or a with block (see PipelineRun)."""
+
+    return PipelineRun(name, metrics_loc)
@@ -0,0 +1,1017 @@
+"""
+Local stand-in for the Shopify Admin API, for measuring the extractors without a live store.
+
+Serves N generated products (with variants), customers and orders in the REST and GraphQL response shapes the
+extractors read, with:
+    REST    - products/customers/orders.json lists, orders/count.json, limit, fields, updated_at_min/max,
+              Link header page_info pagination, X-Shopify-Shop-Api-Call-Limit and 429s + Retry-After
+              once the leaky bucket overflows
+    both    - gzip/deflate response bodies when the client sends Accept-Encoding
+    GraphQL - products { variants }, product(id:) { variants } and productVariants connections with cursors and an
+              updated_at query filter,
+              extensions.cost with throttleStatus, and THROTTLED errors when the cost bucket runs dry
+    bulk    - bulkOperationRunQuery for orders { lineItems } and products { variants } queries, polled through
+              node(id:) or currentBulkOperation, and a JSONL result file (parent lines followed by their children,
+              with __parentId) served from /bulk/<n>.jsonl. The file is written on a background thread while the
+              operation is RUNNING; --bulk-file serves a canned JSONL file for every operation instead.
+
+Records are generated on request from their index (nothing is held in memory), so a million-order store costs
+nothing to start. updated_at increases with the index, so updated_at filters are a range of indexes.
+
+    python mock_shopify.py --orders 100000 --port 8765
+    client = ShopifyClient(base_url="http://127.0.0.1:8765/admin/api/2025-10")
+or set shopify_base_url=http://127.0.0.1:8765/admin/api/{api_version} for every client.
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+FIRST_NAMES = ["Ava", "Liam", "Mia", "Noah", "Emma", "Lucas", "Zoe", "Ethan", "Ivy", "Owen"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Patel", "Brown", "Nguyen", "Lopez", "Kim", "Clark", "Young"]
+CITIES = [
+    ("Austin", "Texas", "TX", "78701"),
+    ("Denver", "Colorado", "CO", "80202"),
+    ("Portland", "Oregon", "OR", "97201"),
+    ("Columbus", "Ohio", "OH", "43215"),
+    ("Raleigh", "North Carolina", "NC", "27601"),
+]
+VENDORS = ["Acme", "Northwind", "Globex", "Initech", "Umbrella"]
+PRODUCT_TYPES = ["Shirt", "Hat", "Mug", "Poster", "Sticker"]
+FINANCIAL_STATUSES = ["paid", "paid", "paid", "pending", "refunded", "partially_refunded"]
+SIZES = ["S", "M", "L", "XL", "XXL"]
+
+# id offsets, so ids look like Shopify's 13-14 digit ids and never collide across resources
+ID_BASE = {
+    "products": 7_000_000_000_000,
+    "variants": 40_000_000_000_000,
+    "customers": 6_000_000_000_000,
+    "orders": 5_000_000_000_000,
+    "line_items": 13_000_000_000_000,
+    "images": 30_000_000_000_000,
+    "options": 9_000_000_000_000,
+    "addresses": 8_000_000_000_000,
+}
+
+
+def iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S") + "-00:00"
+
+
+def parse_dt(value):
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def encode_token(state):
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def decode_token(token):
+    return json.loads(base64.urlsafe_b64decode(token.encode()))
+
+
+def money_set(amount):
+    money = {"amount": amount, "currency_code": "USD"}
+    return {"shop_money": money, "presentment_money": money}
+
+
+class MockStore:
+    """Deterministic generated store data. Record i of a resource is the same on every call for a given seed."""
+
+    def __init__(
+        self,
+        products=1000,
+        customers=1000,
+        orders=1000,
+        variants_per_product=3,
+        seed=0,
+        start=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        span=timedelta(days=365),
+    ):
+        self.counts = {"products": products, "customers": customers, "orders": orders}
+        self.variants_per_product = variants_per_product
+        self.seed = seed
+        self.start = start
+        self.span = span
+
+    def rng(self, resource, i):
+        return random.Random(f"{self.seed}-{resource}-{i}")
+
+    def updated_at(self, resource, i):
+        """updated_at of record i, spread evenly over the span and increasing with i."""
+
+        n = max(self.counts[resource], 1)
+        return self.start + self.span * (i / n)
+
+    def index_range(self, resource, updated_at_min=None, updated_at_max=None):
+        """Returns the [lo, hi) range of indexes whose updated_at is in [updated_at_min, updated_at_max]."""
+
+        n = self.counts[resource]
+
+        def first_index(predicate):
+            lo, hi = 0, n
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if predicate(self.updated_at(resource, mid)):
+                    hi = mid
+                else:
+                    lo = mid + 1
+            return lo
+
+        lo = first_index(lambda dt: dt >= updated_at_min) if updated_at_min else 0
+        hi = first_index(lambda dt: dt > updated_at_max) if updated_at_max else n
+
+        return lo, max(lo, hi)
+
+    def address(self, rng, address_id, customer_id, first_name, last_name, default=True):
+        city, province, province_code, zip_code = rng.choice(CITIES)
+        return {
+            "id": address_id,
+            "customer_id": customer_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "company": None,
+            "address1": f"{rng.randint(1, 9999)} Main St",
+            "address2": None,
+            "city": city,
+            "province": province,
+            "country": "United States",
+            "zip": zip_code,
+            "phone": None,
+            "name": f"{first_name} {last_name}",
+            "province_code": province_code,
+            "country_code": "US",
+            "country_name": "United States",
+            "default": default,
+        }
+
+    def variant(self, product_index, j, updated_at):
+        rng = self.rng("variants", product_index * self.variants_per_product + j)
+        product_id = ID_BASE["products"] + product_index
+        variant_id = ID_BASE["variants"] + product_index * self.variants_per_product + j
+        return {
+            "id": variant_id,
+            "product_id": product_id,
+            "title": SIZES[j % len(SIZES)],
+            "price": f"{rng.randint(500, 9000) / 100:.2f}",
+            "position": j + 1,
+            "inventory_policy": "deny",
+            "compare_at_price": None,
+            "option1": SIZES[j % len(SIZES)],
+            "option2": None,
+            "option3": None,
+            "created_at": iso(updated_at - timedelta(days=30)),
+            "updated_at": iso(updated_at),
+            "taxable": True,
+            "barcode": str(rng.randint(10**11, 10**12 - 1)),
+            "fulfillment_service": "manual",
+            "grams": rng.randint(50, 2000),
+            "inventory_management": "shopify",
+            "requires_shipping": True,
+            "sku": f"SKU-{product_index}-{j}",
+            "weight": 0.5,
+            "weight_unit": "lb",
+            "inventory_item_id": variant_id + 1,
+            "inventory_quantity": rng.randint(0, 500),
+            "old_inventory_quantity": 0,
+            "admin_graphql_api_id": f"gid://shopify/ProductVariant/{variant_id}",
+            "image_id": None,
+        }
+
+    def product(self, i):
+        rng = self.rng("products", i)
+        product_id = ID_BASE["products"] + i
+        updated_at = self.updated_at("products", i)
+        product_type = rng.choice(PRODUCT_TYPES)
+        title = f"{rng.choice(VENDORS)} {product_type} {i}"
+
+        variants = [self.variant(i, j, updated_at) for j in range(self.variants_per_product)]
+        images = [
+            {
+                "id": ID_BASE["images"] + i,
+                "alt": None,
+                "position": 1,
+                "product_id": product_id,
+                "created_at": iso(updated_at - timedelta(days=30)),
+                "updated_at": iso(updated_at),
+                "admin_graphql_api_id": f"gid://shopify/ProductImage/{ID_BASE['images'] + i}",
+                "width": 1024,
+                "height": 1024,
+                "src": f"https://cdn.shopify.com/s/files/1/mock/products/{i}.jpg",
+                "variant_ids": [],
+            }
+        ]
+
+        return {
+            "id": product_id,
+            "title": title,
+            "body_html": f"<p>{title}, " + "soft and durable, " * rng.randint(2, 12) + "</p>",
+            "vendor": rng.choice(VENDORS),
+            "product_type": product_type,
+            "created_at": iso(updated_at - timedelta(days=30)),
+            "handle": title.lower().replace(" ", "-"),
+            "updated_at": iso(updated_at),
+            "published_at": iso(updated_at - timedelta(days=29)),
+            "template_suffix": None,
+            "published_scope": "global",
+            "tags": ", ".join(rng.sample(["summer", "sale", "new", "gift", "classic"], 2)),
+            "status": "active",
+            "admin_graphql_api_id": f"gid://shopify/Product/{product_id}",
+            "variants": variants,
+            "options": [
+                {
+                    "id": ID_BASE["options"] + i,
+                    "product_id": product_id,
+                    "name": "Size",
+                    "position": 1,
+                    "values": [v["title"] for v in variants],
+                }
+            ],
+            "images": images,
+            "image": images[0],
+        }
+
+    def customer(self, i):
+        rng = self.rng("customers", i)
+        customer_id = ID_BASE["customers"] + i
+        updated_at = self.updated_at("customers", i)
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        address = self.address(rng, ID_BASE["addresses"] + i, customer_id, first_name, last_name)
+        orders_count = rng.randint(0, 12)
+
+        return {
+            "id": customer_id,
+            "created_at": iso(updated_at - timedelta(days=60)),
+            "updated_at": iso(updated_at),
+            "first_name": first_name,
+            "last_name": last_name,
+            "orders_count": orders_count,
+            "state": "enabled",
+            "total_spent": f"{orders_count * rng.randint(1000, 9000) / 100:.2f}",
+            "last_order_id": None,
+            "note": None,
+            "verified_email": True,
+            "multipass_identifier": None,
+            "tax_exempt": False,
+            "tags": "",
+            "last_order_name": None,
+            "email": f"{first_name.lower()}.{last_name.lower()}{i}@example.com",
+            "phone": None,
+            "currency": "USD",
+            "addresses": [address],
+            "tax_exemptions": [],
+            "email_marketing_consent": {
+                "state": "not_subscribed",
+                "opt_in_level": "single_opt_in",
+                "consent_updated_at": None,
+            },
+            "sms_marketing_consent": None,
+            "admin_graphql_api_id": f"gid://shopify/Customer/{customer_id}",
+            "default_address": address,
+        }
+
+    def order(self, i):
+        rng = self.rng("orders", i)
+        order_id = ID_BASE["orders"] + i
+        updated_at = self.updated_at("orders", i)
+        created_at = updated_at - timedelta(hours=rng.randint(0, 72))
+
+        customer_index = rng.randrange(max(self.counts["customers"], 1))
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        address = self.address(rng, None, ID_BASE["customers"] + customer_index, first_name, last_name)
+
+        line_items = []
+        for k in range(rng.randint(1, 5)):
+            product_index = rng.randrange(max(self.counts["products"], 1))
+            j = rng.randrange(self.variants_per_product)
+            variant = self.variant(product_index, j, updated_at)
+            line_item_id = ID_BASE["line_items"] + i * 10 + k
+            line_items.append(
+                {
+                    "id": line_item_id,
+                    "admin_graphql_api_id": f"gid://shopify/LineItem/{line_item_id}",
+                    "attributed_staffs": [],
+                    "current_quantity": 1,
+                    "fulfillable_quantity": 1,
+                    "fulfillment_service": "manual",
+                    "fulfillment_status": None,
+                    "gift_card": False,
+                    "grams": variant["grams"],
+                    "name": f"Product {product_index} - {variant['title']}",
+                    "price": variant["price"],
+                    "price_set": money_set(variant["price"]),
+                    "product_exists": True,
+                    "product_id": variant["product_id"],
+                    "properties": [],
+                    "quantity": rng.randint(1, 3),
+                    "requires_shipping": True,
+                    "sku": variant["sku"],
+                    "taxable": True,
+                    "title": f"Product {product_index}",
+                    "total_discount": "0.00",
+                    "total_discount_set": money_set("0.00"),
+                    "variant_id": variant["id"],
+                    "variant_inventory_management": "shopify",
+                    "variant_title": variant["title"],
+                    "vendor": rng.choice(VENDORS),
+                    "tax_lines": [],
+                    "duties": [],
+                    "discount_allocations": [],
+                }
+            )
+
+        subtotal = sum(float(li["price"]) * li["quantity"] for li in line_items)
+        tax = round(subtotal * 0.08, 2)
+        total = f"{subtotal + tax:.2f}"
+
+        return {
+            "id": order_id,
+            "admin_graphql_api_id": f"gid://shopify/Order/{order_id}",
+            "name": f"#{1001 + i}",
+            "order_number": 1001 + i,
+            "email": f"{first_name.lower()}.{last_name.lower()}@example.com",
+            "created_at": iso(created_at),
+            "updated_at": iso(updated_at),
+            "processed_at": iso(created_at),
+            "cancelled_at": None,
+            "cancel_reason": None,
+            "closed_at": None,
+            "currency": "USD",
+            "presentment_currency": "USD",
+            "financial_status": rng.choice(FINANCIAL_STATUSES),
+            "fulfillment_status": rng.choice([None, "fulfilled"]),
+            "source_name": "web",
+            "subtotal_price": f"{subtotal:.2f}",
+            "subtotal_price_set": money_set(f"{subtotal:.2f}"),
+            "total_tax": f"{tax:.2f}",
+            "total_tax_set": money_set(f"{tax:.2f}"),
+            "total_discounts": "0.00",
+            "total_discounts_set": money_set("0.00"),
+            "total_price": total,
+            "total_price_set": money_set(total),
+            "current_total_price": total,
+            "current_total_price_set": money_set(total),
+            "tags": "",
+            "test": False,
+            "customer": {
+                "id": ID_BASE["customers"] + customer_index,
+                "email": f"{first_name.lower()}.{last_name.lower()}@example.com",
+                "first_name": first_name,
+                "last_name": last_name,
+                "state": "enabled",
+                "currency": "USD",
+                "admin_graphql_api_id": f"gid://shopify/Customer/{ID_BASE['customers'] + customer_index}",
+            },
+            "billing_address": address,
+            "shipping_address": address,
+            "line_items": line_items,
+        }
+
+    def record(self, resource, i):
+        return {"products": self.product, "customers": self.customer, "orders": self.order}[resource](i)
+
+    def write_bulk_orders(self, f, updated_at_min=None):
+        """Writes the bulk JSONL lines of orders { lineItems } to f. Returns the number of lines."""
+
+        lo, hi = self.index_range("orders", updated_at_min)
+        count = 0
+
+        for i in range(lo, hi):
+            order = self.order(i)
+            order_gid = gid("Order", order["id"])
+            lines = [graphql_order_node(order)] + [
+                {**graphql_line_item_node(li), "__parentId": order_gid} for li in order["line_items"]
+            ]
+            for line in lines:
+                f.write(json.dumps(line) + "\n")
+            count += len(lines)
+
+        return count
+
+    def write_bulk_products(self, f):
+        """Writes the bulk JSONL lines of products { variants } to f. Returns the number of lines."""
+
+        count = 0
+
+        for i in range(self.counts["products"]):
+            product = self.product(i)
+            product_gid = gid("Product", product["id"])
+            lines = [graphql_product_node(product)] + [
+                {**graphql_variant_node(v), "__parentId": product_gid} for v in product["variants"]
+            ]
+            for line in lines:
+                f.write(json.dumps(line) + "\n")
+            count += len(lines)
+
+        return count
+
+
+class RateLimiter:
+    """Server side REST leaky bucket and GraphQL cost bucket, like Shopify's standard plan limits by default."""
+
+    def __init__(self, rest_bucket_size=40, rest_leak_rate=2.0, gql_maximum=1000, gql_restore_rate=50.0):
+        self.rest_bucket_size = rest_bucket_size
+        self.rest_leak_rate = rest_leak_rate
+        self.rest_used = 0.0
+        self.rest_checked_at = time.monotonic()
+
+        self.gql_maximum = gql_maximum
+        self.gql_restore_rate = gql_restore_rate
+        self.gql_available = float(gql_maximum)
+        self.gql_checked_at = time.monotonic()
+
+        self.lock = threading.Lock()
+
+    def take_rest_call(self):
+        """Returns (allowed, calls in the bucket after this one)."""
+
+        with self.lock:
+            now = time.monotonic()
+            self.rest_used = max(0.0, self.rest_used - (now - self.rest_checked_at) * self.rest_leak_rate)
+            self.rest_checked_at = now
+
+            if self.rest_used + 1 > self.rest_bucket_size:
+                return False, self.rest_used
+
+            self.rest_used += 1
+            return True, self.rest_used
+
+    def take_graphql_cost(self, requested_cost, actual_cost):
+        """Returns (allowed, throttleStatus). The requested cost must be available; the actual cost is charged."""
+
+        with self.lock:
+            now = time.monotonic()
+            self.gql_available = min(
+                self.gql_maximum,
+                self.gql_available + (now - self.gql_checked_at) * self.gql_restore_rate,
+            )
+            self.gql_checked_at = now
+
+            allowed = requested_cost <= self.gql_available
+            if allowed:
+                self.gql_available -= actual_cost
+
+            status = {
+                "maximumAvailable": float(self.gql_maximum),
+                "currentlyAvailable": int(self.gql_available),
+                "restoreRate": float(self.gql_restore_rate),
+            }
+            return allowed, status
+
+
+def graphql_argument(query, field, argument, variables, default=None):
+    """Reads an argument of a field in a query, like products(first: 50) or products(first: $first)."""
+
+    match = re.search(rf"\b{field}\s*\(([^)]*)\)", query)
+    if not match:
+        return default
+
+    arg = re.search(rf"\b{argument}\s*:\s*(\$\w+|\d+|\"[^\"]*\")", match.group(1))
+    if not arg:
+        return default
+
+    value = arg.group(1)
+    if value.startswith("$"):
+        return variables.get(value[1:], default)
+    if value.startswith('"'):
+        return value.strip('"')
+    return int(value)
+
+
+def gid(kind, numeric_id):
+    return f"gid://shopify/{kind}/{numeric_id}"
+
+
+def graphql_variant_node(variant, product=None):
+    node = {
+        "id": gid("ProductVariant", variant["id"]),
+        "title": variant["title"],
+        "sku": variant["sku"],
+        "price": variant["price"],
+        "inventoryQuantity": variant["inventory_quantity"],
+        "barcode": variant["barcode"],
+        "updatedAt": variant["updated_at"],
+    }
+    if product is not None:
+        node["product"] = {
+            "id": gid("Product", product["id"]),
+            "title": product["title"],
+            "handle": product["handle"],
+        }
+    return node
+
+
+def graphql_product_node(product):
+    return {
+        "id": gid("Product", product["id"]),
+        "title": product["title"],
+        "handle": product["handle"],
+        "vendor": product["vendor"],
+        "productType": product["product_type"],
+        "status": product["status"].upper(),
+        "createdAt": product["created_at"],
+        "updatedAt": product["updated_at"],
+    }
+
+
+def graphql_order_node(order):
+    fulfillment_status = {"fulfilled": "FULFILLED", "partial": "PARTIALLY_FULFILLED"}.get(
+        order["fulfillment_status"], "UNFULFILLED"
+    )
+    return {
+        "id": gid("Order", order["id"]),
+        "name": order["name"],
+        "email": order["email"],
+        "createdAt": order["created_at"],
+        "updatedAt": order["updated_at"],
+        "processedAt": order["processed_at"],
+        "cancelledAt": order["cancelled_at"],
+        "displayFinancialStatus": order["financial_status"].upper(),
+        "displayFulfillmentStatus": fulfillment_status,
+        "currencyCode": order["currency"],
+        "customer": {"id": gid("Customer", order["customer"]["id"])},
+        "totalPriceSet": {"shopMoney": {"amount": order["total_price"]}},
+        "subtotalPriceSet": {"shopMoney": {"amount": order["subtotal_price"]}},
+    }
+
+
+def graphql_line_item_node(line_item):
+    return {
+        "id": gid("LineItem", line_item["id"]),
+        "name": line_item["name"],
+        "sku": line_item["sku"],
+        "quantity": line_item["quantity"],
+        "vendor": line_item["vendor"],
+        "variant": {"id": gid("ProductVariant", line_item["variant_id"])},
+        "originalUnitPriceSet": {"shopMoney": {"amount": line_item["price"]}},
+    }
+
+
+class BulkOperations:
+    """
+    The mock's bulk operations, one at a time like Shopify's per app and shop. Each runs on a background thread
+    that writes its JSONL result file (or takes the canned bulk_file), and is COMPLETED once the file is written.
+    """
+
+    def __init__(self, store, bulk_file=None):
+        self.store = store
+        self.bulk_file = bulk_file
+        self.folder = tempfile.mkdtemp(prefix="mock_shopify_bulk_")
+        self.operations = {}
+        self.lock = threading.Lock()
+
+    def current(self):
+        with self.lock:
+            return self.operations[max(self.operations)] if self.operations else None
+
+    def start(self, bulk_query):
+        """Starts an operation for a bulk query. Returns (operation, user errors)."""
+
+        if re.search(r"\borders\s*\(", bulk_query):
+            filter_match = re.search(r"updated_at:>=?'([^']+)'", bulk_query)
+            updated_at_min = parse_dt(filter_match.group(1)) if filter_match else None
+            write = lambda f: self.store.write_bulk_orders(f, updated_at_min)
+        elif re.search(r"\bproducts\b", bulk_query):
+            write = self.store.write_bulk_products
+        else:
+            return None, [{"field": ["query"], "message": "Unsupported bulk query for the mock server"}]
+
+        with self.lock:
+            if any(op["status"] in ("CREATED", "RUNNING") for op in self.operations.values()):
+                return None, [
+                    {
+                        "field": None,
+                        "message": "A bulk query operation for this app and shop is already in progress",
+                    }
+                ]
+
+            n = len(self.operations) + 1
+            operation = {
+                "n": n,
+                "id": gid("BulkOperation", n),
+                "status": "RUNNING",
+                "errorCode": None,
+                "objectCount": "0",
+                "path": None,
+            }
+            self.operations[n] = operation
+
+        threading.Thread(target=self.run, args=(operation, write), daemon=True).start()
+        return operation, []
+
+    def run(self, operation, write):
+        try:
+            if self.bulk_file:
+                with open(self.bulk_file) as f:
+                    count = sum(1 for line in f if line.strip())
+                path = self.bulk_file
+            else:
+                path = os.path.join(self.folder, f"{operation['n']}.jsonl")
+                with open(path, "w") as f:
+                    count = write(f)
+        except Exception:
+            operation.update(status="FAILED", errorCode="INTERNAL_SERVER_ERROR")
+            raise
+
+        operation.update(status="COMPLETED", objectCount=str(count), path=path if count else None)
+
+    def get(self, operation_gid):
+        number = str(operation_gid).rsplit("/", 1)[-1]
+        with self.lock:
+            return self.operations.get(int(number)) if number.isdigit() else None
+
+
+class MockShopifyHandler(BaseHTTPRequestHandler):
+    """Routes Admin API requests to the server's MockStore."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def store(self):
+        return self.server.store
+
+    @property
+    def limiter(self):
+        return self.server.limiter
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+
+        accept_encoding = self.headers.get("Accept-Encoding", "")
+        encoding = None
+        if self.server.compress and "gzip" in accept_encoding:
+            payload, encoding = gzip.compress(payload, compresslevel=5), "gzip"
+        elif self.server.compress and "deflate" in accept_encoding:
+            payload, encoding = zlib.compress(payload, 5), "deflate"
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def api_path(self):
+        """Returns the path after /admin/api/<version>/, like "orders.json"."""
+
+        path = urlparse(self.path).path
+        match = re.match(r"^/admin/api/[^/]+/(.+)$", path)
+        return match.group(1) if match else None
+
+    def do_GET(self):
+        bulk_match = re.match(r"^/bulk/(\d+)\.jsonl$", urlparse(self.path).path)
+        if bulk_match:
+            self.send_bulk_file(int(bulk_match.group(1)))
+            return
+
+        resource_path = self.api_path()
+        query = {k: v[-1] for k, v in parse_qs(urlparse(self.path).query).items()}
+
+        allowed, used = self.limiter.take_rest_call()
+        call_limit = {
+            "X-Shopify-Shop-Api-Call-Limit": f"{round(used)}/{self.limiter.rest_bucket_size}"
+        }
+
+        if not allowed or random.random() < self.server.error_rate:
+            self.send_json(
+                429,
+                {"errors": "Exceeded 2 calls per second for api client. Reduce request rates to resume uninterrupted service."},
+                {**call_limit, "Retry-After": "1.0"},
+            )
+            return
+
+        if resource_path == "orders/count.json":
+            lo, hi = self.filtered_range("orders", query)
+            self.send_json(200, {"count": hi - lo}, call_limit)
+            return
+
+        resource = resource_path[: -len(".json")] if resource_path and resource_path.endswith(".json") else None
+        if resource not in self.store.counts:
+            self.send_json(404, {"errors": "Not Found"}, call_limit)
+            return
+
+        self.send_list(resource, query, call_limit)
+
+    def send_bulk_file(self, n):
+        """Serves a bulk operation's JSONL result file, like the signed storage url Shopify hands out (no rate limit)."""
+
+        operation = self.server.bulk.operations.get(n)
+        if not operation or not operation["path"]:
+            self.send_json(404, {"errors": "Not Found"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/jsonl")
+        self.send_header("Content-Length", str(os.path.getsize(operation["path"])))
+        self.end_headers()
+        with open(operation["path"], "rb") as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def filtered_range(self, resource, query):
+        updated_at_min = parse_dt(query["updated_at_min"]) if query.get("updated_at_min") else None
+        updated_at_max = parse_dt(query["updated_at_max"]) if query.get("updated_at_max") else None
+        return self.store.index_range(resource, updated_at_min, updated_at_max)
+
+    def send_list(self, resource, query, headers):
+        limit = min(int(query.get("limit", 50)), 250)
+
+        if "page_info" in query:
+            # like Shopify, a page_info url only carries limit (and fields) beside the cursor
+            state = decode_token(query["page_info"])
+            lo, hi = state["lo"], state["hi"]
+        else:
+            lo, hi = self.filtered_range(resource, query)
+
+        end = min(lo + limit, hi)
+        records = [self.store.record(resource, i) for i in range(lo, end)]
+
+        if query.get("fields"):
+            fields = query["fields"].split(",")
+            records = [{k: r[k] for k in fields if k in r} for r in records]
+
+        links = []
+        base = f"http://{self.headers['Host']}{urlparse(self.path).path}"
+        page_params = {"limit": limit}
+        if query.get("fields"):
+            page_params["fields"] = query["fields"]
+
+        if end < hi:
+            next_params = {**page_params, "page_info": encode_token({"lo": end, "hi": hi})}
+            links.append(f'<{base}?{urlencode(next_params)}>; rel="next"')
+        if lo > 0 and "page_info" in query:
+            previous_params = {**page_params, "page_info": encode_token({"lo": max(0, lo - limit), "hi": hi})}
+            links.append(f'<{base}?{urlencode(previous_params)}>; rel="previous"')
+
+        if links:
+            headers = {**headers, "Link": ", ".join(links)}
+
+        self.send_json(200, {resource: records}, headers)
+
+    def do_POST(self):
+        if self.api_path() != "graphql.json":
+            self.send_json(404, {"errors": "Not Found"})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        query = body.get("query", "")
+        variables = body.get("variables") or {}
+
+        if re.search(r"\bbulkOperationRunQuery\s*\(", query):
+            data, requested, actual = self.bulk_operation_run_query(variables)
+        elif re.search(r"\bcurrentBulkOperation\b", query) or re.search(r"\bnode\s*\(", query):
+            data, requested, actual = self.bulk_operation(query, variables)
+        elif re.search(r"\bproductVariants\s*\(", query):
+            data, requested, actual = self.product_variants(query, variables)
+        elif re.search(r"\bproducts\s*\(", query):
+            data, requested, actual = self.products(query, variables)
+        elif re.search(r"\bproduct\s*\(", query):
+            data, requested, actual = self.product_variant_page(query, variables)
+        else:
+            self.send_json(200, {"errors": [{"message": "Unsupported query for the mock server"}]})
+            return
+
+        allowed, status = self.limiter.take_graphql_cost(requested, actual)
+        cost = {
+            "requestedQueryCost": requested,
+            "actualQueryCost": actual if allowed else None,
+            "throttleStatus": status,
+        }
+
+        if not allowed:
+            self.send_json(
+                200,
+                {
+                    "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+                    "extensions": {"cost": cost},
+                },
+            )
+            return
+
+        self.send_json(200, {"data": data, "extensions": {"cost": cost}})
+
+    def bulk_operation_fields(self, operation):
+        if operation is None:
+            return None
+        url = (
+            f"http://{self.headers['Host']}/bulk/{operation['n']}.jsonl"
+            if operation["status"] == "COMPLETED" and operation["path"]
+            else None
+        )
+        return {
+            "id": operation["id"],
+            "status": operation["status"],
+            "errorCode": operation["errorCode"],
+            "objectCount": operation["objectCount"],
+            "url": url,
+        }
+
+    def bulk_operation_run_query(self, variables):
+        operation, user_errors = self.server.bulk.start(variables.get("query") or "")
+        bulk_operation = {"id": operation["id"], "status": operation["status"]} if operation else None
+        return {"bulkOperationRunQuery": {"bulkOperation": bulk_operation, "userErrors": user_errors}}, 10, 10
+
+    def bulk_operation(self, query, variables):
+        """node(id:) { ... on BulkOperation } and currentBulkOperation, for polling a bulk operation."""
+
+        if re.search(r"\bcurrentBulkOperation\b", query):
+            return {"currentBulkOperation": self.bulk_operation_fields(self.server.bulk.current())}, 1, 1
+
+        operation = self.server.bulk.get(graphql_argument(query, "node", "id", variables, ""))
+        return {"node": self.bulk_operation_fields(operation)}, 1, 1
+
+    def connection_page(self, query, field, variables, lo, hi):
+        """Returns (start, end) of the page a connection's first/after arguments select from [lo, hi)."""
+
+        first = int(graphql_argument(query, field, "first", variables, 50))
+        after = graphql_argument(query, field, "after", variables)
+
+        start = decode_token(after)["i"] + 1 if after else lo
+        return start, min(start + first, hi), first
+
+    def products(self, query, variables):
+        lo, hi = 0, self.store.counts["products"]
+        start, end, first = self.connection_page(query, "products", variables, lo, hi)
+        variants_first = int(graphql_argument(query, "variants", "first", variables, 0) or 0)
+
+        edges = []
+        actual = 2
+        for i in range(start, end):
+            product = self.store.product(i)
+            variants = product["variants"][:variants_first]
+            actual += 1 + len(variants)
+            edges.append(
+                {
+                    "cursor": encode_token({"i": i}),
+                    "node": {
+                        "id": gid("Product", product["id"]),
+                        "title": product["title"],
+                        "handle": product["handle"],
+                        "variants": {
+                            "edges": [
+                                {"cursor": encode_token({"i": j}), "node": graphql_variant_node(v)}
+                                for j, v in enumerate(variants)
+                            ],
+                            "pageInfo": {
+                                "hasNextPage": len(product["variants"]) > variants_first,
+                                "endCursor": encode_token({"i": len(variants) - 1}) if variants else None,
+                            },
+                        },
+                    },
+                }
+            )
+
+        page = {
+            "edges": edges,
+            "pageInfo": {
+                "hasNextPage": end < hi,
+                "endCursor": edges[-1]["cursor"] if edges else None,
+            },
+        }
+
+        return {"products": page}, 2 + first * (1 + variants_first), actual
+
+    def product_variant_page(self, query, variables):
+        """product(id:) { variants(first:, after:) }, for paging through one product's variants."""
+
+        product_id = str(graphql_argument(query, "product", "id", variables, ""))
+        i = int(product_id.rsplit("/", 1)[-1]) - ID_BASE["products"]
+        if not 0 <= i < self.store.counts["products"]:
+            return {"product": None}, 1, 1
+
+        product = self.store.product(i)
+        start, end, first = self.connection_page(query, "variants", variables, 0, len(product["variants"]))
+
+        edges = [
+            {"cursor": encode_token({"i": j}), "node": graphql_variant_node(product["variants"][j])}
+            for j in range(start, end)
+        ]
+
+        page = {
+            "edges": edges,
+            "pageInfo": {
+                "hasNextPage": end < len(product["variants"]),
+                "endCursor": edges[-1]["cursor"] if edges else None,
+            },
+        }
+
+        return {"product": {"variants": page}}, 3 + first, 3 + len(edges)
+
+    def product_variants(self, query, variables):
+        # the mock filters on updated_at:>'...' only, like get_incremental_product_variants_df sends
+        filter_match = re.search(r"updated_at:>'([^']+)'", variables.get("query") or "")
+        updated_at_min = parse_dt(filter_match.group(1)) if filter_match else None
+
+        lo, hi = self.store.index_range("products", updated_at_min)
+        per_product = self.store.variants_per_product
+        start, end, first = self.connection_page(
+            query, "productVariants", variables, lo * per_product, hi * per_product
+        )
+
+        edges = []
+        for v in range(start, end):
+            product = self.store.product(v // per_product)
+            variant = product["variants"][v % per_product]
+            edges.append({"cursor": encode_token({"i": v}), "node": graphql_variant_node(variant, product)})
+
+        page = {
+            "edges": edges,
+            "pageInfo": {
+                "hasNextPage": end < hi * per_product,
+                "endCursor": edges[-1]["cursor"] if edges else None,
+            },
+        }
+
+        return {"productVariants": page}, 2 + first, 2 + len(edges)
+
+
+def make_server(
+    store, host="127.0.0.1", port=8765, limiter=None, error_rate=0.0, compress=True, bulk_file=None
+):
+    """
+    Returns a ThreadingHTTPServer serving the store. error_rate is the share of REST calls answered with a 429;
+    compress=False ignores Accept-Encoding and always sends plain json; bulk_file is a canned JSONL file served as
+    the result of every bulk operation, instead of one generated from the store.
+    """
+
+    server = ThreadingHTTPServer((host, port), MockShopifyHandler)
+    server.daemon_threads = True
+    server.store = store
+    server.limiter = limiter or RateLimiter()
+    server.error_rate = error_rate
+    server.compress = compress
+    server.bulk = BulkOperations(store, bulk_file)
+    return server
+
+
+def start_mock_server(
+    store, host="127.0.0.1", port=0, limiter=None, error_rate=0.0, compress=True, bulk_file=None
+):
+    """Starts a mock server on a background thread (port 0 picks a free port). Returns (server, api base url)."""
+
+    server = make_server(store, host, port, limiter, error_rate, compress, bulk_file)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/admin/api/2025-10"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a generated Shopify store locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--variants-per-product", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rest-bucket-size", type=int, default=40)
+    parser.add_argument("--rest-leak-rate", type=float, default=2.0)
+    parser.add_argument("--graphql-maximum", type=int, default=1000)
+    parser.add_argument("--graphql-restore-rate", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--no-compression", action="store_true")
+    parser.add_argument("--bulk-file", help="canned JSONL file served as every bulk operation's result")
+    args = parser.parse_args()
+
+    mock_store = MockStore(
+        products=args.products,
+        customers=args.customers,
+        orders=args.orders,
+        variants_per_product=args.variants_per_product,
+        seed=args.seed,
+    )
+    rate_limiter = RateLimiter(
+        args.rest_bucket_size, args.rest_leak_rate, args.graphql_maximum, args.graphql_restore_rate
+    )
+
+    server = make_server(
+        mock_store,
+        args.host,
+        args.port,
+        rate_limiter,
+        args.error_rate,
+        not args.no_compression,
+        args.bulk_file,
+    )
+    print(f"Mock Shopify store on http://{args.host}:{args.port}/admin/api/<version>/ {mock_store.counts}")
+    server.serve_forever()
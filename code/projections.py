@@ -0,0 +1,131 @@
+"""
+Per-entity field projections for the Shopify extractors, so only the fields the warehouse keeps cross the wire.
+
+REST_FIELDS become the REST fields= parameter (top-level fields only; nested objects come back whole). They follow
+what the dbt staging models read from raw: the orders/customers/products staging models pass every kept raw column
+through, and the JSON-unnesting models read the line_items, addresses, images and options arrays, so each list is
+the entity's raw columns minus those dropped at extraction anyway (schemas.DROP_COLUMNS: admin api ids, *_set money
+bags, product body_html and image) and opaque tokens/urls nothing reads.
+
+GraphQL extractors build their selection sets from column -> field maps (see selection_set), so the query asks for
+exactly the columns the df gets.
+"""
+
+REST_FIELDS = {
+    "orders": [
+        "id",
+        "name",
+        "order_number",
+        "email",
+        "created_at",
+        "updated_at",
+        "processed_at",
+        "cancelled_at",
+        "cancel_reason",
+        "closed_at",
+        "currency",
+        "presentment_currency",
+        "financial_status",
+        "fulfillment_status",
+        "source_name",
+        "subtotal_price",
+        "total_tax",
+        "total_discounts",
+        "total_price",
+        "current_total_price",
+        "total_line_items_price",
+        "total_weight",
+        "taxes_included",
+        "tags",
+        "test",
+        "discount_codes",
+        "customer",
+        "billing_address",
+        "shipping_address",
+        "shipping_lines",
+        "line_items",
+    ],
+    "customers": [
+        "id",
+        "created_at",
+        "updated_at",
+        "first_name",
+        "last_name",
+        "orders_count",
+        "state",
+        "total_spent",
+        "last_order_id",
+        "last_order_name",
+        "note",
+        "verified_email",
+        "tax_exempt",
+        "tags",
+        "email",
+        "phone",
+        "currency",
+        "addresses",
+        # read by shopify_simulation.StoreSnapshot
+        "default_address",
+        "email_marketing_consent",
+        "sms_marketing_consent",
+    ],
+    "products": [
+        "id",
+        "title",
+        "vendor",
+        "product_type",
+        "created_at",
+        "handle",
+        "updated_at",
+        "published_at",
+        "published_scope",
+        "tags",
+        "status",
+        "variants",
+        "options",
+        "images",
+    ],
+}
+
+# df column -> GraphQL field, for the product variant extractors
+GRAPHQL_PRODUCT_COLUMNS = {
+    "product_id": "id",
+    "product_title": "title",
+    "product_handle": "handle",
+}
+
+GRAPHQL_VARIANT_COLUMNS = {
+    "variant_id": "id",
+    "variant_title": "title",
+    "sku": "sku",
+    "price": "price",
+    "inventory_quantity": "inventoryQuantity",
+    "barcode": "barcode",
+    "updated_at": "updatedAt",
+}
+
+
+def rest_fields_param(resource):
+    """Returns the fields= value for a REST resource, or None to request every field."""
+
+    fields = REST_FIELDS.get(resource)
+    return ",".join(fields) if fields else None
+
+
+def rest_params(resource, params):
+    """Adds the resource's fields= projection to a dict of REST list params."""
+
+    fields = rest_fields_param(resource)
+    return {**params, "fields": fields} if fields else params
+
+
+def selection_set(columns):
+    """Returns the GraphQL fields of a column -> field map as a selection set body, like "id title handle"."""
+
+    return " ".join(dict.fromkeys(columns.values()))
+
+
+def project_node(node, columns):
+    """Maps a GraphQL node back to df columns with a column -> field map."""
+
+    return {column: node[field] for column, field in columns.items()}
@@ -0,0 +1,155 @@
+"""
+Preloaded samplers for simulated customer data.
+
+The ZIP table is read once into numpy arrays with a cumulative population weight table, and Faker is only used to
+build small name/street pools up front, so N locations or identities can be drawn in one vectorized call.
+random_number_exp_array and random_dates_last_24_months are vectorized twins of the shopify_simulation helpers.
+
+    sampler = get_customer_sampler()
+    payloads = sampler.sample(100_000)
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from faker import Faker
+
+ZIPS_LOC = "../data_supp/uszips.csv"
+
+
+def random_number_exp_array(rng, min_qty, max_qty, weight, n):
+    """n draws of shopify_simulation.random_number_exp at once: ints biased toward min_qty (max_qty itself is never drawn)."""
+
+    return (min_qty + (max_qty - min_qty) * rng.random(n) ** weight).astype(np.int64)
+
+
+def random_dates_last_24_months(rng, n, now):
+    """n draws of shopify_simulation.pick_random_date_last_24_months at once, before now (an aware datetime), as UTC timestamps."""
+
+    start = now - timedelta(days=365 * 2)
+    seconds = rng.integers(0, int((now - start).total_seconds()) + 1, n)
+
+    return pd.Timestamp(start).tz_convert("UTC") + pd.to_timedelta(seconds, unit="s")
+
+
+class LocationSampler:
+    """
+    Draws population-weighted US city/state/zip locations.
+
+    Uses dataset from here: https://www.kaggle.com/datasets/bwandowando/us-zip-codes-database-from-simplemaps-com?resource=download
+    """
+
+    def __init__(self, dataloc=ZIPS_LOC, seed=None):
+        # ensure leading zeros on zip are retained
+        df = pd.read_csv(
+            dataloc,
+            dtype={"zip": str},
+            usecols=["zip", "city", "state_id", "population"],
+        )
+        df = df[df["population"].fillna(0) > 0]
+
+        self.city = df["city"].to_numpy(dtype=object)
+        self.state = df["state_id"].to_numpy(dtype=object)
+        self.zip = df["zip"].to_numpy(dtype=object)
+
+        # cumulative weights, so a draw is a binary search for a uniform number in [0, total)
+        self.cum_weights = np.cumsum(df["population"].to_numpy(dtype=np.float64))
+        self.total_weight = self.cum_weights[-1]
+
+        self.rng = np.random.default_rng(seed)
+
+    def sample_indexes(self, n):
+        """Returns n population-weighted row indexes into the ZIP arrays."""
+
+        draws = self.rng.random(n) * self.total_weight
+        return np.searchsorted(self.cum_weights, draws, side="right")
+
+    def sample(self, n):
+        """Returns (cities, states, zips) arrays of n population-weighted locations."""
+
+        idx = self.sample_indexes(n)
+        return self.city[idx], self.state[idx], self.zip[idx]
+
+
+class IdentitySampler:
+    """Draws fake names, street addresses and emails from pools built once with a single Faker instance."""
+
+    def __init__(self, pool_size=2000, seed=None):
+        fake = Faker()
+        if seed is not None:
+            Faker.seed(seed)
+
+        self.first_names = np.array([fake.first_name() for _ in range(pool_size)], dtype=object)
+        self.last_names = np.array([fake.last_name() for _ in range(pool_size)], dtype=object)
+        self.street_names = np.array([fake.street_name() for _ in range(pool_size)], dtype=object)
+        self.email_domains = np.array(
+            sorted({fake.free_email_domain() for _ in range(50)}), dtype=object
+        )
+
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self, n):
+        """Returns (first names, last names, address1s, emails) arrays for n fake identities."""
+
+        rng = self.rng
+
+        first = self.first_names[rng.integers(0, len(self.first_names), n)]
+        last = self.last_names[rng.integers(0, len(self.last_names), n)]
+        streets = self.street_names[rng.integers(0, len(self.street_names), n)]
+        domains = self.email_domains[rng.integers(0, len(self.email_domains), n)]
+        house_numbers = rng.integers(1, 10000, n)
+        email_numbers = rng.integers(0, 1_000_000, n)
+
+        address1 = [f"{h} {s}" for h, s in zip(house_numbers, streets)]
+        emails = [
+            f"{f}.{l}{num}@{d}".lower().replace(" ", "")
+            for f, l, num, d in zip(first, last, email_numbers, domains)
+        ]
+
+        return first, last, address1, emails
+
+
+class CustomerSampler:
+    """Draws complete fake customer payloads (name, address, email) with population-weighted locations."""
+
+    def __init__(self, dataloc=ZIPS_LOC, seed=None):
+        self.locations = LocationSampler(dataloc, seed=seed)
+        self.identities = IdentitySampler(seed=seed)
+
+    def sample(self, n):
+        """
+        Returns a list of n dicts of firstName, lastName, address1, city, province, country (US is hardcoded), zip
+        and email, the same shape get_fake_nameaddressemail_dict returns.
+        """
+
+        first, last, address1, emails = self.identities.sample(n)
+        cities, states, zips = self.locations.sample(n)
+
+        return [
+            {
+                "firstName": first[i],
+                "lastName": last[i],
+                "address1": address1[i],
+                "city": cities[i],
+                "province": states[i],
+                "country": "US",
+                "zip": zips[i],
+                "email": emails[i],
+            }
+            for i in range(n)
+        ]
+
+
+customer_sampler = None
+
+
+def get_customer_sampler():
+    """Returns the shared CustomerSampler, loading the ZIP table on first use."""
+
+    global customer_sampler
+
+    if customer_sampler is None:
+        customer_sampler = CustomerSampler()
+
+    return customer_sampler
@@ -0,0 +1,357 @@
+"""
+Per-entity raw table schemas.
+
+Types are applied to the df when the raw file is written (so parquet carries real INT64 / TIMESTAMP / NUMERIC
+columns instead of strings) and passed to the warehouse at load. Raw tables with an updated_at are created
+day-partitioned on it and clustered on their id, so watermark and dedup queries prune to recent partitions.
+
+The extractors also compact each df as it is normalized (see compact_df): schema columns get memory-light pandas
+dtypes, low-cardinality strings become categoricals and columns duplicated elsewhere are dropped.
+
+Entities are named like the raw tables without the "_raw" suffix. Columns not listed keep their inferred type, except
+that string columns (including all-null ones) are always written as strings, so a batch where a nullable text field
+like cancel_reason happens to be empty doesn't create or load it as an INTEGER column.
+"""
+
+from decimal import Decimal
+from fnmatch import fnmatch
+
+import pandas as pd
+
+SCHEMAS = {
+    "orders": {
+        "id": "INT64",
+        "order_number": "INT64",
+        "customer_id": "INT64",
+        "created_at": "TIMESTAMP",
+        "updated_at": "TIMESTAMP",
+        "processed_at": "TIMESTAMP",
+        "cancelled_at": "TIMESTAMP",
+        "closed_at": "TIMESTAMP",
+        "total_price": "NUMERIC",
+        "subtotal_price": "NUMERIC",
+        "total_tax": "NUMERIC",
+        "total_discounts": "NUMERIC",
+        "current_total_price": "NUMERIC",
+        "financial_status": "STRING",
+        "fulfillment_status": "STRING",
+        "currency": "STRING",
+        "cancel_reason": "STRING",
+        "source_name": "STRING",
+        "line_items": "STRING",
+    },
+    "orders_lineitems": {
+        "id": "INT64",
+        "order_id": "INT64",
+        "product_id": "INT64",
+        "variant_id": "INT64",
+        "quantity": "INT64",
+        "price": "NUMERIC",
+        "total_discount": "NUMERIC",
+    },
+    # GraphQL bulk orders (shopify_bulk.py), named like the REST fields but only the ones the bulk query selects
+    "orders_bulk": {
+        "id": "INT64",
+        "customer_id": "INT64",
+        "created_at": "TIMESTAMP",
+        "updated_at": "TIMESTAMP",
+        "processed_at": "TIMESTAMP",
+        "cancelled_at": "TIMESTAMP",
+        "total_price": "NUMERIC",
+        "subtotal_price": "NUMERIC",
+        "name": "STRING",
+        "email": "STRING",
+        "financial_status": "STRING",
+        "fulfillment_status": "STRING",
+        "currency": "STRING",
+    },
+    "orders_bulk_lineitems": {
+        "id": "INT64",
+        "order_id": "INT64",
+        "variant_id": "INT64",
+        "quantity": "INT64",
+        "price": "NUMERIC",
+        "name": "STRING",
+        "sku": "STRING",
+        "vendor": "STRING",
+    },
+    "customers": {
+        "id": "INT64",
+        "created_at": "TIMESTAMP",
+        "updated_at": "TIMESTAMP",
+        "orders_count": "INT64",
+        "total_spent": "NUMERIC",
+        "default_address_id": "INT64",
+        "note": "STRING",
+        "addresses": "STRING",
+    },
+    "customers_addresses": {
+        "id": "INT64",
+        "customer_id": "INT64",
+    },
+    "products": {
+        "id": "INT64",
+        "created_at": "TIMESTAMP",
+        "updated_at": "TIMESTAMP",
+        "published_at": "TIMESTAMP",
+        "vendor": "STRING",
+        "product_type": "STRING",
+        "status": "STRING",
+        "images": "STRING",
+        "options": "STRING",
+        "variants": "STRING",
+    },
+    "products_images": {
+        "id": "INT64",
+        "product_id": "INT64",
+        "created_at": "TIMESTAMP",
+        "updated_at": "TIMESTAMP",
+    },
+    "products_options": {
+        "id": "INT64",
+        "product_id": "INT64",
+    },
+    "products_variants": {
+        "id": "INT64",
+        "product_id": "INT64",
+        "price": "NUMERIC",
+        "inventory_quantity": "INT64",
+        "created_at": "TIMESTAMP",
+        "updated_at": "TIMESTAMP",
+    },
+    "productvariants": {
+        "product_id": "STRING",
+        "variant_id": "STRING",
+        "price": "NUMERIC",
+        "inventory_quantity": "INT64",
+        "updated_at": "TIMESTAMP",
+    },
+}
+
+# row key (and clustering key) per entity, where it isn't "id"
+CLUSTER_KEYS = {
+    "productvariants": "variant_id",
+}
+
+
+# low-cardinality string columns held as pandas categoricals in extracted dfs
+CATEGORICAL_COLUMNS = {
+    "orders": [
+        "financial_status",
+        "fulfillment_status",
+        "currency",
+        "presentment_currency",
+        "source_name",
+        "cancel_reason",
+    ],
+    "orders_lineitems": ["vendor", "fulfillment_service", "fulfillment_status"],
+    "orders_bulk": ["financial_status", "fulfillment_status", "currency"],
+    "orders_bulk_lineitems": ["vendor"],
+    "customers": ["state", "currency"],
+    "customers_addresses": ["province", "province_code", "country", "country_code", "country_name"],
+    "products": ["vendor", "product_type", "status", "published_scope"],
+    "products_variants": ["inventory_policy", "inventory_management", "fulfillment_service"],
+    "productvariants": ["product_title", "product_handle"],
+}
+
+# columns (fnmatch patterns, json_normalize "." names) dropped at extraction: admin api ids duplicating id, shop and
+# presentment money bags duplicating the plain amounts, and copies of nested objects kept elsewhere.
+# Columns in the entity's schema are never dropped.
+DROP_COLUMNS = {
+    "orders": ["admin_graphql_api_id", "*_set.*", "customer.*"],
+    "orders_lineitems": ["admin_graphql_api_id", "*_set.*"],
+    "customers": ["admin_graphql_api_id"],
+    "customers_addresses": [],
+    "products": ["admin_graphql_api_id", "body_html", "image", "image.*"],
+    "products_images": ["admin_graphql_api_id"],
+    "products_options": [],
+    "products_variants": ["admin_graphql_api_id"],
+}
+
+# pandas dtypes schema types are held as while extracting. NUMERIC stays float64 until the raw file is written.
+EXTRACT_DTYPES = {
+    "INT64": "Int64",
+    "NUMERIC": "float64",
+}
+
+
+def entity_for_table(table):
+    """
+    Maps a raw table name like "orders_raw" to its entity ("orders"). Work tables named after a raw table with a "__"
+    suffix (like "orders_raw__staging_1a2b" or "orders_raw__typed") map to the same entity.
+    """
+
+    table = table.split("__")[0]
+    return table[: -len("_raw")] if table.endswith("_raw") else table
+
+
+def get_schema(entity):
+    """Returns the {column: type} schema for an entity, or an empty dict if it has none."""
+
+    return SCHEMAS.get(entity, {})
+
+
+def get_key(entity):
+    """Returns the column identifying an entity's rows ("id" unless CLUSTER_KEYS says otherwise)."""
+
+    return CLUSTER_KEYS.get(entity, "id")
+
+
+def get_partitioning(entity):
+    """Returns (partition column, clustering columns) for an entity's raw table, or (None, None) if it isn't partitioned."""
+
+    schema = get_schema(entity)
+
+    if schema.get("updated_at") != "TIMESTAMP":
+        return None, None
+
+    return "updated_at", [get_key(entity)]
+
+
+def to_decimal(value):
+    if value is None or pd.isna(value):
+        return None
+    return Decimal(str(value))
+
+
+def is_string_column(series):
+    """True for categoricals and object columns holding only strings or nulls (all-null included)."""
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return True
+
+    if series.dtype != object:
+        return False
+
+    return bool(series.dropna().map(lambda v: isinstance(v, str)).all())
+
+
+def apply_schema(df, entity):
+    """
+    Casts an entity's df columns to their schema types (INT64, TIMESTAMP, NUMERIC, STRING) before it is written,
+    and any other string-only (or all-null) object or categorical column to string.
+    """
+
+    schema = get_schema(entity)
+
+    for column in df.columns:
+        if column not in schema and is_string_column(df[column]):
+            df[column] = df[column].astype("string")
+
+    for column, column_type in schema.items():
+        if column not in df.columns:
+            continue
+
+        if column_type == "INT64":
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("Int64")
+        elif column_type == "TIMESTAMP":
+            df[column] = pd.to_datetime(df[column], utc=True, errors="coerce")
+        elif column_type == "NUMERIC":
+            df[column] = df[column].map(to_decimal)
+        elif column_type == "STRING":
+            df[column] = df[column].astype("string")
+
+    return df
+
+
+def compact_df(df, entity):
+    """
+    Shrinks a freshly normalized df of an entity: drops its DROP_COLUMNS, gives schema columns compact dtypes (nullable
+    int64 ids, UTC datetimes, float prices) and makes its CATEGORICAL_COLUMNS categoricals.
+    Column names may still hold json_normalize's "." (they are matched to the schema as cleaned names).
+    """
+
+    schema = get_schema(entity)
+
+    drop = [
+        column
+        for column in df.columns
+        if column.replace(".", "_") not in schema
+        and any(fnmatch(column, pattern) for pattern in DROP_COLUMNS.get(entity, []))
+    ]
+    df = df.drop(columns=drop)
+
+    for column in df.columns:
+        column_type = schema.get(column.replace(".", "_"))
+
+        if column_type in EXTRACT_DTYPES:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(EXTRACT_DTYPES[column_type])
+        elif column_type == "TIMESTAMP":
+            df[column] = pd.to_datetime(df[column], utc=True, errors="coerce")
+
+    for column in CATEGORICAL_COLUMNS.get(entity, []):
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+
+    return df
+
+
+def concat_compact(dfs):
+    """
+    pd.concat for compacted dfs that keeps their categoricals: pd.concat falls back to object dtype when a column's
+    categories differ between dfs (as they do page to page), so each categorical column is first given the union of
+    its categories across all the dfs.
+    """
+
+    dfs = list(dfs)
+
+    categorical = {
+        column
+        for df in dfs
+        for column in df.columns
+        if isinstance(df[column].dtype, pd.CategoricalDtype)
+    }
+
+    dtypes = {}
+    for column in categorical:
+        parts = [
+            df[column].cat.categories
+            if isinstance(df[column].dtype, pd.CategoricalDtype)
+            else pd.Index(df[column].dropna().unique())
+            for df in dfs
+            if column in df.columns
+        ]
+        dtypes[column] = pd.CategoricalDtype(parts[0].append(parts[1:]).unique())
+
+    dfs = [
+        df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns})
+        for df in dfs
+    ]
+
+    result = pd.concat(dfs, ignore_index=True)
+
+    # a column missing from some dfs comes back as object; put it back
+    for column, dtype in dtypes.items():
+        if result[column].dtype != dtype:
+            result[column] = result[column].astype(dtype)
+
+    return result
+
+
+def memory_mb(df):
+    """Returns a df's in-memory size in MB, counting the contents of object columns."""
+
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def measure_compaction(records, entity, per_rows=100000):
+    """
+    Normalizes raw records with and without compact_df and prints/returns the memory of each, scaled to per_rows rows,
+    e.g. measure_compaction(orders, "orders") for the MB per 100k orders before and after.
+    """
+
+    import shopify_gen as sho
+
+    before = sho.normalize_records(records)
+    after = sho.normalize_records(records, entity)
+
+    scale = per_rows / max(len(before), 1)
+    before_mb = memory_mb(before) * scale
+    after_mb = memory_mb(after) * scale
+
+    print(
+        f"{entity}: {before_mb:.1f} MB -> {after_mb:.1f} MB per {per_rows} rows "
+        f"({len(before.columns)} -> {len(after.columns)} columns)"
+    )
+
+    return before_mb, after_mb
@@ -0,0 +1,210 @@
+"""
+Asyncio engine for bulk seeding the sandbox store.
+
+Keeps a fixed number of blocking create calls in flight (each one runs in a worker thread against the shared
+ShopifyClient, which does the rate limit pacing), retries failed items without stopping the batch, and reports
+throughput and failures at the end.
+
+    report = asyncio.run(run_seeding(create_one, 500, concurrency=8))
+
+run_batched_seeding does the same with calls that create many items each (see shopify_batch.py), re-queueing only
+the items of a batch that failed.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+
+
+class SeedReport:
+    """Outcome of a seeding run."""
+
+    def __init__(self, label, requested):
+        self.label = label
+        self.requested = requested
+        self.created = []
+        self.failures = {}
+        self.attempts = 0
+        self.requests = 0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    @property
+    def elapsed(self):
+        end = self.finished_at or time.monotonic()
+        return end - self.started_at
+
+    @property
+    def items_per_sec(self):
+        return len(self.created) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return (
+            f"{self.label}: {len(self.created)} of {self.requested} created, "
+            f"{len(self.failures)} failed, {self.attempts} attempts in {self.requests} requests, "
+            f"{self.elapsed:.1f}s "
+            f"({self.items_per_sec:.2f} items/sec)"
+        )
+
+
+class StartRateLimiter:
+    """Spaces out task starts to at most rate_per_minute (e.g. the dev store cap of 5 orders per minute)."""
+
+    def __init__(self, rate_per_minute):
+        self.interval = 60 / rate_per_minute
+        self.next_start = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def wait(self, n=1):
+        """Waits for a start slot for n items (a batch of n takes n intervals)."""
+
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval * n
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def run_seeding(
+    create_fn,
+    count,
+    concurrency=4,
+    max_attempts=3,
+    rate_per_minute=None,
+    label="seed",
+    verbose=True,
+):
+    """
+    Runs create_fn(i) for i in range(count), keeping up to `concurrency` calls in flight.
+
+    create_fn is a blocking callable that returns the created record, and raises (or returns None) on failure.
+    Each item is retried up to max_attempts times with jittered backoff; an item that still fails is recorded in
+    the report and the rest of the batch carries on.
+    """
+
+    report = SeedReport(label, count)
+    limiter = StartRateLimiter(rate_per_minute) if rate_per_minute else None
+
+    async def seed_one(i):
+        for attempt in range(1, max_attempts + 1):
+            if limiter:
+                await limiter.wait()
+
+            report.attempts += 1
+            report.requests += 1
+            try:
+                result = await asyncio.to_thread(create_fn, i)
+                if result is None:
+                    raise Exception("create returned no record")
+            except Exception as e:
+                if attempt == max_attempts:
+                    report.failures[i] = str(e)
+                    if verbose:
+                        print(f"{label} {i+1} of {count} failed after {attempt} attempts: {e}")
+                    return
+                await asyncio.sleep(random.uniform(0.5, 1.0) * 2**attempt)
+                continue
+
+            report.created.append(result)
+            if verbose:
+                print(f"{label} {i+1} of {count} created")
+            return
+
+    # a fixed pool of workers pulling from one shared iterator, so large counts don't create a task per item
+    indexes = iter(range(count))
+
+    async def worker():
+        for i in indexes:
+            await seed_one(i)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    report.finished_at = time.monotonic()
+    print(report.summary())
+
+    return report
+
+
+async def run_batched_seeding(
+    create_batch_fn,
+    count,
+    batch_size,
+    concurrency=2,
+    max_attempts=3,
+    rate_per_minute=None,
+    label="seed",
+    verbose=True,
+):
+    """
+    Runs create_batch_fn(indexes) over batches of range(count), keeping up to `concurrency` batches in flight.
+
+    create_batch_fn is a blocking callable taking a list of item indexes and returning (created, failed) dicts of
+    index -> record and index -> error message; items in neither count as failed. If it raises, the whole batch
+    failed. batch_size is an int or a callable returning the size of the next batch (like BatchMutation.batch_size).
+    Failed items go back on the queue, to be sent again in a later batch, until they have had max_attempts.
+    """
+
+    report = SeedReport(label, count)
+    limiter = StartRateLimiter(rate_per_minute) if rate_per_minute else None
+
+    pending = deque(range(count))
+    attempts = {}
+    in_flight = 0
+
+    async def send_batch(batch):
+        if limiter:
+            await limiter.wait(len(batch))
+
+        report.attempts += len(batch)
+        report.requests += 1
+        try:
+            created, failed = await asyncio.to_thread(create_batch_fn, batch)
+        except Exception as e:
+            created, failed = {}, {i: str(e) for i in batch}
+            await asyncio.sleep(random.uniform(0.5, 1.0) * 2 ** min(attempts.get(batch[0], 0) + 1, 5))
+
+        for i in batch:
+            if i in created and created[i] is not None:
+                report.created.append(created[i])
+                continue
+
+            attempts[i] = attempts.get(i, 0) + 1
+            error = failed.get(i, "create returned no record")
+
+            if attempts[i] < max_attempts:
+                pending.append(i)
+            else:
+                report.failures[i] = error
+                if verbose:
+                    print(f"{label} {i+1} of {count} failed after {attempts[i]} attempts: {error}")
+
+        if verbose:
+            print(f"{label} batch of {len(batch)}: {len(report.created)} of {count} created")
+
+    async def worker():
+        nonlocal in_flight
+
+        while pending or in_flight:
+            if not pending:
+                # another worker's batch may still put failed items back
+                await asyncio.sleep(0.05)
+                continue
+
+            size = batch_size() if callable(batch_size) else batch_size
+            batch = [pending.popleft() for _ in range(min(size, len(pending)))]
+
+            in_flight += 1
+            try:
+                await send_batch(batch)
+            finally:
+                in_flight -= 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    report.finished_at = time.monotonic()
+    print(report.summary())
+
+    return report
@@ -0,0 +1,158 @@
+"""
+Batched GraphQL mutations: many aliased copies of one mutation (like customerCreate) in a single document, so a
+batch of records costs one round trip instead of one each.
+
+    m0: customerCreate(input: $input0) { customer { ... } userErrors { field message } }
+    m1: customerCreate(input: $input1) { ... }
+
+The batch size follows the query cost Shopify reports (extensions.cost): the requested cost of the last document,
+divided by its alias count, gives a per-mutation cost, and the next batch is as many mutations as fit in
+target_share of the bucket (and under Shopify's 1000 point single query limit). Results and userErrors come back
+per alias and are mapped to the input rows, so callers can retry only the rows that failed.
+
+https://shopify.dev/docs/api/usage/rate-limits#graphql-admin-api-rate-limits
+"""
+
+import threading
+
+from shopify_client import MAX_QUERY_COST, get_client
+
+
+class BatchMutation:
+    """
+    One mutation field, sent in aliased batches.
+
+    field      - the mutation field, like "customerCreate"
+    argument   - its input argument and GraphQL type, like ("input", "CustomerInput!")
+    selection  - the payload selection set without userErrors, like "customer { id email }"
+    result_key - the payload field holding the created record, like "customer"
+
+    batcher = BatchMutation("customerCreate", ("input", "CustomerInput!"), "customer { id }", "customer")
+    created, failed = batcher.send(inputs)
+    """
+
+    def __init__(
+        self,
+        field,
+        argument,
+        selection,
+        result_key,
+        api_version=None,
+        initial_batch_size=10,
+        max_batch_size=250,
+        target_share=0.5,
+    ):
+        self.field = field
+        self.argument_name, self.argument_type = argument
+        self.selection = selection
+        self.result_key = result_key
+        self.api_version = api_version
+
+        self.initial_batch_size = initial_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_share = target_share
+
+        # per-mutation requested cost, learned from the first response
+        self.item_cost = None
+        self.lock = threading.Lock()
+        self.documents = {}
+
+    @property
+    def client(self):
+        return get_client(self.api_version) if self.api_version else get_client()
+
+    def document(self, n):
+        """Returns the mutation document with n aliased copies of the field, m0 .. m<n-1> (cached per n)."""
+
+        if n not in self.documents:
+            variables = ", ".join(f"${self.argument_name}{i}: {self.argument_type}" for i in range(n))
+            aliases = "\n".join(
+                f"  m{i}: {self.field}({self.argument_name}: ${self.argument_name}{i}) "
+                f"{{ {self.selection} userErrors {{ field message }} }}"
+                for i in range(n)
+            )
+            self.documents[n] = f"mutation Batch{self.field[0].upper()}{self.field[1:]}({variables}) {{\n{aliases}\n}}"
+
+        return self.documents[n]
+
+    def batch_size(self):
+        """Returns how many mutations to put in the next document, from the last reported cost."""
+
+        with self.lock:
+            if self.item_cost is None:
+                return self.initial_batch_size
+
+            client = self.client
+            bucket = client.gql_maximum or MAX_QUERY_COST
+            budget = min(MAX_QUERY_COST, bucket * self.target_share)
+
+            return max(1, min(self.max_batch_size, int(budget // self.item_cost)))
+
+    def expected_cost(self, n):
+        return self.item_cost * n if self.item_cost is not None else None
+
+    def record_cost(self, data, n):
+        """Updates the per-mutation cost from a response's extensions.cost."""
+
+        cost = (data.get("extensions") or {}).get("cost") or {}
+        requested = cost.get("requestedQueryCost")
+
+        if requested:
+            with self.lock:
+                self.item_cost = max(1.0, requested / n)
+
+    def send(self, inputs):
+        """
+        Sends one document creating every input. Returns (created, failed): {position in inputs: record} for the
+        rows that were created, and {position: error message} for those that weren't.
+        Raises if the request itself fails, since then no row got through.
+        """
+
+        n = len(inputs)
+        variables = {f"{self.argument_name}{i}": value for i, value in enumerate(inputs)}
+
+        data = self.client.graphql(self.document(n), variables, expected_cost=self.expected_cost(n))
+        self.record_cost(data, n)
+
+        return self.map_results(data, n)
+
+    def map_results(self, data, n):
+        """Maps per-alias payloads, userErrors and path-scoped top-level errors back to input positions."""
+
+        created = {}
+        failed = {}
+
+        # top-level errors either name the alias they belong to in their path, or fail the whole document
+        document_errors = []
+        for e in data.get("errors") or []:
+            path = e.get("path") or []
+            alias = path[0] if path else None
+            if isinstance(alias, str) and alias.startswith("m") and alias[1:].isdigit():
+                failed[int(alias[1:])] = e.get("message", "error")
+            else:
+                document_errors.append(e.get("message", "error"))
+
+        payloads = data.get("data") or {}
+
+        for i in range(n):
+            if i in failed:
+                continue
+
+            payload = payloads.get(f"m{i}")
+
+            if payload is None:
+                failed[i] = "; ".join(document_errors) or "no result returned"
+                continue
+
+            user_errors = payload.get("userErrors") or []
+            if user_errors:
+                failed[i] = "; ".join(f"{e.get('field')} || {e.get('message')}" for e in user_errors)
+                continue
+
+            record = payload.get(self.result_key)
+            if record is None:
+                failed[i] = "no record returned"
+            else:
+                created[i] = record
+
+        return created, failed
@@ -0,0 +1,340 @@
+"""
+GraphQL Bulk Operations extraction.
+
+Starts a bulkOperationRunQuery, polls until Shopify has finished writing the result file, then streams the
+JSONL result line by line into pages of raw table rows for the StreamingLoader, so the result file is never held in
+memory. Nested connections come back as separate lines carrying a __parentId, somewhere after their parent's line:
+    orders          - orders_bulk_raw, one row per order, and orders_bulk_lineitems_raw, one row per line item with
+                      its order_id taken from __parentId (so a line item never needs its order in the same page).
+                      The bulk query selects fewer fields than the REST orders, so these are their own tables rather
+                      than upserts into orders_raw, which would leave REST columns stale or null.
+    productvariants - productvariants_raw rows, one per variant with its product's columns (the same columns the
+                      GraphQL variant extractor selects)
+
+https://shopify.dev/docs/api/usage/bulk-operations/queries
+"""
+
+import json
+import time
+
+import pandas as pd
+import requests
+
+import projections
+import schemas
+from shopify_client import get_client
+from shopify_gen import normalize_records
+
+BULK_QUERIES = {
+    "orders": """
+    {
+      orders(query: "updated_at:>='%(updated_at_min)s'", sortKey: UPDATED_AT) {
+        edges {
+          node {
+            id
+            name
+            email
+            createdAt
+            updatedAt
+            processedAt
+            cancelledAt
+            displayFinancialStatus
+            displayFulfillmentStatus
+            currencyCode
+            customer {
+              id
+            }
+            totalPriceSet {
+              shopMoney {
+                amount
+              }
+            }
+            subtotalPriceSet {
+              shopMoney {
+                amount
+              }
+            }
+            lineItems {
+              edges {
+                node {
+                  id
+                  name
+                  sku
+                  quantity
+                  vendor
+                  variant {
+                    id
+                  }
+                  originalUnitPriceSet {
+                    shopMoney {
+                      amount
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+    """,
+    "productvariants": """
+    {
+      products {
+        edges {
+          node {
+            %(product_fields)s
+            variants {
+              edges {
+                node {
+                  %(variant_fields)s
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+    """
+    % {
+        "product_fields": projections.selection_set(projections.GRAPHQL_PRODUCT_COLUMNS),
+        "variant_fields": projections.selection_set(projections.GRAPHQL_VARIANT_COLUMNS),
+    },
+}
+
+# GraphQL displayFulfillmentStatus -> the REST fulfillment_status values orders_raw holds
+FULFILLMENT_STATUSES = {
+    "FULFILLED": "fulfilled",
+    "PARTIALLY_FULFILLED": "partial",
+    "UNFULFILLED": None,
+}
+
+RUN_BULK_MUTATION = """
+mutation runBulk($query: String!) {
+  bulkOperationRunQuery(query: $query) {
+    bulkOperation {
+      id
+      status
+    }
+    userErrors {
+      field
+      message
+    }
+  }
+}
+"""
+
+POLL_BULK_QUERY = """
+query pollBulk($id: ID!) {
+  node(id: $id) {
+    ... on BulkOperation {
+      id
+      status
+      errorCode
+      objectCount
+      url
+    }
+  }
+}
+"""
+
+
+def start_bulk_operation(query, client=None):
+    """Submits a bulk query and returns the BulkOperation gid."""
+
+    client = client or get_client()
+
+    data = client.graphql(RUN_BULK_MUTATION, {"query": query})
+
+    if "errors" in data:
+        raise Exception(f"Bulk operation failed to start: {data['errors']}")
+
+    result = data["data"]["bulkOperationRunQuery"]
+
+    if result["userErrors"]:
+        raise Exception(f"Bulk operation failed to start: {result['userErrors']}")
+
+    return result["bulkOperation"]["id"]
+
+
+def wait_for_bulk_operation(operation_id, client=None, poll_interval=5, timeout=3600):
+    """
+    Polls a bulk operation until it completes and returns the result file url.
+    Returns None when the operation completed with no objects (Shopify doesn't write a file then).
+    """
+
+    client = client or get_client()
+
+    deadline = time.monotonic() + timeout
+
+    while True:
+        data = client.graphql(POLL_BULK_QUERY, {"id": operation_id})
+        operation = data["data"]["node"]
+        status = operation["status"]
+
+        if status == "COMPLETED":
+            print(f"Bulk operation {operation_id} completed with {operation['objectCount']} objects")
+            return operation["url"]
+
+        if status in ("FAILED", "CANCELED", "EXPIRED"):
+            raise Exception(
+                f"Bulk operation {operation_id} ended with status {status}: {operation['errorCode']}"
+            )
+
+        if time.monotonic() > deadline:
+            raise Exception(f"Bulk operation {operation_id} still {status} after {timeout}s")
+
+        time.sleep(poll_interval)
+
+
+def iter_bulk_jsonl(url, chunk_size=1024 * 1024):
+    """Streams a bulk operation result file, yielding one parsed record per JSONL line."""
+
+    # the result url is a signed storage link, so the Shopify token isn't sent along
+    with requests.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+
+        for line in response.iter_lines(chunk_size=chunk_size):
+            if line:
+                yield json.loads(line)
+
+
+def gid_number(gid):
+    """Returns the numeric id of a gid like "gid://shopify/Order/123", which is the id the REST API uses."""
+
+    return int(gid.rsplit("/", 1)[-1]) if gid else None
+
+
+def money_amount(node, field):
+    return ((node.get(field) or {}).get("shopMoney") or {}).get("amount")
+
+
+def bulk_order_row(node):
+    """Maps a bulk order line to an orders_bulk_raw row, named like the REST order fields."""
+
+    fulfillment_status = node.get("displayFulfillmentStatus")
+
+    return {
+        "id": gid_number(node["id"]),
+        "name": node.get("name"),
+        "email": node.get("email"),
+        "created_at": node.get("createdAt"),
+        "updated_at": node.get("updatedAt"),
+        "processed_at": node.get("processedAt"),
+        "cancelled_at": node.get("cancelledAt"),
+        "financial_status": (node.get("displayFinancialStatus") or "").lower() or None,
+        "fulfillment_status": FULFILLMENT_STATUSES.get(
+            fulfillment_status, (fulfillment_status or "").lower() or None
+        ),
+        "currency": node.get("currencyCode"),
+        "customer_id": gid_number((node.get("customer") or {}).get("id")),
+        "total_price": money_amount(node, "totalPriceSet"),
+        "subtotal_price": money_amount(node, "subtotalPriceSet"),
+    }
+
+
+def bulk_line_item(node, parent_id):
+    """Maps a bulk line item line to an orders_bulk_lineitems_raw row, named like the REST line item fields."""
+
+    return {
+        "id": gid_number(node["id"]),
+        "order_id": gid_number(parent_id),
+        "name": node.get("name"),
+        "sku": node.get("sku"),
+        "quantity": node.get("quantity"),
+        "vendor": node.get("vendor"),
+        "variant_id": gid_number((node.get("variant") or {}).get("id")),
+        "price": money_amount(node, "originalUnitPriceSet"),
+    }
+
+
+def iter_bulk_order_pages(records, page_size=1000):
+    """
+    Splits bulk orders lines into pages of {"orders_bulk": df, "orders_bulk_lineitems": df}, one per page_size orders.
+    Line items carry their order_id, so they go in whichever page their line falls in.
+    """
+
+    orders = []
+    line_items = []
+
+    for record in records:
+        parent_id = record.pop("__parentId", None)
+
+        if parent_id is None:
+            if len(orders) >= page_size:
+                yield bulk_order_page(orders, line_items)
+                orders, line_items = [], []
+            orders.append(bulk_order_row(record))
+        else:
+            line_items.append(bulk_line_item(record, parent_id))
+
+    if orders or line_items:
+        yield bulk_order_page(orders, line_items)
+
+
+def bulk_order_page(orders, line_items):
+    return {
+        "orders_bulk": normalize_records(orders, "orders_bulk"),
+        "orders_bulk_lineitems": normalize_records(line_items, "orders_bulk_lineitems"),
+    }
+
+
+def iter_bulk_product_variant_pages(records, page_size=5000):
+    """
+    Turns bulk products { variants } lines into pages of productvariants_raw rows, yielding {"productvariants": df}.
+    Each product's columns are kept (a few short strings per product), so a variant finds its product however far
+    after it the variant's line comes. Raises on a variant that comes before its product's line, since Shopify
+    writes every child after its parent and that means a broken result file.
+    """
+
+    products = {}
+    rows = []
+
+    for record in records:
+        parent_id = record.pop("__parentId", None)
+
+        if parent_id is None:
+            products[record["id"]] = projections.project_node(record, projections.GRAPHQL_PRODUCT_COLUMNS)
+            continue
+
+        if parent_id not in products:
+            raise Exception(
+                f"Bulk productvariants: variant {record.get('id')} came before its product {parent_id}"
+            )
+
+        rows.append(
+            {**products[parent_id], **projections.project_node(record, projections.GRAPHQL_VARIANT_COLUMNS)}
+        )
+
+        if len(rows) >= page_size:
+            yield {"productvariants": schemas.compact_df(pd.DataFrame(rows), "productvariants")}
+            rows = []
+
+    if rows:
+        yield {"productvariants": schemas.compact_df(pd.DataFrame(rows), "productvariants")}
+
+
+BULK_PAGES = {
+    "orders": iter_bulk_order_pages,
+    "productvariants": iter_bulk_product_variant_pages,
+}
+
+
+def bulk_extract_pages(name, client=None, poll_interval=5, page_size=None, **query_args):
+    """
+    Runs one of the BULK_QUERIES end to end and yields its result as pages of raw table dfs ({table: df}, the
+    pages StreamingLoader.add_page takes), while the result file streams in.
+
+    for page in bulk_extract_pages("orders", updated_at_min="2025-11-01T00:00:00Z"):
+        loader.add_page(page)
+    """
+
+    query = BULK_QUERIES[name] % query_args if query_args else BULK_QUERIES[name]
+
+    operation_id = start_bulk_operation(query, client)
+    url = wait_for_bulk_operation(operation_id, client, poll_interval=poll_interval)
+
+    records = iter_bulk_jsonl(url) if url else iter(())
+    page_args = {"page_size": page_size} if page_size else {}
+
+    yield from BULK_PAGES[name](records, **page_args)
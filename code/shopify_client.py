@@ -0,0 +1,315 @@
+"""
+Shared Shopify Admin API client.
+
+One pooled requests.Session per api version, reused by every extractor and mutation.
+Requests are paced with a leaky bucket fed from the rate limit info Shopify sends back:
+    REST    - X-Shopify-Shop-Api-Call-Limit header, e.g. "32/40"
+    GraphQL - extensions.cost.throttleStatus (maximumAvailable, currentlyAvailable, restoreRate)
+429s, 5xx and THROTTLED GraphQL errors are retried with jittered exponential backoff.
+
+https://shopify.dev/docs/api/usage/rate-limits
+"""
+
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+DEFAULT_API_VERSION = "2025-10"
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Shopify rejects any single GraphQL query whose requested cost is above this
+MAX_QUERY_COST = 1000
+
+# largest first: a GraphQL connection accepts
+MAX_CONNECTION_FIRST = 250
+
+
+def wire_bytes(response):
+    """Returns the bytes a response took on the wire (compressed size when gzip/deflate encoded)."""
+
+    try:
+        return response.raw.tell()
+    except AttributeError:
+        return len(response.content)
+
+
+def endpoint_name(url):
+    """Returns the api endpoint of a url, like "orders.json" or "graphql.json", for metrics labels."""
+
+    path = url.split("?", 1)[0]
+    if "/admin/api/" in path:
+        return path.split("/admin/api/", 1)[1].split("/", 1)[-1]
+    return path.rsplit("/", 1)[-1]
+
+
+class ShopifyClient:
+    """
+    Pooled, rate limit aware client for the Shopify Admin REST and GraphQL APIs.
+
+    client = ShopifyClient()
+    response = client.get(client.rest_url("products.json"), params={"limit": 250})
+    data = client.graphql(query, variables)
+    """
+
+    def __init__(
+        self,
+        store_name=None,
+        access_token=None,
+        api_version=DEFAULT_API_VERSION,
+        base_url=None,
+        pool_size=10,
+        max_retries=5,
+        backoff_base=1.0,
+        backoff_max=30.0,
+        rest_bucket_size=40,
+        rest_leak_rate=2.0,
+        timeout=60,
+    ):
+        self.store_name = store_name or os.getenv("store_name")
+        self.access_token = access_token or os.getenv("access_token")
+        self.api_version = api_version
+
+        # base_url can be overridden to point at a local stand-in server (see mock_shopify.py), here or with the
+        # shopify_base_url env var, like "http://127.0.0.1:8765/admin/api/{api_version}"
+        base_url = base_url or os.getenv("shopify_base_url")
+        self.base_url = (
+            base_url.format(api_version=api_version)
+            if base_url
+            else f"https://{self.store_name}.myshopify.com/admin/api/{api_version}"
+        )
+
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "X-Shopify-Access-Token": self.access_token,
+                "Content-Type": "application/json",
+                # compressed json is a fraction of the size on the wire; requests decodes it transparently
+                "Accept-Encoding": "gzip, deflate",
+            }
+        )
+
+        self.lock = threading.Lock()
+
+        # REST leaky bucket: calls currently in the bucket, as of rest_checked_at
+        self.rest_bucket_size = rest_bucket_size
+        self.rest_leak_rate = rest_leak_rate
+        self.rest_used = 0.0
+        self.rest_checked_at = time.monotonic()
+
+        # GraphQL cost bucket, filled in from the first response
+        self.gql_maximum = None
+        self.gql_available = None
+        self.gql_restore_rate = None
+        self.gql_checked_at = time.monotonic()
+        self.gql_last_cost = 0
+
+    def rest_url(self, resource):
+        """Returns the full url for a REST resource, like "products.json"."""
+        return f"{self.base_url}/{resource}"
+
+    @property
+    def graphql_url(self):
+        return f"{self.base_url}/graphql.json"
+
+    def wait_for_rest_budget(self):
+        """Blocks until the REST bucket has room for one more call."""
+
+        with self.lock:
+            now = time.monotonic()
+            leaked = (now - self.rest_checked_at) * self.rest_leak_rate
+            self.rest_used = max(0.0, self.rest_used - leaked)
+            self.rest_checked_at = now
+
+            overflow = self.rest_used + 1 - self.rest_bucket_size
+            wait = overflow / self.rest_leak_rate if overflow > 0 else 0
+
+            # reserve the slot now so concurrent callers don't all see the same free space
+            self.rest_used += 1
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def update_rest_budget(self, response):
+        """Syncs the REST bucket with the X-Shopify-Shop-Api-Call-Limit header, like "32/40"."""
+
+        call_limit = response.headers.get("X-Shopify-Shop-Api-Call-Limit")
+        if not call_limit:
+            return
+
+        used, size = call_limit.split("/")
+
+        with self.lock:
+            self.rest_used = float(used)
+            self.rest_bucket_size = int(size)
+            self.rest_checked_at = time.monotonic()
+
+        metrics.increment("api_cost", 1, api="rest")
+        metrics.set_gauge("api_budget_remaining", int(size) - float(used), api="rest")
+
+    def wait_for_graphql_budget(self, expected_cost=None):
+        """Blocks until the GraphQL bucket has enough points for a query of the expected cost."""
+
+        with self.lock:
+            if self.gql_available is None:
+                return
+
+            cost = expected_cost if expected_cost is not None else self.gql_last_cost
+
+            now = time.monotonic()
+            restored = (now - self.gql_checked_at) * self.gql_restore_rate
+            self.gql_available = min(self.gql_maximum, self.gql_available + restored)
+            self.gql_checked_at = now
+
+            shortfall = cost - self.gql_available
+            wait = shortfall / self.gql_restore_rate if shortfall > 0 else 0
+
+            self.gql_available -= cost
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def update_graphql_budget(self, data):
+        """Syncs the GraphQL bucket with extensions.cost from a response body."""
+
+        cost = (data.get("extensions") or {}).get("cost")
+        if not cost:
+            return
+
+        status = cost["throttleStatus"]
+
+        with self.lock:
+            self.gql_maximum = status["maximumAvailable"]
+            self.gql_available = status["currentlyAvailable"]
+            self.gql_restore_rate = status["restoreRate"]
+            self.gql_checked_at = time.monotonic()
+            self.gql_last_cost = cost.get("requestedQueryCost", self.gql_last_cost)
+
+        metrics.increment("api_cost", cost.get("actualQueryCost") or 0, api="graphql")
+        metrics.set_gauge("api_budget_remaining", status["currentlyAvailable"], api="graphql")
+
+    def backoff(self, attempt, response=None):
+        """Sleeps before a retry, honoring Retry-After when Shopify sends it."""
+
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+
+        if retry_after:
+            wait = float(retry_after)
+        else:
+            wait = min(self.backoff_max, self.backoff_base * 2**attempt)
+
+        # full jitter so parallel workers don't retry in lockstep
+        time.sleep(wait / 2 + random.uniform(0, wait / 2))
+
+    def request(self, method, url, **kwargs):
+        """Sends a request, retrying 429/5xx and connection errors. Returns the final response."""
+
+        kwargs.setdefault("timeout", self.timeout)
+
+        endpoint = endpoint_name(url)
+
+        for attempt in range(self.max_retries + 1):
+            with metrics.timed("http", endpoint, method=method, attempt=attempt) as event:
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if attempt == self.max_retries:
+                        raise
+                    event["error"] = type(e).__name__
+                    response = None
+                else:
+                    event["status"] = response.status_code
+                    event["bytes_decoded"] = len(response.content)
+                    event["bytes_in"] = wire_bytes(response)
+
+            if response is None:
+                metrics.increment("http_retries", endpoint=endpoint, reason="connection")
+                self.backoff(attempt)
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                print(f"HTTP {response.status_code} from Shopify, retry {attempt + 1} of {self.max_retries}")
+                metrics.increment("http_retries", endpoint=endpoint, reason=str(response.status_code))
+                self.backoff(attempt, response)
+                continue
+
+            return response
+
+        return response
+
+    def get(self, url, params=None):
+        """GET a REST endpoint under the REST leaky bucket. Raises on a final non-2xx."""
+
+        self.wait_for_rest_budget()
+
+        response = self.request("GET", url, params=params)
+        self.update_rest_budget(response)
+        response.raise_for_status()
+
+        return response
+
+    def graphql(self, query, variables=None, expected_cost=None):
+        """
+        POST a GraphQL query/mutation under the GraphQL cost bucket and return the parsed json body.
+        Responses that only carry THROTTLED errors are retried; other errors are returned for the caller to handle.
+        """
+
+        payload = {"query": query, "variables": variables or {}}
+
+        for attempt in range(self.max_retries + 1):
+            self.wait_for_graphql_budget(expected_cost)
+
+            response = self.request("POST", self.graphql_url, json=payload)
+
+            if response.status_code != 200:
+                raise Exception(f"GraphQL request failed: {response.text}")
+
+            with metrics.timed("parse", "graphql.json"):
+                data = response.json()
+            self.update_graphql_budget(data)
+
+            errors = data.get("errors") or []
+            throttled = errors and all(
+                (e.get("extensions") or {}).get("code") == "THROTTLED" for e in errors
+            )
+
+            if throttled and attempt < self.max_retries:
+                print(f"GraphQL throttled, retry {attempt + 1} of {self.max_retries}")
+                metrics.increment("http_retries", endpoint="graphql.json", reason="THROTTLED")
+                self.backoff(attempt)
+                continue
+
+            return data
+
+        return data
+
+
+clients = {}
+clients_lock = threading.Lock()
+
+
+def get_client(api_version=DEFAULT_API_VERSION):
+    """Returns the shared ShopifyClient for an api version, creating it on first use."""
+
+    with clients_lock:
+        if api_version not in clients:
+            clients[api_version] = ShopifyClient(api_version=api_version)
+
+        return clients[api_version]
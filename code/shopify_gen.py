@@ -1,74 +1,365 @@
-import os
-import requests
 import pandas as pd
 from dotenv import load_dotenv
 from datetime import timedelta, datetime
+from concurrent.futures import ThreadPoolExecutor
 import json
+import math
+import time
+from shopify_client import MAX_CONNECTION_FIRST, MAX_QUERY_COST, get_client
+import schemas
+import metrics
+import projections
 
 load_dotenv()
 
 
-def get_all_products_df():
-    """Return a df of all products from the Shopify store. (REST API)"""
+def get_next_page_url(link_header):
+    """Return the rel="next" url from a Shopify REST Link header, or None if on the last page."""
 
-    store_name = os.getenv("store_name")
-    access_token = os.getenv("access_token")
+    if not link_header or 'rel="next"' not in link_header:
+        return None
 
-    base_url = (
-        f"https://{store_name}.myshopify.com/admin/api/2025-10/products.json"
-    )
+    parts = link_header.split(",")
+    for p in parts:
+        if 'rel="next"' in p:
+            # extract the URL between < and >
+            return p[p.find("<") + 1 : p.find(">")]
 
-    headers = {
-        "X-Shopify-Access-Token": access_token,
-        "Content-Type": "application/json",
-    }
+    return None
 
-    params = {"limit": 250}
 
-    response = requests.get(base_url, headers=headers, params=params)
+def get_rest_page(url, params, key):
+    """Fetch one page of a REST list endpoint. Returns (list of records, next page url)."""
+
+    response = get_client().get(url, params=params)
+
+    with metrics.timed("parse", key) as event:
+        records = response.json().get(key, [])
+        event["rows"] = len(records)
+
+    return records, get_next_page_url(response.headers.get("Link", ""))
+
+
+def iter_rest_pages_with_next(url, params, key):
+    """
+    Yields (records, next page url) for each page of a paginated REST list endpoint, following the Link header.
+    next page url is None on the last page; it can be saved and passed back in as url to resume later.
+    The next page is requested in a background thread while the caller works on the current one.
+    """
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(get_rest_page, url, params, key)
+
+        while future is not None:
+            records, next_url = future.result()
+
+            # page_info urls already carry the query, so params are dropped after the first page
+            if next_url:
+                future = executor.submit(get_rest_page, next_url, None, key)
+            else:
+                future = None
+
+            yield records, next_url
+
+
+def iter_rest_pages(url, params, key):
+    """Yields each page of records (a list of dicts) from a paginated REST list endpoint, following the Link header."""
+
+    for records, next_url in iter_rest_pages_with_next(url, params, key):
+        yield records
+
+
+# nested arrays that can be split out into their own child tables, keyed by REST resource
+CHILD_TABLES = {
+    "orders": {"line_items": "orders_lineitems"},
+    "customers": {"addresses": "customers_addresses"},
+    "products": {
+        "images": "products_images",
+        "options": "products_options",
+        "variants": "products_variants",
+    },
+}
+
+# foreign key column added to each child row
+PARENT_ID_COLUMNS = {
+    "orders": "order_id",
+    "customers": "customer_id",
+    "products": "product_id",
+}
+
 
-    data = response.json()
+def nested_to_json(df):
+    """Serializes object columns holding lists/dicts (line_items, addresses, images, ...) to valid json strings."""
 
-    df = pd.json_normalize(data["products"])
+    for col in df.columns[df.dtypes == object]:
+        if df[col].map(lambda v: isinstance(v, (list, dict))).any():
+            df[col] = df[col].map(
+                lambda v: json.dumps(v) if isinstance(v, (list, dict)) else v
+            )
+    return df
+
+
+def normalize_records(records, entity=None):
+    """
+    json_normalize a list of records, with any remaining nested fields as json strings.
+    With an entity (like "orders"), the df is also compacted to typed columns (see schemas.compact_df).
+    """
 
-    # missing pagination for now
+    if not records:
+        return pd.DataFrame()
+
+    with metrics.timed("normalize", entity or "") as event:
+        event["rows"] = len(records)
+
+        df = nested_to_json(pd.json_normalize(records))
+
+        if entity:
+            df = schemas.compact_df(df, entity)
 
     return df
 
 
-def get_product_variants_df():
-    """Return a df of all product variants from the Shopify store via GraphQL API."""
+def split_child_tables(records, key):
+    """
+    Splits one page of records into a parent df and one df per child table (see CHILD_TABLES), in a single pass.
+    Returns a dict of table name -> df, e.g. {"orders": df, "orders_lineitems": df}.
+    """
+
+    children = CHILD_TABLES[key]
+    parent_id_col = PARENT_ID_COLUMNS[key]
+
+    parents = []
+    child_rows = {table: [] for table in children.values()}
+
+    for record in records:
+        record = dict(record)
+        for field, table in children.items():
+            for child in record.pop(field, None) or []:
+                child_rows[table].append({parent_id_col: record["id"], **child})
+        parents.append(record)
+
+    tables = {key: normalize_records(parents, key)}
+    for table, rows in child_rows.items():
+        tables[table] = normalize_records(rows, table)
+
+    return tables
+
+
+def iter_rest_df_chunks(url, params, key, child_tables=False):
+    """
+    Yields one normalized df per page of a paginated REST list endpoint.
+    With child_tables=True, yields a dict of table name -> df per page instead (see split_child_tables).
+    """
+
+    for records in iter_rest_pages(url, params, key):
+        if records:
+            if child_tables:
+                yield split_child_tables(records, key)
+            else:
+                yield normalize_records(records, key)
+
+
+def concat_df_chunks(chunks):
+    """
+    Concatenates a generator of df chunks into a single df (empty df if there are none).
+    Chunks that are dicts of table name -> df are concatenated per table into one dict.
+    Categoricals stay categoricals (see schemas.concat_compact).
+    """
+
+    chunks = list(chunks)
+
+    if not chunks:
+        return pd.DataFrame()
+
+    if isinstance(chunks[0], dict):
+        return {
+            table: schemas.concat_compact(c[table] for c in chunks)
+            for table in chunks[0]
+        }
+
+    return schemas.concat_compact(chunks)
+
+
+def get_all_products_df(chunked=False, child_tables=False):
+    """Return a df of all products from the Shopify store. (REST API)
+    Follows Link header pagination. With chunked=True, returns a generator of one df per page instead,
+    with the next page prefetched while the current one is processed.
+    Nested arrays come back as json strings; with child_tables=True they are split out instead and a dict of
+    table name -> df is returned (see CHILD_TABLES).
+    """
+
+    base_url = get_client().rest_url("products.json")
+
+    params = projections.rest_params("products", {"limit": 250})
+
+    chunks = iter_rest_df_chunks(base_url, params, "products", child_tables)
+
+    if chunked:
+        return chunks
+
+    return concat_df_chunks(chunks)
+
+
+class NestedPageSizer:
+    """
+    Sizes the first: arguments of a nested GraphQL connection crawl, like products(first:) { variants(first:) },
+    from the extensions.cost of each page.
+
+    Shopify reserves the requested cost, worked out from the first: arguments, before running a query and refunds
+    down to the actual cost after, so an inner first: far above the real child counts (variants(first: 100) for
+    products with 3 variants) holds up ~30x the points the page uses. The inner first: follows the largest child
+    count seen lately, with headroom; children past it are paged separately. The outer first: is then as many
+    parents as fit the page budget at the learned requested cost per parent: under the single query limit and
+    target_share of the bucket, and no more than will be available when the next request lands (currentlyAvailable
+    plus the restore rate over a round trip), so pages shrink instead of stalling on THROTTLED when the bucket runs low.
+    """
+
+    def __init__(
+        self,
+        first=10,
+        inner_first=25,
+        min_inner_first=5,
+        target_share=0.5,
+        headroom=1.25,
+        window=1000,
+    ):
+        self.first = first
+        self.inner_first = inner_first
+        self.min_inner_first = min_inner_first
+        self.target_share = target_share
+        self.headroom = headroom
+        self.window = window
+
+        # first / inner first the last page was sent with
+        self.last_first = first
+        self.last_inner_first = inner_first
+
+        # requested cost per parent per (1 + inner first), learned from the first response
+        self.unit_cost = None
+        self.recent_counts = []
+
+    def update(self, data, inner_counts, seconds):
+        """
+        Resizes first / inner_first after a page, from its response body, the child count of each parent on it,
+        and the request's round trip seconds.
+        """
+
+        cost = (data.get("extensions") or {}).get("cost")
+
+        if inner_counts:
+            self.recent_counts = (self.recent_counts + inner_counts)[-self.window :]
+            largest = max(self.recent_counts)
+            self.inner_first = min(
+                MAX_CONNECTION_FIRST,
+                max(self.min_inner_first, math.ceil(largest * self.headroom)),
+            )
+
+        if not cost:
+            return
+
+        requested = cost.get("requestedQueryCost")
+        actual = cost.get("actualQueryCost")
+        status = cost["throttleStatus"]
+
+        if requested:
+            self.unit_cost = requested / (self.last_first * (1 + self.last_inner_first))
+            if actual is not None:
+                metrics.set_gauge("graphql_cost_efficiency", round(actual / requested, 3), query="products")
+
+        budget = min(
+            MAX_QUERY_COST,
+            status["maximumAvailable"] * self.target_share,
+            (status["currentlyAvailable"] + status["restoreRate"] * seconds) * 0.9,
+        )
+        # never below a second's restore, so a drained bucket still makes pages worth a round trip
+        budget = max(budget, status["restoreRate"])
+
+        if self.unit_cost:
+            per_parent = self.unit_cost * (1 + self.inner_first)
+            self.first = max(1, min(MAX_CONNECTION_FIRST, int(budget // per_parent)))
+
+    def expected_cost(self):
+        """Returns the requested cost expected for the next page, or None before the first response."""
+
+        if self.unit_cost is None:
+            return None
+        return math.ceil(self.unit_cost * self.first * (1 + self.inner_first))
 
-    store_name = os.getenv("store_name")
-    access_token = os.getenv("access_token")
+    def next_page(self):
+        """Returns (first, inner_first) for the next page."""
 
-    url = f"https://{store_name}.myshopify.com/admin/api/2025-10/graphql.json"
+        self.last_first = self.first
+        self.last_inner_first = self.inner_first
+        return self.first, self.inner_first
 
-    headers = {
-        "X-Shopify-Access-Token": access_token,
-        "Content-Type": "application/json",
+
+def get_remaining_product_variants(client, product_id, cursor):
+    """Pages through a product's variants after cursor, for products with more variants than a page held.
+    Returns a list of variant nodes."""
+
+    query = """
+    query getProductVariants($id: ID!, $first: Int!, $cursor: String) {
+      product(id: $id) {
+        variants(first: $first, after: $cursor) {
+          edges {
+            node {
+              %(variant_fields)s
+            }
+          }
+          pageInfo {
+            hasNextPage
+            endCursor
+          }
+        }
+      }
     }
+    """ % {
+        "variant_fields": projections.selection_set(projections.GRAPHQL_VARIANT_COLUMNS),
+    }
+
+    nodes = []
+
+    while cursor:
+        variables = {"id": product_id, "first": MAX_CONNECTION_FIRST, "cursor": cursor}
+        data = client.graphql(query, variables)
+
+        if "errors" in data:
+            raise Exception(f"GraphQL query failed: {data['errors']}")
+
+        variants = data["data"]["product"]["variants"]
+        nodes.extend(edge["node"] for edge in variants["edges"])
+
+        page_info = variants["pageInfo"]
+        cursor = page_info["endCursor"] if page_info["hasNextPage"] else None
+
+    return nodes
+
+
+def get_product_variants_df(sizer=None):
+    """Return a df of all product variants from the Shopify store via GraphQL API.
+    Page sizes adapt to the reported query cost (see NestedPageSizer); products with more variants than fit on a
+    page have the rest paged in separately."""
+
+    client = get_client()
+    sizer = sizer or NestedPageSizer()
 
     query = """
-    query getProducts($cursor: String) {
-      products(first: 50, after: $cursor) {
+    query getProducts($first: Int!, $variantsFirst: Int!, $cursor: String) {
+      products(first: $first, after: $cursor) {
         edges {
           cursor
           node {
-            id
-            title
-            handle
-            variants(first: 100) {
+            %(product_fields)s
+            variants(first: $variantsFirst) {
               edges {
                 node {
-                  id
-                  title
-                  sku
-                  price
-                  inventoryQuantity
-                  barcode
+                  %(variant_fields)s
                 }
               }
+              pageInfo {
+                hasNextPage
+                endCursor
+              }
             }
           }
         }
@@ -78,82 +369,172 @@ def get_product_variants_df():
         }
       }
     }
-    """
+    """ % {
+        "product_fields": projections.selection_set(projections.GRAPHQL_PRODUCT_COLUMNS),
+        "variant_fields": projections.selection_set(projections.GRAPHQL_VARIANT_COLUMNS),
+    }
 
     all_variants = []
     cursor = None
 
     while True:
-        variables = {"cursor": cursor}
-        response = requests.post(
-            url, headers=headers, json={"query": query, "variables": variables}
-        )
+        first, variants_first = sizer.next_page()
+        variables = {"first": first, "variantsFirst": variants_first, "cursor": cursor}
+
+        started = time.monotonic()
+        data = client.graphql(query, variables, expected_cost=sizer.expected_cost())
+        seconds = time.monotonic() - started
 
-        if response.status_code != 200:
-            raise Exception(f"GraphQL query failed: {response.text}")
+        if "errors" in data:
+            raise Exception(f"GraphQL query failed: {data['errors']}")
 
-        data = response.json()
         products = data["data"]["products"]
+        variant_counts = []
 
         for product_edge in products["edges"]:
             product = product_edge["node"]
-            for variant_edge in product["variants"]["edges"]:
-                variant = variant_edge["node"]
+            product_columns = projections.project_node(product, projections.GRAPHQL_PRODUCT_COLUMNS)
+
+            variants = product["variants"]
+            nodes = [edge["node"] for edge in variants["edges"]]
+
+            # more variants than this page asked for: page through the rest of this product's
+            if variants["pageInfo"]["hasNextPage"]:
+                nodes += get_remaining_product_variants(
+                    client, product["id"], variants["pageInfo"]["endCursor"]
+                )
+
+            variant_counts.append(len(nodes))
+
+            for node in nodes:
                 all_variants.append(
                     {
-                        "product_id": product["id"],
-                        "product_title": product["title"],
-                        "product_handle": product["handle"],
-                        "variant_id": variant["id"],
-                        "variant_title": variant["title"],
-                        "sku": variant["sku"],
-                        "price": variant["price"],
-                        "inventory_quantity": variant["inventoryQuantity"],
-                        "barcode": variant["barcode"],
+                        **product_columns,
+                        **projections.project_node(node, projections.GRAPHQL_VARIANT_COLUMNS),
                     }
                 )
 
+        sizer.update(data, variant_counts, seconds)
+
         if products["pageInfo"]["hasNextPage"]:
             cursor = products["pageInfo"]["endCursor"]
         else:
             break
 
-    df = pd.DataFrame(all_variants)
+    df = schemas.compact_df(pd.DataFrame(all_variants), "productvariants")
     return df
 
 
-def get_all_orders_df():
-    """Return a df of all orders from the Shopify store. (REST API)"""
+def get_all_orders_df(chunked=False, child_tables=False, status=None):
+    """Return a df of all orders from the Shopify store. (REST API)
+    By default Shopify returns only open orders; pass status="any" to include closed and cancelled ones.
+    Follows Link header pagination. With chunked=True, returns a generator of one df per page instead,
+    with the next page prefetched while the current one is processed.
+    Nested arrays come back as json strings; with child_tables=True they are split out instead and a dict of
+    table name -> df is returned (see CHILD_TABLES).
+    """
+
+    base_url = get_client().rest_url("orders.json")
+
+    params = {"limit": 250}
+    if status is not None:
+        params["status"] = status
+
+    params = projections.rest_params("orders", params)
+
+    chunks = iter_rest_df_chunks(base_url, params, "orders", child_tables)
+
+    if chunked:
+        return chunks
 
-    store_name = os.getenv("store_name")
-    access_token = os.getenv("access_token")
+    return concat_df_chunks(chunks)
 
-    base_url = (
-        f"https://{store_name}.myshopify.com/admin/api/2025-10/orders.json"
+
+# extra list params per REST resource for incremental pulls. Orders can be sorted by updated_at,
+# which lets an expired page cursor be replaced by restarting from the last loaded updated_at.
+INCREMENTAL_PARAMS = {
+    "orders": {"status": "any", "order": "updated_at asc"},
+    "customers": {},
+    "products": {},
+}
+
+
+def iter_incremental_pages(
+    resource, last_updated_dt, update_buffer=600, resume_url=None, updated_at_max=None
+):
+    """
+    Yields (records, next page url) per page of a REST resource ("orders", "customers", "products")
+    updated after the given date, and optionally at or before updated_at_max (a datetime). (REST API)
+    Pass a saved next page url as resume_url to continue an interrupted pagination instead of starting over.
+    """
+
+    if resume_url:
+        return iter_rest_pages_with_next(resume_url, None, resource)
+
+    base_url = get_client().rest_url(f"{resource}.json")
+
+    start_dt = (last_updated_dt - timedelta(seconds=update_buffer)).isoformat()
+
+    # set min update_at dt
+    params = projections.rest_params(
+        resource, {"limit": 250, "updated_at_min": start_dt, **INCREMENTAL_PARAMS[resource]}
     )
 
-    headers = {
-        "X-Shopify-Access-Token": access_token,
-        "Content-Type": "application/json",
-    }
+    if updated_at_max:
+        params["updated_at_max"] = updated_at_max.isoformat()
 
-    params = {"limit": 250}
+    return iter_rest_pages_with_next(base_url, params, resource)
 
-    response = requests.get(base_url, headers=headers, params=params)
 
-    data = response.json()
+def split_time_windows(start_dt, end_dt, window):
+    """Splits [start_dt, end_dt) into consecutive (start, end) windows of at most `window` (a timedelta) each."""
 
-    df = pd.json_normalize(data["orders"])
+    windows = []
+    window_start = start_dt
+    while window_start < end_dt:
+        window_end = min(window_start + window, end_dt)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
 
-    # missing pagination for now
 
-    return df
+def iter_incremental_order_pages(last_updated_dt, update_buffer=600, resume_url=None):
+    """Yields (orders, next page url) per page of orders updated after the given date, oldest first. (REST API)"""
+
+    return iter_incremental_pages("orders", last_updated_dt, update_buffer, resume_url)
+
+
+def get_incremental_df(
+    resource, last_updated_dt, update_buffer=600, child_tables=False, updated_at_max=None
+):
+    """Return a df of a REST resource's records updated after the given date (see get_incremental_orders_df)."""
 
+    all_records = []
+
+    pages = iter_incremental_pages(
+        resource, last_updated_dt, update_buffer, updated_at_max=updated_at_max
+    )
+
+    for records, next_url in pages:
+        all_records.extend(records)
+
+    if not all_records:
+        return pd.DataFrame()
 
-def get_incremental_orders_df(last_updated_dt, update_buffer=600):
+    if child_tables:
+        return split_child_tables(all_records, resource)
+
+    return normalize_records(all_records, resource)
+
+
+def get_incremental_orders_df(
+    last_updated_dt, update_buffer=600, child_tables=False, updated_at_max=None
+):
     """Return a df of orders updated after the given date from the Shopify store. (REST API)
     last_update_dt passed as datetime object, like datetime(2025, 11, 1, 0, 0)
     Update_buffer helps pull back those n seconds before the latest updated date in case of timing issues.
+    updated_at_max optionally caps the window, for pulling one time slice of a larger range.
+    With child_tables=True, returns {"orders": df, "orders_lineitems": df} instead of line items as json.
 
 
     last_updated_dt = datetime(2025, 11, 1, 0, 0)
@@ -161,91 +542,103 @@ def get_incremental_orders_df(last_updated_dt, update_buffer=600):
 
     """
 
-    store_name = os.getenv("store_name")
-    access_token = os.getenv("access_token")
-
-    base_url = (
-        f"https://{store_name}.myshopify.com/admin/api/2025-10/orders.json"
+    return get_incremental_df(
+        "orders", last_updated_dt, update_buffer, child_tables, updated_at_max
     )
 
-    start_dt = (last_updated_dt - timedelta(seconds=update_buffer)).isoformat()
 
-    headers = {
-        "X-Shopify-Access-Token": access_token,
-        "Content-Type": "application/json",
-    }
+def get_incremental_customers_df(last_updated_dt, update_buffer=600, child_tables=False):
+    """Return a df of customers updated after the given date, with the same buffer semantics as get_incremental_orders_df. (REST API)"""
 
-    # set min update_at dt, sort by date for pagination's sake
-    params = {
-        "limit": 250,
-        "status": "any",
-        "updated_at_min": start_dt,
-        "order": "updated_at asc",
-    }
+    return get_incremental_df("customers", last_updated_dt, update_buffer, child_tables)
 
-    all_orders = []
-    url = base_url
 
-    while True:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
+def get_incremental_products_df(last_updated_dt, update_buffer=600, child_tables=False):
+    """Return a df of products updated after the given date, with the same buffer semantics as get_incremental_orders_df. (REST API)
+    Deleted products don't show up here; the full get_all_products_df refresh is still needed to drop them.
+    """
 
-        data = response.json()
+    return get_incremental_df("products", last_updated_dt, update_buffer, child_tables)
 
-        orders = data.get("orders", [])
-        all_orders.extend(orders)
 
-        link_header = response.headers.get("Link", "")
+def get_incremental_product_variants_df(last_updated_dt, update_buffer=600):
+    """Return a df of product variants updated after the given date, same columns as get_product_variants_df. (GraphQL API)
+    Filters with productVariants(query: "updated_at:>..."), with the same buffer semantics as get_incremental_orders_df.
+    """
 
-        next_url = None
-        if 'rel="next"' in link_header:
-            parts = link_header.split(",")
-            for p in parts:
-                if 'rel="next"' in p:
-                    # extract the URL between < and >
-                    next_url = p[p.find("<") + 1 : p.find(">")]
-                    break
+    client = get_client()
 
-        if not next_url:
-            break
+    start_dt = (last_updated_dt - timedelta(seconds=update_buffer)).isoformat()
 
-        url = next_url
-        params = None
+    query = """
+    query getVariants($cursor: String, $query: String) {
+      productVariants(first: 250, after: $cursor, query: $query) {
+        edges {
+          node {
+            %(variant_fields)s
+            product {
+              %(product_fields)s
+            }
+          }
+        }
+        pageInfo {
+          hasNextPage
+          endCursor
+        }
+      }
+    }
+    """ % {
+        "product_fields": projections.selection_set(projections.GRAPHQL_PRODUCT_COLUMNS),
+        "variant_fields": projections.selection_set(projections.GRAPHQL_VARIANT_COLUMNS),
+    }
 
-    if not all_orders:
-        return pd.DataFrame()
+    all_variants = []
+    cursor = None
 
-    df = pd.json_normalize(all_orders)
+    while True:
+        variables = {"cursor": cursor, "query": f"updated_at:>'{start_dt}'"}
+        data = client.graphql(query, variables)
+
+        if "errors" in data:
+            raise Exception(f"GraphQL query failed: {data['errors']}")
+
+        variants = data["data"]["productVariants"]
+
+        for variant_edge in variants["edges"]:
+            variant = variant_edge["node"]
+            all_variants.append(
+                {
+                    **projections.project_node(
+                        variant["product"], projections.GRAPHQL_PRODUCT_COLUMNS
+                    ),
+                    **projections.project_node(variant, projections.GRAPHQL_VARIANT_COLUMNS),
+                }
+            )
 
-    if "line_items" in df.columns:
-        df["line_items"] = df["line_items"].apply(lambda j: json.dumps(j))
+        if variants["pageInfo"]["hasNextPage"]:
+            cursor = variants["pageInfo"]["endCursor"]
+        else:
+            break
 
+    df = schemas.compact_df(pd.DataFrame(all_variants), "productvariants")
     return df
 
 
-def get_all_customers_df():
-    """Return a df of all customers from the Shopify store. (REST API)"""
-
-    store_name = os.getenv("store_name")
-    access_token = os.getenv("access_token")
-
-    base_url = (
-        f"https://{store_name}.myshopify.com/admin/api/2025-10/customers.json"
-    )
-
-    headers = {
-        "X-Shopify-Access-Token": access_token,
-        "Content-Type": "application/json",
-    }
-
-    params = {"limit": 250}
+def get_all_customers_df(chunked=False, child_tables=False):
+    """Return a df of all customers from the Shopify store. (REST API)
+    Follows Link header pagination. With chunked=True, returns a generator of one df per page instead,
+    with the next page prefetched while the current one is processed.
+    Nested arrays come back as json strings; with child_tables=True they are split out instead and a dict of
+    table name -> df is returned (see CHILD_TABLES).
+    """
 
-    response = requests.get(base_url, headers=headers, params=params)
+    base_url = get_client().rest_url("customers.json")
 
-    data = response.json()
+    params = projections.rest_params("customers", {"limit": 250})
 
-    df = pd.json_normalize(data["customers"])
+    chunks = iter_rest_df_chunks(base_url, params, "customers", child_tables)
 
-    # missing pagination for now
+    if chunked:
+        return chunks
 
-    return df
+    return concat_df_chunks(chunks)
@@ -1,19 +1,117 @@
-import os
-import requests
-import pandas as pd
 import json
 from dotenv import load_dotenv
 import random
-from faker import Faker
 from datetime import datetime, timedelta
+import asyncio
+import threading
 import time
 import shopify_gen as sho
+from shopify_client import get_client
+from seeding import run_seeding, run_batched_seeding
+from shopify_batch import BatchMutation
+from sampling import get_customer_sampler
 
 load_dotenv()
 
 # https://shopify.dev/docs/api/admin-graphql#rate-limits
 
 
+# orderCreate / customerCreate payload selections, shared by the single and batched creates
+ORDER_SELECTION = """
+            order {
+              id
+              name
+              email
+              createdAt
+              processedAt
+              shippingAddress {
+                firstName
+                lastName
+                address1
+                city
+                province
+                country
+                zip
+              }
+              billingAddress {
+                firstName
+                lastName
+                address1
+                city
+                province
+                country
+                zip
+              }
+              totalPriceSet {
+                shopMoney {
+                  amount
+                  currencyCode
+                }
+              }
+            }
+"""
+
+CUSTOMER_SELECTION = """
+        customer {
+          id
+          firstName
+          lastName
+          email
+          phone
+          createdAt
+          addresses {
+            id
+            address1
+            city
+            province
+            country
+            zip
+          }
+        }
+"""
+
+# orderCreate needs 2024-10 or later
+ORDER_API_VERSION = "2025-01"
+
+
+def order_input(customerId, lineItemList, addressDict, processedAt=None):
+    """Returns the OrderCreateOrderInput for create_order_narrowscope's arguments (same address for billto and shipto)."""
+
+    order = {
+        "customerId": f"gid://shopify/Customer/{customerId}",
+        "lineItems": lineItemList,
+        "shippingAddress": addressDict,
+        "billingAddress": addressDict,
+        "financialStatus": "PAID",
+    }
+
+    # if processedAt is included, added it to the payload
+    if processedAt:
+        order["processedAt"] = processedAt
+
+    return order
+
+
+def customer_input(first_name, last_name, email, address1, city, province, country, zipcode, phone=None):
+    """Returns the CustomerInput for create_customer's arguments."""
+
+    return {
+        "firstName": first_name,
+        "lastName": last_name,
+        "email": email,
+        "phone": phone,
+        "addresses": [
+            {
+                "address1": address1,
+                "city": city,
+                "province": province,
+                "country": country,
+                "zip": zipcode,
+            }
+        ],
+    }
+
+
 def create_order_narrowscope(customerId, lineItemList, addressDict, processedAt=None):
     """Create a single order with limited scope for the purposes of mocking up orders.
 
@@ -21,6 +119,8 @@ def create_order_narrowscope(customerId, lineItemList, addressDict, processedAt=
     lineItemList - a list of dicts, one list item per lineitem, each list item a dict of variantID and quantity
     addressDict - a dict of firstName, lastName, address1, city, province, country, zip; will use same address for billto and shipto
 
+    Returns the created order dict, or None if the order was rejected.
+
     example args:
         customerId = 9413291442458
         lineItemList = [
@@ -46,50 +146,11 @@ def create_order_narrowscope(customerId, lineItemList, addressDict, processedAt=
 
     """
 
-    store_name = os.getenv("store_name")
-    access_token = os.getenv("access_token")
-
-    base_url = f"https://{store_name}.myshopify.com/admin/api/2025-01/graphql.json"
-
-    headers = {
-        "X-Shopify-Access-Token": access_token,
-        "Content-Type": "application/json",
-    }
-
-    mutation = """
+    mutation = (
+        """
         mutation CreateOrder($order: OrderCreateOrderInput!) {
           orderCreate(order: $order) {
-            order {
-              id
-              name
-              email
-              createdAt
-              processedAt
-              shippingAddress {
-                    firstName
-                    lastName
-                    address1
-                    city
-                    province
-                    country
-                    zip
-                  }
-                  billingAddress {
-                    firstName
-                    lastName
-                    address1
-                    city
-                    province
-                    country
-                    zip
-                  }
-              totalPriceSet {
-                shopMoney {
-                  amount
-                  currencyCode
-                }
-              }
-            }
+            %s
             userErrors {
               field
               message
@@ -97,67 +158,31 @@ def create_order_narrowscope(customerId, lineItemList, addressDict, processedAt=
           }
         }
         """
+        % ORDER_SELECTION
+    )
 
-    variables = {
-        "order": {
-            # "email": "customerr@example.com",
-            # "customerId": "gid://shopify/Customer/9413291442458",
-            "customerId": f"gid://shopify/Customer/{customerId}",
-            "lineItems": lineItemList,
-            "shippingAddress": addressDict,
-            "billingAddress": addressDict,
-            # "processedAt": processedAt,
-            # "lineItems": [
-            #     {
-            #         "variantId": "gid://shopify/ProductVariant/51245325123866",
-            #         "quantity": 1,
-            #     },
-            #     {
-            #         "variantId": "gid://shopify/ProductVariant/51245325680922",
-            #         "quantity": 2,
-            #     },
-            # ],
-            # "shippingAddress": {
-            #     "firstName": "Jane",
-            #     "lastName": "Doe",
-            #     "address1": "123 Main St",
-            #     "city": "Milwaukee",
-            #     "province": "WI",
-            #     "country": "US",
-            #     "zip": "53202",
-            # },
-            # "billingAddress": {
-            #     "firstName": "Jane",
-            #     "lastName": "Doe",
-            #     "address1": "123 Main St",
-            #     "city": "Milwaukee",
-            #     "province": "WI",
-            #     "country": "US",
-            #     "zip": "53202",
-            # },
-            "financialStatus": "PAID",
-        }
-    }
+    variables = {"order": order_input(customerId, lineItemList, addressDict, processedAt)}
 
-    # if processedAt is included, added it to the payload
-    if processedAt:
-        variables["order"]["processedAt"] = processedAt
+    try:
+        data = get_client(ORDER_API_VERSION).graphql(mutation, variables)
+    except Exception as e:
+        print(f"HTTP error: {e}")
+        return None
 
-    response = requests.post(
-        base_url,
-        headers=headers,
-        json={"query": mutation, "variables": variables},
-    )
+    if "errors" in data:
+        print("GraphQL errors:", json.dumps(data["errors"], indent=2))
+        return None
 
-    if response.status_code == 200:
-        data = response.json()
-        if "errors" in data:
-            print("GraphQL errors:", json.dumps(data["errors"], indent=2))
-        else:
-            print(json.dumps(data, indent=2))
-            print("Order created successfully")
-    else:
-        print(f"HTTP error {response.status_code}: {response.text}")
+    userErrorList = data["data"]["orderCreate"]["userErrors"]
+    if len(userErrorList) > 0:
+        for e in userErrorList:
+            print(f"Error: {e['field']} || {e['message']}")
+        return None
+
+    print(json.dumps(data, indent=2))
+    print("Order created successfully")
+
+    return data["data"]["orderCreate"]["order"]
 
 
 def create_customer(
@@ -187,36 +212,11 @@ def create_customer(
     create_customer('testf1', 'testl1', 'test11@test.com')
     """
 
-    store_name = os.getenv("store_name")
-    access_token = os.getenv("access_token")
-
-    url = f"https://{store_name}.myshopify.com/admin/api/2025-10/graphql.json"
-
-    headers = {
-        "X-Shopify-Access-Token": access_token,
-        "Content-Type": "application/json",
-    }
-
-    query = """
+    query = (
+        """
     mutation createCustomer($input: CustomerInput!) {
       customerCreate(input: $input) {
-        customer {
-          id
-          firstName
-          lastName
-          email
-          phone
-          createdAt
-          addresses {
-              id
-              address1
-              city
-              province
-              country
-              zip
-              }
-        
-        }
+        %s
         userErrors {
           field
           message
@@ -224,32 +224,16 @@ def create_customer(
       }
     }
     """
+        % CUSTOMER_SELECTION
+    )
 
     variables = {
-        "input": {
-            "firstName": first_name,
-            "lastName": last_name,
-            "email": email,
-            "phone": phone,
-            "addresses": [
-                {
-                    "address1": address1,
-                    "city": city,
-                    "province": province,
-                    "country": country,
-                    "zip": zipcode,
-                }
-            ],
-        }
+        "input": customer_input(
+            first_name, last_name, email, address1, city, province, country, zipcode, phone
+        )
     }
 
-    response = requests.post(
-        url, headers=headers, json={"query": query, "variables": variables}
-    )
-    data = response.json()
-
-    if response.status_code != 200:
-        raise Exception(f"Request failed: {response.text}")
+    data = get_client().graphql(query, variables)
 
     if "errors" in data:
         errorlist = data["errors"]
@@ -287,19 +271,13 @@ def get_random_citystatezip():
     Returns the city, state, zipcode values of a random location in the USA, weighted by population.
 
     Uses dataset from here: https://www.kaggle.com/datasets/bwandowando/us-zip-codes-database-from-simplemaps-com?resource=download
+    The ZIP table is loaded once by the shared sampler (see sampling.py).
 
     """
 
-    dataloc = "../data_supp/uszips.csv"
-
-    # ensure leading zeros on zip are retained
-    df = pd.read_csv(dataloc, dtype={"zip": str})
-
-    randloc = df.sample(n=1, weights="population", random_state=None)
+    cities, states, zips = get_customer_sampler().locations.sample(1)
 
-    city, state, zipcode = randloc.iloc[0][["city", "state_id", "zip"]]
-
-    return city, state, zipcode
+    return cities[0], states[0], zips[0]
 
 
 def get_fake_nameaddressemail_dict():
@@ -308,40 +286,25 @@ def get_fake_nameaddressemail_dict():
 
     """
 
-    fake = Faker()
-
-    # get fake random first and last name
-    firstName = fake.first_name()
-    lastName = fake.last_name()
-    email = fake.email()
+    addr = get_customer_sampler().sample(1)[0]
 
-    # get fake random address from Faker, but just keep the first address line
-    address = fake.address()
-    address1 = address.split("\n")[0]
+    print(addr)
 
-    # get a legit city/state/zip
-    city, state, zipcode = get_random_citystatezip()
+    return addr
 
-    addr = {
-        "firstName": firstName,
-        "lastName": lastName,
-        "address1": address1,
-        "city": city,
-        "province": state,
-        "country": "US",
-        "zip": zipcode,
-        "email": email,
-    }
 
-    print(addr)
+def get_fake_nameaddressemail_dicts(n):
+    """Returns a list of n fake customer dicts (see get_fake_nameaddressemail_dict), drawn in one vectorized call."""
 
-    return addr
+    return get_customer_sampler().sample(n)
 
 
 def customer_single_generator():
+    """Create a single random customer. Returns the created customer dict, or None if it was rejected."""
+
     d = get_fake_nameaddressemail_dict()
 
-    create_customer(
+    return create_customer(
         d["firstName"],
         d["lastName"],
         d["email"],
@@ -353,6 +316,55 @@ def customer_single_generator():
     )
 
 
+customer_batcher = BatchMutation(
+    "customerCreate", ("input", "CustomerInput!"), CUSTOMER_SELECTION, "customer"
+)
+
+order_batcher = BatchMutation(
+    "orderCreate", ("order", "OrderCreateOrderInput!"), ORDER_SELECTION, "order", api_version=ORDER_API_VERSION
+)
+
+
+def create_customers_batch(customerDicts):
+    """
+    Create many customers in one aliased customerCreate document (see shopify_batch.py).
+    customerDicts - a list of get_fake_nameaddressemail_dict style dicts.
+    Returns (created, failed): {position: customer dict} and {position: error message}.
+    """
+
+    inputs = [
+        customer_input(
+            d["firstName"], d["lastName"], d["email"], d["address1"], d["city"], d["province"], d["country"], d["zip"]
+        )
+        for d in customerDicts
+    ]
+
+    return customer_batcher.send(inputs)
+
+
+def create_orders_batch(payloads):
+    """
+    Create many orders in one aliased orderCreate document (see shopify_batch.py).
+    payloads - a list of create_order_narrowscope kwargs dicts, as build_order_payloads returns.
+    Returns (created, failed): {position: order dict} and {position: error message}.
+    """
+
+    return order_batcher.send([order_input(**payload) for payload in payloads])
+
+
+def batch_by_index(create_batch_fn, items):
+    """Wraps a create_*_batch function to take item indexes and key its results by index, for run_batched_seeding."""
+
+    def create(indexes):
+        created, failed = create_batch_fn([items[i] for i in indexes])
+        return (
+            {indexes[pos]: record for pos, record in created.items()},
+            {indexes[pos]: error for pos, error in failed.items()},
+        )
+
+    return create
+
+
 def pick_random_date_last_24_months():
     """Pick a random date within the last 24 months."""
 
@@ -365,74 +377,202 @@ def pick_random_date_last_24_months():
     return random_date.isoformat() + "Z"
 
 
-def order_single_generator(randDate=False):
-    """Generate a single random order."""
-
-    # gather random single existing customer (need name, address, email)
-    dfcust = sho.get_all_customers_df().sample(n=1)
-
-    customerId = int(dfcust["id"].values[0])
-
-    # build cust address dict for order
-    addressDict = {
-        "firstName": dfcust["default_address.first_name"].values[0],
-        "lastName": dfcust["default_address.last_name"].values[0],
-        "address1": dfcust["default_address.address1"].values[0],
-        "city": dfcust["default_address.city"].values[0],
-        "province": dfcust["default_address.province"].values[0],
-        "country": dfcust["default_address.country"].values[0],
-        "zip": dfcust["default_address.zip"].values[0],
-    }
+class StoreSnapshot:
+    """
+    In-process cache of the customers (id + default address) and variant ids that simulated orders draw from,
+    so a run of orders shares one customer pull and one variant crawl instead of refetching per order.
+
+    The snapshot refreshes itself once older than ttl seconds; call invalidate() after seeding new customers
+    or products to force a refetch on next use.
+    """
+
+    def __init__(self, ttl=900):
+        self.ttl = ttl
+        self.customers = []
+        self.variants = []
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded_at = None
+
+    def is_stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+
+    def refresh(self):
+        """Pulls customers and variants from the store."""
+
+        dfcust = sho.get_all_customers_df()
+
+        # customers without a default address can't be used for a ship-to
+        if "default_address.address1" in dfcust.columns:
+            dfcust = dfcust[dfcust["default_address.address1"].notna()]
+        else:
+            dfcust = dfcust.iloc[0:0]
+
+        customers = [
+            (
+                int(row["id"]),
+                {
+                    "firstName": row["default_address.first_name"],
+                    "lastName": row["default_address.last_name"],
+                    "address1": row["default_address.address1"],
+                    "city": row["default_address.city"],
+                    "province": row["default_address.province"],
+                    "country": row["default_address.country"],
+                    "zip": row["default_address.zip"],
+                },
+            )
+            for row in dfcust.to_dict("records")
+        ]
+
+        # gather all existing product variants (need the ids)
+        variants = sho.get_product_variants_df()["variant_id"].tolist()
+
+        if not customers or not variants:
+            raise Exception("Store has no customers with an address, or no product variants, to build orders from")
+
+        self.customers = customers
+        self.variants = variants
+        self.loaded_at = time.monotonic()
+
+        print(f"Snapshot loaded: {len(customers)} customers, {len(variants)} variants")
 
-    # gather all existing product variants (need the ids)
-    dfvars = sho.get_product_variants_df()
+    def get(self):
+        """Returns (customers, variants), refreshing first if the snapshot is stale."""
 
-    # get a list of variant IDs to select from
-    variants = dfvars["variant_id"].tolist()
+        with self.lock:
+            if self.is_stale():
+                self.refresh()
 
-    # get the randomly selected count of line items for the order
-    lineCount = random_number_exp(1, 5, 3)
+            return self.customers, self.variants
 
-    lineItemList = []
-    for i in range(0, lineCount):
-        # randomly select a variant, randomly choose the number ordered
-        variant = random.choice(variants)
-        quantity = random_number_exp(1, 3, 3)
 
-        lineItemList.append({"variantId": variant, "quantity": quantity})
+store_snapshot = StoreSnapshot()
+
+
+def build_order_payloads(orderCount, randDate=False, snapshot=None):
+    """
+    Build orderCount random order payloads from the cached store snapshot in one pass.
+    Returns a list of dicts of create_order_narrowscope kwargs: customerId, lineItemList, addressDict, processedAt.
+    """
+
+    customers, variants = (snapshot or store_snapshot).get()
 
-    # randomly select a date, if option picked, else it'll be the current time
-    if randDate:
-        processedAt = pick_random_date_last_24_months()
-    else:
-        processedAt = None
+    payloads = []
+    for _ in range(orderCount):
+        # random single existing customer, with their default address used for the order
+        customerId, addressDict = random.choice(customers)
 
-    create_order_narrowscope(customerId, lineItemList, addressDict, processedAt)
+        # get the randomly selected count of line items for the order
+        lineCount = random_number_exp(1, 5, 3)
+
+        lineItemList = []
+        for i in range(0, lineCount):
+            # randomly select a variant, randomly choose the number ordered
+            variant = random.choice(variants)
+            quantity = random_number_exp(1, 3, 3)
+
+            lineItemList.append({"variantId": variant, "quantity": quantity})
+
+        # randomly select a date, if option picked, else it'll be the current time
+        if randDate:
+            processedAt = pick_random_date_last_24_months()
+        else:
+            processedAt = None
+
+        payloads.append(
+            {
+                "customerId": customerId,
+                "lineItemList": lineItemList,
+                "addressDict": dict(addressDict),
+                "processedAt": processedAt,
+            }
+        )
+
+    return payloads
+
+
+def order_single_generator(randDate=False):
+    """Generate a single random order. Returns the created order dict, or None if it was rejected."""
+
+    payload = build_order_payloads(1, randDate=randDate)[0]
+
+    order = create_order_narrowscope(**payload)
 
     print("done")
 
+    return order
+
+
+def create_multiple_customers(customerCount, concurrency=4, maxAttempts=3, batched=False):
+    """Generate a specified number of customers, keeping `concurrency` customerCreate calls in flight.
+
+    Failed customers are retried up to maxAttempts times without stopping the batch. Returns a SeedReport.
+    With batched, customers go out in cost-sized aliased customerCreate documents (create_customers_batch) and
+    only the ones that failed are sent again.
+    """
 
-def create_multiple_customers(customerCount):
-    """Generate a specified number of customers."""
+    if batched:
+        customerDicts = get_fake_nameaddressemail_dicts(customerCount)
+
+        return asyncio.run(
+            run_batched_seeding(
+                batch_by_index(create_customers_batch, customerDicts),
+                customerCount,
+                customer_batcher.batch_size,
+                concurrency=concurrency,
+                max_attempts=maxAttempts,
+                label="customer",
+            )
+        )
+
+    return asyncio.run(
+        run_seeding(
+            lambda i: customer_single_generator(),
+            customerCount,
+            concurrency=concurrency,
+            max_attempts=maxAttempts,
+            label="customer",
+        )
+    )
 
-    for i in range(0, customerCount):
-        try:
-            customer_single_generator()
-        except:
-            break
-        finally:
-            print(f"Created customer {i+1} of {customerCount}")
 
+def create_multiple_orders(
+    orderCount, ordersPerMinute=5, concurrency=2, maxAttempts=3, batched=False
+):
+    """Generate a specified number of orders. Per Shopify documentation, only 5 allowed per minute on dev stores.
 
-def create_multiple_orders(orderCount):
-    """Generate a specified number of orders. Per Shopify documentation, only 5 allowed per minute on dev stores."""
+    API budget is handled by the shared client; ordersPerMinute only spaces out order starts for the dev store cap
+    (pass None on a store without it). Failed orders are retried without stopping the batch. Returns a SeedReport.
+    All payloads are built up front from the cached store snapshot.
+    With batched, orders go out in cost-sized aliased orderCreate documents (create_orders_batch), each batch
+    taking as many ordersPerMinute slots as it has orders, and only the ones that failed are sent again.
+    """
 
-    for i in range(0, orderCount):
-        try:
-            order_single_generator(randDate=True)
-        except:
-            break
-        finally:
-            print(f"Created order {i+1} of {orderCount}")
-            print("Sleeping 13 seconds...")
-            time.sleep(13)
+    payloads = build_order_payloads(orderCount, randDate=True)
+
+    if batched:
+        return asyncio.run(
+            run_batched_seeding(
+                batch_by_index(create_orders_batch, payloads),
+                orderCount,
+                order_batcher.batch_size,
+                concurrency=concurrency,
+                max_attempts=maxAttempts,
+                rate_per_minute=ordersPerMinute,
+                label="order",
+            )
+        )
+
+    return asyncio.run(
+        run_seeding(
+            lambda i: create_order_narrowscope(**payloads[i]),
+            orderCount,
+            concurrency=concurrency,
+            max_attempts=maxAttempts,
+            rate_per_minute=ordersPerMinute,
+            label="order",
+        )
+    )
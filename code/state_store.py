@@ -0,0 +1,204 @@
+"""
+Local pipeline state, kept in SQLite next to the raw data.
+
+Holds a high-water mark per entity (the max updated_at already loaded), so incremental runs can start without
+querying the warehouse, and a mid-pagination checkpoint (the Link next-page url of the last completed batch), so an
+interrupted run resumes where it stopped instead of starting over.
+
+Also holds the row hash index of each snapshot entity's last loaded snapshot (see change_detection.py), with the
+next snapshot's index staged beside it until its change set is loaded.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+STATE_LOC = "../data_state/pipeline_state.db"
+
+
+class StateStore:
+    """Watermarks and pagination checkpoints per entity ("orders", "customers", ...)."""
+
+    def __init__(self, path=STATE_LOC):
+        self.path = path
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    entity TEXT PRIMARY KEY,
+                    high_water TEXT NOT NULL,
+                    saved_at TEXT NOT NULL
+                )
+                """
+            )
+            for table in ("row_hashes", "row_hashes_staged"):
+                self.conn.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        entity TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        hash INTEGER NOT NULL,
+                        PRIMARY KEY (entity, key)
+                    )
+                    """
+                )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    entity TEXT PRIMARY KEY,
+                    next_url TEXT NOT NULL,
+                    high_water TEXT,
+                    pages_done INTEGER NOT NULL,
+                    saved_at TEXT NOT NULL
+                )
+                """
+            )
+
+    def get_watermark(self, entity):
+        """Returns the entity's high-water mark as a datetime, or None if it has never completed a run."""
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT high_water FROM watermarks WHERE entity = ?", (entity,)
+            ).fetchone()
+
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def set_watermark(self, entity, high_water):
+        """Saves the entity's high-water mark (a datetime)."""
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?)",
+                (entity, high_water.isoformat(), datetime.now().isoformat()),
+            )
+
+    def get_checkpoint(self, entity):
+        """Returns the entity's open checkpoint as a dict of next_url, high_water, pages_done, or None."""
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT next_url, high_water, pages_done FROM checkpoints WHERE entity = ?",
+                (entity,),
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return {
+            "next_url": row[0],
+            "high_water": datetime.fromisoformat(row[1]) if row[1] else None,
+            "pages_done": row[2],
+        }
+
+    def save_checkpoint(self, entity, next_url, high_water, pages_done):
+        """Records that everything before next_url has been loaded, up to high_water."""
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)",
+                (
+                    entity,
+                    next_url,
+                    high_water.isoformat() if high_water else None,
+                    pages_done,
+                    datetime.now().isoformat(),
+                ),
+            )
+
+    def clear_checkpoint(self, entity):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM checkpoints WHERE entity = ?", (entity,))
+
+    def get_row_hashes(self, entity):
+        """Returns the entity's loaded row hash index as a dict of key -> hash (empty if it has none)."""
+
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT key, hash FROM row_hashes WHERE entity = ?", (entity,)
+            ).fetchall()
+
+        return dict(rows)
+
+    def stage_row_hashes(self, entity, hashes):
+        """Stages a new row hash index (a dict or Series of key -> hash) for the entity, until commit_row_hashes."""
+
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM row_hashes_staged WHERE entity = ?", (entity,))
+            self.conn.executemany(
+                "INSERT INTO row_hashes_staged VALUES (?, ?, ?)",
+                ((entity, str(key), int(value)) for key, value in hashes.items()),
+            )
+
+    def get_deleted_row_keys(self, entity):
+        """Returns the keys in the entity's loaded index that are missing from its staged one."""
+
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT key FROM row_hashes WHERE entity = ?
+                AND key NOT IN (SELECT key FROM row_hashes_staged WHERE entity = ?)
+                """,
+                (entity, entity),
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def commit_row_hashes(self, entity):
+        """Replaces the entity's loaded row hash index with the staged one, once its change set is loaded."""
+
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM row_hashes WHERE entity = ?", (entity,))
+            self.conn.execute(
+                "INSERT INTO row_hashes SELECT * FROM row_hashes_staged WHERE entity = ?", (entity,)
+            )
+            self.conn.execute("DELETE FROM row_hashes_staged WHERE entity = ?", (entity,))
+
+    def clear_row_hashes(self, entity):
+        """Forgets the entity's row hash index, so its next snapshot is loaded in full."""
+
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM row_hashes WHERE entity = ?", (entity,))
+            self.conn.execute("DELETE FROM row_hashes_staged WHERE entity = ?", (entity,))
+
+
+state_stores = {}
+
+
+def get_state_store(path=STATE_LOC):
+    """Returns the shared StateStore for a path, opening it on first use."""
+
+    if path not in state_stores:
+        state_stores[path] = StateStore(path)
+
+    return state_stores[path]
+
+
+def max_updated_at(records, current=None):
+    """
+    Returns the latest updated_at among raw Shopify records (as a datetime), or current if none is later.
+    updated_at may be an iso string (raw records) or a datetime (rows of a typed df).
+    """
+
+    for record in records:
+        value = record.get("updated_at")
+        if isinstance(value, datetime):
+            # pandas Timestamps are datetimes; skip NaT, which compares unequal to itself
+            if value != value:
+                continue
+            dt = value.to_pydatetime() if hasattr(value, "to_pydatetime") else value
+        elif value:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        else:
+            continue
+        if current is None or dt > current:
+            current = dt
+    return current
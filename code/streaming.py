@@ -0,0 +1,200 @@
+"""
+Memory-bounded streaming write/load stages for the extract jobs.
+
+The caller feeds normalized pages in; pages are gathered into rolling raw files of rows_per_file rows, and each
+closed file is written and then loaded on background threads. The queues between stages are bounded, so memory stays
+at a few files' worth of rows however big the extract is, and the network fetch never waits on disk or load jobs.
+
+    loader = StreamingLoader("shopify_allorders", extract_df_to_file, load_to_warehouse)
+    for page_df in sho.get_all_orders_df(chunked=True):
+        loader.add_page({"orders": page_df})
+    loader.close()
+"""
+
+import queue
+import threading
+
+import schemas
+from warehouse import dedupe_latest
+
+
+class StreamingLoader:
+    """
+    Rolling raw file writer + loader, running on two background threads.
+
+    Pages are dicts of table name -> df (a parent table plus any child tables); each table gets its own files,
+    loaded to ".raw.<table name>_raw<table_suffix>" (table_suffix is "" unless loading into staging tables). write_file(df, filename, file_format=..., entity=<table name>) returns a file path and
+    load_file(file_path, destination_loc, disposition=...) loads it, like extract.extract_df_to_file / load_to_warehouse.
+
+    With disposition UPSERT, each file is reduced to the newest row per id before it is written.
+
+    A checkpoint can be attached to any page; on_loaded(checkpoint) is called once every file holding that page
+    (and everything before it) has been loaded.
+    """
+
+    def __init__(
+        self,
+        filename,
+        write_file,
+        load_file,
+        disposition="WRITE_APPEND",
+        first_disposition=None,
+        rows_per_file=50000,
+        file_format="parquet",
+        on_loaded=None,
+        queue_size=2,
+        table_suffix="",
+    ):
+        self.filename = filename
+        self.write_file = write_file
+        self.load_file = load_file
+        self.disposition = disposition
+        # e.g. WRITE_TRUNCATE for the first file of a full snapshot, then append the rest
+        self.first_disposition = first_disposition or disposition
+        self.rows_per_file = rows_per_file
+        self.file_format = file_format
+        self.on_loaded = on_loaded
+        self.table_suffix = table_suffix
+
+        self.pending = {}
+        self.pending_rows = 0
+        self.pending_checkpoint = None
+        self.part = 0
+        self.loaded_tables = set()
+        self.error = None
+        self.closed = False
+
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        self.load_queue = queue.Queue(maxsize=queue_size)
+
+        self.writer_thread = threading.Thread(target=self.run_writer, daemon=True)
+        self.loader_thread = threading.Thread(target=self.run_loader, daemon=True)
+        self.writer_thread.start()
+        self.loader_thread.start()
+
+    def check_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def put(self, q, item):
+        """Blocking put that gives up if another stage has failed, so a dead stage can't hang the pipeline."""
+
+        while True:
+            self.check_error()
+            try:
+                q.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def add_page(self, tables, checkpoint=None):
+        """Adds one page (dict of table name -> df). Rolls a file once rows_per_file parent rows have built up."""
+
+        self.check_error()
+
+        for i, (table, df) in enumerate(tables.items()):
+            if df is None or df.empty:
+                continue
+            self.pending.setdefault(table, []).append(df)
+            # the first table is the parent, and it sets the file size
+            if i == 0:
+                self.pending_rows += len(df)
+
+        if checkpoint is not None:
+            self.pending_checkpoint = checkpoint
+
+        if self.pending_rows >= self.rows_per_file:
+            self.roll()
+
+    def roll(self):
+        """Hands the pending pages to the writer as one file per table."""
+
+        if not self.pending and self.pending_checkpoint is None:
+            return
+
+        self.put(self.write_queue, (self.part, self.pending, self.pending_checkpoint))
+
+        self.part += 1
+        self.pending = {}
+        self.pending_rows = 0
+        self.pending_checkpoint = None
+
+    def close(self):
+        """Flushes the last partial file and waits for every write and load to finish."""
+
+        if self.closed:
+            return
+        self.closed = True
+
+        try:
+            self.roll()
+        finally:
+            self.put(self.write_queue, None)
+            self.writer_thread.join()
+            self.loader_thread.join()
+
+        self.check_error()
+
+    def run_writer(self):
+        try:
+            while True:
+                item = self.write_queue.get()
+                if item is None:
+                    break
+
+                part, tables, checkpoint = item
+
+                files = []
+                for table, dfs in tables.items():
+                    df = schemas.concat_compact(dfs)
+                    if self.disposition == "UPSERT":
+                        df = dedupe_latest(df)
+                    file = self.write_file(
+                        df,
+                        f"{self.filename}_{table}_part{part:04d}",
+                        file_format=self.file_format,
+                        entity=table,
+                    )
+                    files.append((table, file))
+
+                self.put(self.load_queue, (files, checkpoint))
+        except Exception as e:
+            self.error = e
+        finally:
+            # always let the loader finish, even after a failure
+            while True:
+                try:
+                    self.load_queue.put(None, timeout=1)
+                    break
+                except queue.Full:
+                    if not self.loader_thread.is_alive():
+                        break
+
+    def run_loader(self):
+        try:
+            while True:
+                item = self.load_queue.get()
+                if item is None:
+                    return
+
+                # after a failure, drain without loading so the writer can exit
+                if self.error is not None:
+                    continue
+
+                files, checkpoint = item
+
+                for table, file in files:
+                    if table in self.loaded_tables:
+                        disposition = self.disposition
+                    else:
+                        disposition = self.first_disposition
+                    self.load_file(file, f".raw.{table}_raw{self.table_suffix}", disposition=disposition)
+                    self.loaded_tables.add(table)
+
+                if checkpoint is not None and self.on_loaded:
+                    self.on_loaded(checkpoint)
+        except Exception as e:
+            self.error = e
+            # keep draining so the writer isn't blocked on a full queue
+            while self.load_queue.get() is not None:
+                pass
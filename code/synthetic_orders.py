@@ -0,0 +1,334 @@
+"""
+Offline synthetic order generator, for load testing the raw layer, warehouse and dbt models at volumes the sandbox
+store can't be seeded to through the API.
+
+Orders are drawn with the live simulation's distributions (shopify_simulation.build_order_payloads): line counts and
+quantities from random_number_exp (1-5 and 1-3, weight 3), processed dates from pick_random_date_last_24_months and
+population-weighted ZIPs for customer addresses - as vectorized numpy draws over a whole chunk of orders (see
+sampling.py), against a generated customer pool and variant catalogue. The same seed and end_dt give the same orders.
+
+Each chunk comes out as the df an orders extract normalizes to (normalize_records(records, "orders"): json_normalize
+column names, line_items as a json string in Shopify's line item shape, compact dtypes), or with child_tables=True
+as {"orders": ..., "orders_lineitems": ...} like split_child_tables, and is written straight to raw files.
+
+    files = write_synthetic_orders(5_000_000, seed=7, child_tables=True)
+    files = write_synthetic_orders(100_000, seed=7, load=True)                  # to synthetic.orders_raw
+    files = write_synthetic_orders(100_000, seed=7, load=True, dataset="raw")   # into the real raw tables
+"""
+
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import extract
+import metrics
+import schemas
+from sampling import (
+    ZIPS_LOC,
+    IdentitySampler,
+    LocationSampler,
+    random_dates_last_24_months,
+    random_number_exp_array,
+)
+
+# 16 digit id ranges, above Shopify's 13-14 digit ids so synthetic rows can't collide with real ones and are easy
+# to tell apart, but under 2**53 so they survive json and float round trips intact
+ORDER_ID_BASE = 1_000_000_000_000_000
+LINE_ITEM_ID_BASE = 2_000_000_000_000_000
+CUSTOMER_ID_BASE = 3_000_000_000_000_000
+PRODUCT_ID_BASE = 4_000_000_000_000_000
+VARIANT_ID_BASE = 5_000_000_000_000_000
+ORDER_NUMBER_BASE = 100001
+
+VENDORS = np.array(["Acme Outfitters", "Northwind", "Summit Goods", "Blue Ridge Co", "Harbor Supply"], dtype=object)
+VARIANT_TITLES = np.array(["Small", "Medium", "Large", "X-Large"], dtype=object)
+
+FINANCIAL_STATUSES = np.array(["paid", "pending", "refunded", "partially_refunded"], dtype=object)
+FINANCIAL_WEIGHTS = [0.85, 0.08, 0.04, 0.03]
+FULFILLED_SHARE = 0.7
+
+TAX_RATE = 0.08
+
+# orders are edited (fulfilled, refunded) up to this long after they are processed
+MAX_UPDATE_DAYS = 30
+
+
+def format_prices(values):
+    """Formats a float array as Shopify's 2 decimal price strings."""
+
+    return pd.Series(values).map("{:.2f}".format)
+
+
+class SyntheticOrderGenerator:
+    """
+    Generates orders chunk by chunk from one seeded numpy generator, with customers drawn from a pool of
+    customer_count and line items from product_count * variants_per_product variants.
+    end_dt is the "now" order dates are drawn back from; it defaults to today's midnight UTC.
+    """
+
+    def __init__(
+        self,
+        seed=0,
+        customer_count=50_000,
+        product_count=2_000,
+        variants_per_product=3,
+        end_dt=None,
+        dataloc=ZIPS_LOC,
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.end_dt = end_dt or datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        self.order_count = 0
+        self.line_count = 0
+
+        self.customers = self.build_customers(customer_count, seed, dataloc)
+        self.variants = self.build_variants(product_count, variants_per_product)
+
+    def build_customers(self, n, seed, dataloc):
+        """Returns the customer pool: ids, identities and population-weighted addresses."""
+
+        first, last, address1, emails = IdentitySampler(seed=seed).sample(n)
+        cities, states, zips = LocationSampler(dataloc, seed=seed).sample(n)
+
+        return pd.DataFrame(
+            {
+                "id": CUSTOMER_ID_BASE + np.arange(n),
+                "email": emails,
+                "first_name": first,
+                "last_name": last,
+                "address1": address1,
+                "city": cities,
+                "province_code": states,
+                "zip": zips,
+            }
+        )
+
+    def build_variants(self, product_count, variants_per_product):
+        """Returns the variant catalogue: ids, product titles, vendors, skus, prices and weights."""
+
+        rng = self.rng
+
+        n = product_count * variants_per_product
+        product_index = np.arange(n) // variants_per_product
+        option_index = np.arange(n) % variants_per_product
+
+        product_titles = "Product " + pd.Series(product_index).astype(str)
+        variant_titles = pd.Series(VARIANT_TITLES[option_index % len(VARIANT_TITLES)])
+
+        return pd.DataFrame(
+            {
+                "variant_id": VARIANT_ID_BASE + np.arange(n),
+                "product_id": PRODUCT_ID_BASE + product_index,
+                "title": product_titles,
+                "variant_title": variant_titles,
+                "name": product_titles + " - " + variant_titles,
+                "sku": "SKU-" + pd.Series(np.arange(n)).astype(str).str.zfill(6),
+                "vendor": VENDORS[rng.integers(0, len(VENDORS), product_count)][product_index],
+                "price": rng.integers(500, 9000, n) / 100,
+                "grams": rng.integers(50, 2000, n),
+            }
+        )
+
+    def generate(self, n, child_tables=False):
+        """
+        Generates the next n orders. Returns the orders df (line_items as a json string), or with child_tables
+        a dict of {"orders": orders without line_items, "orders_lineitems": one row per line item}.
+        """
+
+        rng = self.rng
+
+        order_index = self.order_count + np.arange(n)
+        order_ids = ORDER_ID_BASE + order_index
+        self.order_count += n
+
+        # line items, laid out order by order
+        line_counts = random_number_exp_array(rng, 1, 5, 3, n)
+        line_order = np.repeat(np.arange(n), line_counts)
+        line_total = len(line_order)
+
+        line_ids = LINE_ITEM_ID_BASE + self.line_count + np.arange(line_total)
+        self.line_count += line_total
+
+        variants = self.variants.iloc[rng.integers(0, len(self.variants), line_total)].reset_index(drop=True)
+        quantities = random_number_exp_array(rng, 1, 3, 3, line_total)
+        prices = variants["price"].to_numpy()
+
+        subtotals = np.round(np.bincount(line_order, weights=prices * quantities, minlength=n), 2)
+        taxes = np.round(subtotals * TAX_RATE, 2)
+        totals = np.round(subtotals + taxes, 2)
+        weights = np.bincount(line_order, weights=variants["grams"].to_numpy() * quantities, minlength=n)
+
+        processed_at = random_dates_last_24_months(rng, n, self.end_dt)
+        update_lag = pd.to_timedelta(rng.random(n) ** 3 * MAX_UPDATE_DAYS * 86400, unit="s").round("s")
+        updated_at = (processed_at + update_lag).where(
+            processed_at + update_lag < pd.Timestamp(self.end_dt), pd.Timestamp(self.end_dt)
+        )
+
+        customers = self.customers.iloc[rng.integers(0, len(self.customers), n)].reset_index(drop=True)
+        financial_status = rng.choice(FINANCIAL_STATUSES, n, p=FINANCIAL_WEIGHTS)
+        fulfilled = rng.random(n) < FULFILLED_SHARE
+
+        full_names = customers["first_name"] + " " + customers["last_name"]
+
+        orders = pd.DataFrame(
+            {
+                "id": order_ids,
+                "name": "#" + pd.Series(ORDER_NUMBER_BASE + order_index).astype(str),
+                "order_number": ORDER_NUMBER_BASE + order_index,
+                "email": customers["email"],
+                "created_at": processed_at,
+                "updated_at": updated_at,
+                "processed_at": processed_at,
+                "cancelled_at": pd.NaT,
+                "cancel_reason": None,
+                "closed_at": pd.Series(updated_at).where(fulfilled),
+                "currency": "USD",
+                "presentment_currency": "USD",
+                "financial_status": financial_status,
+                "fulfillment_status": np.where(fulfilled, "fulfilled", None),
+                "source_name": "web",
+                "subtotal_price": subtotals,
+                "total_tax": taxes,
+                "total_discounts": 0.0,
+                "total_price": totals,
+                "current_total_price": totals,
+                "total_line_items_price": subtotals,
+                "total_weight": weights.astype(np.int64),
+                "taxes_included": False,
+                "tags": "",
+                "test": False,
+                "customer.id": customers["id"],
+            }
+        )
+
+        for address in ("billing_address", "shipping_address"):
+            orders[f"{address}.first_name"] = customers["first_name"]
+            orders[f"{address}.last_name"] = customers["last_name"]
+            orders[f"{address}.name"] = full_names
+            orders[f"{address}.address1"] = customers["address1"]
+            orders[f"{address}.city"] = customers["city"]
+            orders[f"{address}.province_code"] = customers["province_code"]
+            orders[f"{address}.zip"] = customers["zip"]
+            orders[f"{address}.country_code"] = "US"
+
+        line_items = pd.DataFrame(
+            {
+                "order_id": order_ids[line_order],
+                "id": line_ids,
+                "variant_id": variants["variant_id"],
+                "product_id": variants["product_id"],
+                "title": variants["title"],
+                "variant_title": variants["variant_title"],
+                "name": variants["name"],
+                "sku": variants["sku"],
+                "vendor": variants["vendor"],
+                "quantity": quantities,
+                "current_quantity": quantities,
+                "fulfillable_quantity": np.where(fulfilled[line_order], 0, quantities),
+                "price": prices,
+                "total_discount": 0.0,
+                "grams": variants["grams"],
+                "fulfillment_service": "manual",
+                "fulfillment_status": np.where(fulfilled[line_order], "fulfilled", None),
+                "requires_shipping": True,
+                "taxable": True,
+                "gift_card": False,
+                "product_exists": True,
+            }
+        )
+
+        if child_tables:
+            return {
+                "orders": schemas.compact_df(orders, "orders"),
+                "orders_lineitems": schemas.compact_df(line_items, "orders_lineitems"),
+            }
+
+        orders["line_items"] = self.line_items_json(line_items, line_order, n)
+
+        return schemas.compact_df(orders, "orders")
+
+    @staticmethod
+    def line_items_json(line_items, line_order, n):
+        """
+        Renders each order's line items as a json array string, column-wise with string concatenation rather
+        than json.dumps per item. Generated values never hold quotes or backslashes, so nothing needs escaping.
+        """
+
+        fulfillment_status = line_items["fulfillment_status"].map(
+            lambda status: f'"{status}"' if status else "null"
+        )
+
+        items = (
+            '{"id": ' + line_items["id"].astype(str)
+            + ', "variant_id": ' + line_items["variant_id"].astype(str)
+            + ', "product_id": ' + line_items["product_id"].astype(str)
+            + ', "title": "' + line_items["title"]
+            + '", "variant_title": "' + line_items["variant_title"]
+            + '", "name": "' + line_items["name"]
+            + '", "sku": "' + line_items["sku"]
+            + '", "vendor": "' + line_items["vendor"].astype(str)
+            + '", "quantity": ' + line_items["quantity"].astype(str)
+            + ', "current_quantity": ' + line_items["current_quantity"].astype(str)
+            + ', "fulfillable_quantity": ' + line_items["fulfillable_quantity"].astype(str)
+            + ', "price": "' + format_prices(line_items["price"])
+            + '", "total_discount": "0.00", "grams": ' + line_items["grams"].astype(str)
+            + ', "fulfillment_service": "manual", "fulfillment_status": ' + fulfillment_status
+            + ', "requires_shipping": true, "taxable": true, "gift_card": false, "product_exists": true}'
+        )
+
+        joined = items.groupby(line_order, sort=False).agg(", ".join)
+
+        return ("[" + joined + "]").reindex(range(n)).to_numpy()
+
+
+@metrics.pipeline_run("synthetic_orders")
+def write_synthetic_orders(
+    order_count,
+    filename="synthetic_orders",
+    seed=0,
+    chunk_size=250_000,
+    child_tables=False,
+    file_format="parquet",
+    load=False,
+    dataset="synthetic",
+    **generator_args,
+):
+    """
+    Generates order_count synthetic orders in chunks of chunk_size and writes each chunk to raw files (one per table
+    with child_tables), optionally appending them to the ".<dataset>.<table>_raw" tables. The dataset defaults to
+    "synthetic", away from the production raw tables; on BigQuery it must already exist.
+    generator_args go to SyntheticOrderGenerator (customer_count, product_count, variants_per_product, end_dt, dataloc).
+    Returns the list of files written.
+    """
+
+    generator = SyntheticOrderGenerator(seed=seed, **generator_args)
+
+    started = time.perf_counter()
+    files = []
+
+    for part, start in enumerate(range(0, order_count, chunk_size)):
+        n = min(chunk_size, order_count - start)
+
+        with metrics.timed("generate", "orders") as event:
+            tables = generator.generate(n, child_tables=child_tables)
+            event["rows"] = n
+
+        if not child_tables:
+            tables = {"orders": tables}
+
+        for table, df in tables.items():
+            file = extract.extract_df_to_file(
+                df, f"{filename}_{table}_part{part:04d}", file_format=file_format, entity=table
+            )
+            files.append(file)
+
+            if load:
+                extract.load_to_warehouse(file, f".{dataset}.{table}_raw", disposition="WRITE_APPEND")
+
+    seconds = time.perf_counter() - started
+    print(f"{order_count} synthetic orders written to {len(files)} files in {seconds:.1f}s")
+
+    return files
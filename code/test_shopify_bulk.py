@@ -0,0 +1,149 @@
+"""
+Bulk operation extraction against the local mock Shopify server (mock_shopify.py).
+
+    cd code && python -m pytest -q test_shopify_bulk.py
+"""
+
+import json
+import time
+import urllib.request
+
+import pytest
+
+import mock_shopify
+
+RUN_BULK_MUTATION = """
+mutation runBulk($query: String!) {
+  bulkOperationRunQuery(query: $query) { bulkOperation { id status } userErrors { field message } }
+}
+"""
+
+POLL_BULK_QUERY = """
+query pollBulk($id: ID!) {
+  node(id: $id) { ... on BulkOperation { id status errorCode objectCount url } }
+}
+"""
+
+
+@pytest.fixture
+def mock_store():
+    return mock_shopify.MockStore(products=6, customers=10, orders=40, variants_per_product=3, seed=1)
+
+
+@pytest.fixture
+def mock_server(mock_store):
+    server, base_url = mock_shopify.start_mock_server(mock_store)
+    yield base_url
+    server.shutdown()
+
+
+def post_graphql(base_url, query, variables):
+    request = urllib.request.Request(
+        f"{base_url}/graphql.json",
+        data=json.dumps({"query": query, "variables": variables}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def wait_for_url(base_url, operation_id):
+    for _ in range(100):
+        operation = post_graphql(base_url, POLL_BULK_QUERY, {"id": operation_id})["data"]["node"]
+        if operation["status"] == "COMPLETED":
+            return operation
+        time.sleep(0.05)
+    raise AssertionError(f"bulk operation {operation_id} never completed")
+
+
+def test_mock_bulk_operation_serves_jsonl(mock_server, mock_store):
+    query = "{ orders(query: \"updated_at:>='2000-01-01T00:00:00Z'\") { edges { node { id } } } }"
+
+    started = post_graphql(mock_server, RUN_BULK_MUTATION, {"query": query})["data"]["bulkOperationRunQuery"]
+    assert started["userErrors"] == []
+
+    operation = wait_for_url(mock_server, started["bulkOperation"]["id"])
+
+    with urllib.request.urlopen(operation["url"]) as response:
+        lines = [json.loads(line) for line in response.read().splitlines()]
+
+    orders = [line for line in lines if "__parentId" not in line]
+    line_items = [line for line in lines if "__parentId" in line]
+
+    assert int(operation["objectCount"]) == len(lines)
+    assert len(orders) == mock_store.counts["orders"]
+    assert len(line_items) == sum(len(mock_store.order(i)["line_items"]) for i in range(len(orders)))
+    assert {line["__parentId"] for line in line_items} <= {order["id"] for order in orders}
+
+
+def test_mock_bulk_operation_rejects_unsupported_query(mock_server):
+    started = post_graphql(mock_server, RUN_BULK_MUTATION, {"query": "{ shop { name } }"})
+    result = started["data"]["bulkOperationRunQuery"]
+
+    assert result["bulkOperation"] is None
+    assert result["userErrors"]
+
+
+def test_bulk_extract_orders_pages(mock_server, mock_store):
+    pytest.importorskip("pandas")
+    pytest.importorskip("requests")
+
+    import shopify_bulk
+    from shopify_client import ShopifyClient
+
+    client = ShopifyClient(base_url=mock_server, access_token="mock")
+
+    pages = list(
+        shopify_bulk.bulk_extract_pages(
+            "orders", client, poll_interval=0.05, page_size=7, updated_at_min="2000-01-01T00:00:00+00:00"
+        )
+    )
+
+    orders = [page["orders_bulk"] for page in pages if not page["orders_bulk"].empty]
+    line_items = [page["orders_bulk_lineitems"] for page in pages if not page["orders_bulk_lineitems"].empty]
+
+    order_ids = {int(i) for df in orders for i in df["id"]}
+    line_item_order_ids = [int(i) for df in line_items for i in df["order_id"]]
+
+    assert len(order_ids) == mock_store.counts["orders"]
+    assert len(line_item_order_ids) == sum(
+        len(mock_store.order(i)["line_items"]) for i in range(mock_store.counts["orders"])
+    )
+    assert set(line_item_order_ids) <= order_ids
+
+
+def test_bulk_order_line_items_after_a_page_flush_are_kept():
+    pytest.importorskip("pandas")
+
+    import shopify_bulk
+
+    # Shopify only promises children come after their parent, not right after it
+    records = [
+        {"id": "gid://shopify/Order/1", "updatedAt": "2025-01-01T00:00:00Z"},
+        {"id": "gid://shopify/Order/2", "updatedAt": "2025-01-02T00:00:00Z"},
+        {"id": "gid://shopify/LineItem/10", "quantity": 1, "__parentId": "gid://shopify/Order/1"},
+        {"id": "gid://shopify/Order/3", "updatedAt": "2025-01-03T00:00:00Z"},
+        {"id": "gid://shopify/LineItem/11", "quantity": 2, "__parentId": "gid://shopify/Order/1"},
+    ]
+
+    pages = list(shopify_bulk.iter_bulk_order_pages(iter(records), page_size=1))
+
+    line_items = [
+        (int(row.id), int(row.order_id))
+        for page in pages
+        for row in page["orders_bulk_lineitems"].itertuples()
+    ]
+
+    assert sorted(line_items) == [(10, 1), (11, 1)]
+    assert sum(len(page["orders_bulk"]) for page in pages) == 3
+
+
+def test_bulk_product_variants_before_their_product_raise():
+    pytest.importorskip("pandas")
+
+    import shopify_bulk
+
+    records = [{"id": "gid://shopify/ProductVariant/5", "__parentId": "gid://shopify/Product/1"}]
+
+    with pytest.raises(Exception, match="came before its product"):
+        list(shopify_bulk.iter_bulk_product_variant_pages(iter(records)))
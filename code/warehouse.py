@@ -0,0 +1,194 @@
+"""
+Pluggable warehouse backends for the load step and watermark queries.
+
+    wh = get_warehouse()            # backend from the warehouse_backend env var, "bigquery" by default
+    wh = get_warehouse("duckdb")    # embedded DuckDB file, for offline runs and benchmarks
+    wh.load(file_path, ".raw.orders_raw", disposition="UPSERT")
+    wh.get_last_updatedt("orders_raw")
+    wh.delete_keys(".raw.products_raw", [8123456789012])
+    wh.replace_table(".raw.orders_raw__staging_1a2b", ".raw.orders_raw")
+
+Every backend supports the WRITE_TRUNCATE, WRITE_APPEND and UPSERT (merge on id, newest updated_at wins) dispositions.
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DISPOSITIONS = ("WRITE_TRUNCATE", "WRITE_APPEND", "UPSERT")
+
+
+def clean_column_names(df):
+    """Replaces the "." json_normalize puts in nested column names with "_", which BigQuery column names require."""
+
+    df.columns = df.columns.str.replace(".", "_", regex=False)
+    return df
+
+
+def dedupe_latest(df, key="id", version_column="updated_at"):
+    """Reduces a df to its newest row per key (by version_column when present), before an UPSERT load."""
+
+    if key not in df.columns:
+        return df
+
+    if version_column in df.columns:
+        df = df.sort_values(version_column, kind="stable")
+
+    return df.drop_duplicates(subset=key, keep="last").reset_index(drop=True)
+
+
+def split_destination(destination_loc):
+    """Splits a destination loc like ".raw.products_raw" into ("raw", "products_raw")."""
+
+    dataset, table = destination_loc.lstrip(".").split(".")
+    return dataset, table
+
+
+class Warehouse:
+    """Interface the pipeline loads through. Subclasses implement load and get_last_updatedt."""
+
+    name = None
+
+    def load(
+        self,
+        file_path,
+        destination_loc,
+        disposition="WRITE_TRUNCATE",
+        key="id",
+        version_column="updated_at",
+    ):
+        """
+        Loads a raw extract file to a destination loc like ".raw.products_raw".
+        UPSERT matches on key and keeps the row with the newest version_column.
+        """
+        raise NotImplementedError
+
+    def get_last_updatedt(self, table, dataset="raw"):
+        """Returns a datetime of the max updated_at in a table, or None if it is empty."""
+        raise NotImplementedError
+
+    def delete_keys(self, destination_loc, keys, key="id"):
+        """Deletes the rows whose key is in keys from a table like ".raw.products_raw" (e.g. rows gone from a snapshot)."""
+        raise NotImplementedError
+
+    def replace_table(self, source_loc, destination_loc):
+        """Atomically replaces a table with a fully loaded staging table, which is dropped (e.g. a full snapshot)."""
+        raise NotImplementedError
+
+    def drop_table(self, destination_loc):
+        """Drops a table if it exists (e.g. the staging table of a failed full snapshot)."""
+        raise NotImplementedError
+
+
+class BigQueryWarehouse(Warehouse):
+    name = "bigquery"
+
+    def load(
+        self,
+        file_path,
+        destination_loc,
+        disposition="WRITE_TRUNCATE",
+        key="id",
+        version_column="updated_at",
+    ):
+        import gcp_bigquery_gen as gbq
+
+        table_id = gbq.project + destination_loc
+
+        if disposition == "UPSERT":
+            gbq.upsert_file(file_path, table_id, key=key, version_column=version_column)
+        else:
+            gbq.load_file(file_path, table_id, disposition)
+
+    def get_last_updatedt(self, table, dataset="raw"):
+        import gcp_bigquery_gen as gbq
+
+        return gbq.get_last_updatedt(table, dataset)
+
+    def delete_keys(self, destination_loc, keys, key="id"):
+        import gcp_bigquery_gen as gbq
+
+        gbq.delete_keys(gbq.project + destination_loc, keys, key=key)
+
+    def replace_table(self, source_loc, destination_loc):
+        import gcp_bigquery_gen as gbq
+
+        gbq.replace_table(gbq.project + source_loc, gbq.project + destination_loc)
+
+    def drop_table(self, destination_loc):
+        import gcp_bigquery_gen as gbq
+
+        gbq.drop_table(gbq.project + destination_loc)
+
+
+class DuckDBWarehouse(Warehouse):
+    name = "duckdb"
+
+    def __init__(self, path=None):
+        import duckdb_gen
+
+        self.path = path or os.getenv("duckdb_path") or duckdb_gen.DUCKDB_LOC
+
+    def load(
+        self,
+        file_path,
+        destination_loc,
+        disposition="WRITE_TRUNCATE",
+        key="id",
+        version_column="updated_at",
+    ):
+        import duckdb_gen
+
+        dataset, table = split_destination(destination_loc)
+        duckdb_gen.load_file(
+            file_path,
+            dataset,
+            table,
+            disposition,
+            key=key,
+            version_column=version_column,
+            path=self.path,
+        )
+
+    def get_last_updatedt(self, table, dataset="raw"):
+        import duckdb_gen
+
+        return duckdb_gen.get_last_updatedt(table, dataset, path=self.path)
+
+    def delete_keys(self, destination_loc, keys, key="id"):
+        import duckdb_gen
+
+        dataset, table = split_destination(destination_loc)
+        duckdb_gen.delete_keys(dataset, table, keys, key=key, path=self.path)
+
+    def replace_table(self, source_loc, destination_loc):
+        import duckdb_gen
+
+        duckdb_gen.replace_table(
+            *split_destination(source_loc), *split_destination(destination_loc), path=self.path
+        )
+
+    def drop_table(self, destination_loc):
+        import duckdb_gen
+
+        duckdb_gen.drop_table(*split_destination(destination_loc), path=self.path)
+
+
+WAREHOUSES = {
+    "bigquery": BigQueryWarehouse,
+    "duckdb": DuckDBWarehouse,
+}
+
+warehouses = {}
+
+
+def get_warehouse(backend=None):
+    """Returns the shared warehouse for a backend name, defaulting to the warehouse_backend env var (else "bigquery")."""
+
+    backend = backend or os.getenv("warehouse_backend") or "bigquery"
+
+    if backend not in warehouses:
+        warehouses[backend] = WAREHOUSES[backend]()
+
+    return warehouses[backend]
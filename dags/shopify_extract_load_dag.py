@@ -0,0 +1,207 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+from airflow import DAG
+from airflow.decorators import task
+from airflow.operators.bash import BashOperator
+
+# the pipeline code lives in ../code and uses paths relative to it (../data_raw/, ../data_state/)
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE_DIR = os.path.join(PROJECT_DIR, "code")
+DBT_DIR = os.path.join(PROJECT_DIR, "dbt_bigquery_project")
+
+# entity -> (shopify_gen snapshot function, raw file name, destination table)
+SNAPSHOT_ENTITIES = {
+    "products": ("get_all_products_df", "shopify_allproducts", ".raw.products_raw"),
+    "customers": ("get_all_customers_df", "shopify_allcustomers", ".raw.customers_raw"),
+    "productvariants": (
+        "get_product_variants_df",
+        "shopify_allproductvariants",
+        ".raw.productvariants_raw",
+    ),
+}
+
+# size of each mapped order extract task, widened when the backlog would need more than MAX_ORDER_WINDOWS of them
+# (Airflow refuses to map over more than max_map_length, 1024 by default)
+ORDER_WINDOW = timedelta(hours=6)
+MAX_ORDER_WINDOWS = 256
+
+
+def use_code_dir():
+    """Makes the pipeline modules importable and their relative paths resolve inside a task."""
+
+    if CODE_DIR not in sys.path:
+        sys.path.insert(0, CODE_DIR)
+    os.chdir(CODE_DIR)
+
+
+@task
+def extract_snapshot(entity):
+    """
+    Extracts one entity's full snapshot and writes only its changes since the last loaded one to a raw file
+    (see extract.snapshot_extract). Returns the file, disposition and destination via XCom, or None if nothing changed.
+    """
+
+    use_code_dir()
+    import extract
+    import metrics
+    import shopify_gen as sho
+
+    function_name, filename, destination = SNAPSHOT_ENTITIES[entity]
+
+    with metrics.pipeline_run(f"extract_snapshot_{entity}"):
+        extracted = extract.snapshot_extract(getattr(sho, function_name)(), filename, entity)
+
+    if extracted is None:
+        return None
+
+    return {**extracted, "destination": destination}
+
+
+@task
+def load_snapshot(extracted):
+    """Loads a snapshot's changes (or the full snapshot, replacing the raw table, on a first run). Skips unchanged ones."""
+
+    if extracted is None:
+        print("Snapshot unchanged, nothing to load")
+        return
+
+    use_code_dir()
+    import extract
+    import metrics
+
+    with metrics.pipeline_run("load_snapshot"):
+        extract.snapshot_load(extracted, extracted["destination"])
+
+
+@task
+def get_orders_watermark():
+    """
+    Returns the orders high-water mark (iso string) from the state store, else from the warehouse. Fails on a first run,
+    with neither, pointing at the backfill (extract.backfillorders_extract_upload) to seed orders_raw.
+    """
+
+    use_code_dir()
+    import extract
+    import state_store
+
+    return extract.get_start_dt(state_store.get_state_store(), "orders", "orders_raw").isoformat()
+
+
+@task
+def plan_order_windows(watermark, update_buffer=600):
+    """
+    Splits the time since the watermark (minus the overlap buffer) into windows, one mapped extract task each.
+    Windows are ORDER_WINDOW long, or wider after a long pause so there are never more than MAX_ORDER_WINDOWS.
+    """
+
+    use_code_dir()
+    import shopify_gen as sho
+
+    start = datetime.fromisoformat(watermark) - timedelta(seconds=update_buffer)
+    end = datetime.now(timezone.utc) if start.tzinfo else datetime.utcnow()
+
+    # rounded up a second so microsecond truncation can't leave a sliver of a window over the cap
+    window = max(ORDER_WINDOW, (end - start) / MAX_ORDER_WINDOWS + timedelta(seconds=1))
+
+    return [
+        {"start": s.isoformat(), "end": e.isoformat()}
+        for s, e in sho.split_time_windows(start, end, window)
+    ]
+
+
+@task
+def extract_order_window(window):
+    """Extracts the orders updated inside one time window to a raw file. Returns the file path and its high-water mark."""
+
+    use_code_dir()
+    import extract
+    import metrics
+    import shopify_gen as sho
+    import state_store
+    from warehouse import dedupe_latest
+
+    start = datetime.fromisoformat(window["start"])
+    end = datetime.fromisoformat(window["end"])
+
+    with metrics.pipeline_run("extract_order_window"):
+        df = sho.get_incremental_orders_df(start, update_buffer=0, updated_at_max=end)
+
+        if df.empty:
+            return {"file": None, "high_water": None}
+
+        high_water = state_store.max_updated_at(df[["updated_at"]].to_dict("records"))
+
+        df = dedupe_latest(df)
+
+        file = extract.extract_df_to_file(
+            df, f"shopify_incrementalorders_{start.strftime('%Y%m%d%H%M')}", entity="orders"
+        )
+
+    return {"file": file, "high_water": high_water.isoformat()}
+
+
+# one task loads every window in turn: concurrent UPSERTs into orders_raw would fight over DuckDB's single-writer lock
+# and can hit serialization conflicts between BigQuery MERGEs. Still runs when there were no windows to map over.
+@task(trigger_rule="none_failed")
+def load_order_windows(extracted_windows):
+    """Upserts each order window's file into the raw orders table, oldest first. Returns the windows' high-water marks."""
+
+    use_code_dir()
+    import extract
+    import metrics
+
+    extracted_windows = list(extracted_windows or [])
+
+    with metrics.pipeline_run("load_order_windows"):
+        for extracted in extracted_windows:
+            if extracted["file"]:
+                extract.load_to_warehouse(extracted["file"], ".raw.orders_raw", disposition="UPSERT")
+
+    return [extracted["high_water"] for extracted in extracted_windows]
+
+
+@task(trigger_rule="none_failed")
+def save_orders_watermark(high_waters):
+    """Saves the latest high-water mark across all loaded windows to the state store."""
+
+    use_code_dir()
+    import state_store
+
+    loaded = [datetime.fromisoformat(h) for h in high_waters or [] if h]
+
+    if loaded:
+        state_store.get_state_store().set_watermark("orders", max(loaded))
+
+
+with DAG(
+    dag_id="shopify_extract_load",
+    start_date=datetime(2024, 1, 1),
+    schedule_interval="@daily",
+    catchup=False,
+    max_active_runs=1,
+    default_args={"retries": 2, "retry_delay": timedelta(minutes=5)},
+    tags=["shopify", "extract", "load"],
+    params={"full_refresh": False},
+) as dag:
+
+    # independent entity snapshots run in parallel
+    snapshots = extract_snapshot.expand(entity=list(SNAPSHOT_ENTITIES))
+    snapshot_loads = load_snapshot.expand(extracted=snapshots)
+
+    # order extracts fan out over time windows since the last watermark; their loads run one after another
+    windows = plan_order_windows(get_orders_watermark())
+    order_files = extract_order_window.expand(window=windows)
+    order_loads = load_order_windows(order_files)
+    watermark_saved = save_orders_watermark(order_loads)
+
+    dbt_build = BashOperator(
+        task_id="dbt_build",
+        # trigger with {"full_refresh": true} to rebuild the incremental models from all of raw
+        bash_command=f"cd {DBT_DIR} && dbt build"
+        + "{{ ' --full-refresh' if params.full_refresh else '' }}",
+        trigger_rule="none_failed",
+    )
+
+    [snapshot_loads, watermark_saved] >> dbt_build
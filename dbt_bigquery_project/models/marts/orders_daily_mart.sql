@@ -1,7 +1,38 @@
+{{
+    config(
+        materialized='incremental',
+        incremental_strategy='insert_overwrite',
+        partition_by={'field': 'order_date', 'data_type': 'date'}
+    )
+}}
+
+{% if is_incremental() and execute %}
+-- days holding an order created or changed since the last build; only those partitions are recomputed.
+-- looked up ahead of the build so the filter below is a literal list BigQuery can prune staging's partitions on
+{% set touched_days_query %}
+    select distinct cast(order_date as string) as order_date
+    from {{ ref('orders_fact_staging') }}
+    where cast(updated_at as timestamp) > (select max(last_updated_at) from {{ this }})
+{% endset %}
+{% set touched_days = run_query(touched_days_query).columns[0].values() %}
+{% endif %}
+
+with orders as (
+    select * from {{ ref('orders_fact_staging') }}
+)
+
 select
-    created_at as order_date,
+    order_date,
     count(distinct id) as order_count,
-    sum(total_price) as revenue
-from {{ ref('orders_fact_staging') }}
-group by created_at
-order by created_at
\ No newline at end of file
+    sum(cast(total_price as numeric)) as revenue,
+    max(cast(updated_at as timestamp)) as last_updated_at
+from orders
+{% if is_incremental() %}
+{% if touched_days %}
+where order_date in ({% for day in touched_days %}date '{{ day }}'{% if not loop.last %}, {% endif %}{% endfor %})
+{% else %}
+-- nothing changed since the last build
+where false
+{% endif %}
+{% endif %}
+group by order_date
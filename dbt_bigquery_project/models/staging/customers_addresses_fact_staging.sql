@@ -1,13 +1,7 @@
 WITH raw_customers AS (
     SELECT
         id as customer_id,
-        REPLACE(
-            REPLACE(
-                REPLACE(addresses, "'", '"'),
-                "None", "null"
-            ),
-            "True", "true"
-            ) as addresses_json
+        addresses as addresses_json
     FROM {{ source('raw_data','customers_raw') }}
 )
 
@@ -1,3 +1,2 @@
-select * 
-
+select *
 from {{ source('raw_data', 'customers_raw')}}
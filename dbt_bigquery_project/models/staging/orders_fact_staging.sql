@@ -1,7 +1,20 @@
-select *
-from (
-  select *,
-         row_number() over (partition by id order by updated_at desc) as rn
+{{
+    config(
+        materialized='incremental',
+        unique_key='id',
+        incremental_strategy='merge',
+        partition_by={'field': 'order_date', 'data_type': 'date'},
+        cluster_by=['id'],
+        on_schema_change='append_new_columns'
+    )
+}}
+
+select
+    *,
+    date(cast(created_at as timestamp)) as order_date
 from {{ source('raw_data', 'orders_raw')}}
-) a
-where rn = 1
\ No newline at end of file
+
+{% if is_incremental() %}
+-- only orders created or changed since the last build; dbt build --full-refresh rebuilds from all of raw
+where cast(updated_at as timestamp) >= (select max(cast(updated_at as timestamp)) from {{ this }})
+{% endif %}
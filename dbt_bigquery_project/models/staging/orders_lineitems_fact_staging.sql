@@ -1,26 +1,33 @@
-WITH raw_orders AS (
-
-    select * from (
+{{
+    config(
+        materialized='incremental',
+        unique_key='line_item_id',
+        incremental_strategy='merge',
+        partition_by={'field': 'order_date', 'data_type': 'date'},
+        cluster_by=['order_id', 'variant_id'],
+        on_schema_change='append_new_columns'
+    )
+}}
 
-        SELECT
-            id as order_id,
-            REPLACE(
-                REPLACE(
-                    REPLACE(line_items, "'", '"'),
-                    "None", "null"
-                ),
-                "True", "true"
-                ) as items_json,
-            row_number() over (partition by id order by updated_at desc) as rn
+WITH raw_orders AS (
+    SELECT
+        id as order_id,
+        date(cast(created_at as timestamp)) as order_date,
+        cast(updated_at as timestamp) as updated_at,
+        line_items as items_json
+    FROM {{ source('raw_data','orders_raw') }}
 
-        FROM {{ source('raw_data','orders_raw') }}
-    ) a
-    where rn = 1
+    {% if is_incremental() %}
+    -- only orders created or changed since the last build; dbt build --full-refresh rebuilds from all of raw
+    WHERE cast(updated_at as timestamp) >= (select max(updated_at) from {{ this }})
+    {% endif %}
 )
 
 SELECT
     JSON_VALUE(items, '$.id') AS line_item_id,
     order_id,
+    order_date,
+    updated_at,
     JSON_VALUE(items, '$.admin_graphql_api_id') AS admin_graphql_api_id,
     JSON_VALUE(items, '$.attributed_staffs') AS attributed_staffs,
     JSON_VALUE(items, '$.current_quantity') AS current_quantity,
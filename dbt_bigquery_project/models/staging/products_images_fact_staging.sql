@@ -1,13 +1,7 @@
 WITH raw_products AS (
     SELECT
         id as product_id,
-        REPLACE(
-            REPLACE(
-                REPLACE(images, "'", '"'),
-                "None", "null"
-            ),
-            "True", "true"
-            ) as images_json
+        images as images_json
     FROM {{ source('raw_data','products_raw') }}
 )
 
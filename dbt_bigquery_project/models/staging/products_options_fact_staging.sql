@@ -1,13 +1,7 @@
 WITH raw_products AS (
     SELECT
         id as product_id,
-        REPLACE(
-            REPLACE(
-                REPLACE(options, "'", '"'),
-                "None", "null"
-            ),
-            "True", "true"
-            ) as opts_json
+        options as opts_json
     FROM {{ source('raw_data','products_raw') }}
 )
 